@@ -12,20 +12,66 @@ License: MIT
 
 import asyncio
 import json
+import logging
 import re
 import time
-from typing import Optional
+import weakref
+from typing import Awaitable, Callable, Optional, TypeVar
 
 import redis.asyncio as aioredis
 import structlog
+from google.adk.agents.run_config import RunConfig, StreamingMode
+from google.adk.errors.session_not_found_error import SessionNotFoundError
+from google.adk.events import Event
 from google.adk.runners import Runner
 from google.adk.sessions.session import Session
 from google.genai.types import Part, UserContent
 
 from app.config import settings
+from app.core.exceptions import CodecError
+from app.core.metrics import (
+    CACHE_BYTES,
+    CACHE_ENTRIES,
+    GAME_STATES_SUPERSEDED,
+    WORK_IN_FLIGHT,
+    WORK_QUEUE_DEPTH,
+    WORK_QUEUE_WAIT_SECONDS,
+    WORK_SHED,
+    AgentStageTimer,
+    time_stage,
+)
+from app.core.tracing import current_trace_id, record_dequeue, work_span
+from app.logger import is_enabled_for
+from app.services.analysis_cache import analysis_cache
+from app.services.cache_service import BoundedTTLCache
+from app.services.coaching_cache import (
+    CoachingResponseCache,
+    PartialCallback,
+    fallback_payload,
+)
+from app.services.coaching_stream import PartialMessageParser
+from app.services.message_codec import REDIS_ENCODING_ERRORS, MessageCodec
+from app.services.opening_book import OpeningBook
+from app.services.redis_cache import rag_cache
+from app.services.session_compactor import SessionCompactor
+from app.services.speculator import Speculator
+from app.services.work_queue import WorkItem, WorkQueue, create_work_queue
+from app.tools.fen_query_factory import FENQueryFactory
+from app.tools.illegal_move_explainer import IllegalMoveExplainer
+from app.tools.position_analyzer import PositionAnalyzer
+from app.tools.rag_tool import ChessKnowledgeRetrieverTool
 
 log = structlog.get_logger()
 
+SESSION_APP_NAME = "ChessMateLegalMoveAgentsCoach"
+# Cacheable responses are produced in throwaway sessions of this user, so
+# they do not depend on any one client's history.
+SHARED_COACHING_USER = "shared-coaching"
+# The agent whose streamed output is published as partial coaching messages.
+STREAMED_AGENT_NAME = "coaching_agent"
+
+T = TypeVar("T")
+
 
 class ChessMateError(Exception):
     """Custom exception for the ChessMate Cognitive Service."""
@@ -49,12 +95,80 @@ class AgentIOService:
         config: settings,
         legal_move_runner: Runner,
         illegal_move_runner: Runner,
+        opening_book: Optional[OpeningBook] = None,
     ):
         self.config = config
         self.log = log.bind(service=self.__class__.__name__)
         self.redis_client: Optional[aioredis.Redis] = None
         self.legal_move_runner = legal_move_runner
         self.illegal_move_runner = illegal_move_runner
+        self.opening_book = opening_book
+        self.codec = MessageCodec(config.message_codec)
+        self.queue_handlers: dict[str, Callable[[dict], Awaitable[None]]] = {
+            "coaching_work_queue": self.process_game_state_change,
+            "illegal_move_work_queue": self.process_illegal_move,
+        }
+        self.queue_limits = {
+            "coaching_work_queue": config.coaching_queue_concurrency,
+            "illegal_move_work_queue": config.illegal_move_queue_concurrency,
+        }
+        self.queue_in_flight = dict.fromkeys(self.queue_limits, 0)
+        self.queue_max_age = {
+            "coaching_work_queue": config.coaching_work_max_age,
+            "illegal_move_work_queue": config.illegal_move_work_max_age,
+        }
+        self.work_queue: Optional[WorkQueue] = None
+        self.accepting_work = True
+        self._depth_sampler: Optional[asyncio.Task] = None
+        self.in_flight_tasks: set[asyncio.Task] = set()
+        # Latest coaching task per client, and the older ones it replaced.
+        self.coaching_tasks: dict[str, asyncio.Task] = {}
+        self._running_tasks: set[asyncio.Task] = set()
+        self._superseded_tasks: set[asyncio.Task] = set()
+        self._capacity_available = asyncio.Event()
+        self.session_ids = BoundedTTLCache(
+            ttl=config.session_cache_ttl,
+            max_entries=config.session_cache_max_entries,
+        )
+        # Compaction is serialized per client session, and a compacted
+        # session is only deleted once the runs still using it are done.
+        self._session_locks: weakref.WeakValueDictionary[str, asyncio.Lock] = weakref.WeakValueDictionary()
+        self._session_runs: dict[str, int] = {}
+        self._retired_sessions: dict[str, tuple[Runner, str]] = {}
+        self.session_compactor: Optional[SessionCompactor] = None
+        if config.enable_session_compaction:
+            self.session_compactor = SessionCompactor(
+                max_turns=config.session_max_turns,
+                keep_turns=config.session_keep_turns,
+                max_bytes=config.session_max_bytes,
+                summary_max_bytes=config.session_summary_max_bytes,
+            )
+        self.coaching_cache: Optional[CoachingResponseCache] = None
+        if config.enable_coaching_cache:
+            self.coaching_cache = CoachingResponseCache(
+                ttl=config.coaching_cache_ttl,
+                max_entries=config.coaching_cache_max_entries,
+                max_bytes=config.coaching_cache_max_bytes,
+            )
+        self.illegal_move_explainer: Optional[IllegalMoveExplainer] = None
+        if config.illegal_move_responder == "template":
+            self.illegal_move_explainer = IllegalMoveExplainer(language=config.illegal_move_language)
+        # The cheap tier used for work that waited past the degradation threshold.
+        self.fallback_illegal_move_explainer = IllegalMoveExplainer(language=config.illegal_move_language)
+        self.position_analyzer = PositionAnalyzer()
+        self.speculator: Optional[Speculator] = None
+        if config.enable_speculation:
+            query_factory = FENQueryFactory()
+            rag_tool = ChessKnowledgeRetrieverTool()
+            self.speculator = Speculator(
+                analyse=query_factory.analyse,
+                retrieve=lambda fen: rag_tool.run_async(
+                    {"fen": fen, "cognitive_stage": config.speculation_cognitive_stage}
+                ),
+                coach=self._precompute_coaching if config.speculate_coaching and self.coaching_cache else None,
+                is_idle=lambda: not any(self.queue_in_flight.values()),
+                top_k=config.speculation_top_k,
+            )
         self.log.info("AgentIOService initialized.")
 
     async def start(self) -> None:
@@ -74,6 +188,7 @@ class AgentIOService:
                 self.redis_client = aioredis.from_url(
                     self.config.redis_url,
                     decode_responses=True,
+                    encoding_errors=REDIS_ENCODING_ERRORS,
                 )
                 await self.redis_client.ping()
                 self.log.info("Successfully connected to Redis.")
@@ -85,92 +200,387 @@ class AgentIOService:
                 await asyncio.sleep(5)
 
     async def _listen_for_work_queue_messages(self):
-        """Enhanced listener with detailed consumption logging"""
+        """Enhanced listener with detailed consumption logging.
+
+        Each queue has its own concurrency limit. Queues whose workers are
+        all busy are left out of the fetch, so their backlog stays in Redis
+        where other replicas can take it. Each fetch takes as many messages
+        as the ready queues have free slots in one round trip; queue depths
+        are sampled by a separate task rather than on every iteration.
+        """
         self.log.info("🔍 [PYTHON_LISTENER] Starting enhanced work queue listener...")
-        queues = ["coaching_work_queue", "illegal_move_work_queue"]
+        queues = list(self.queue_handlers)
         
+        try:
+            while self.accepting_work:
+                try:
+                    if not self.redis_client:
+                        self.log.error("❌ [PYTHON_LISTENER] Redis client unavailable")
+                        await asyncio.sleep(5)
+                        continue
+
+                    if self.work_queue is None:
+                        self.work_queue = create_work_queue(self.config, self.redis_client)
+                        await self.work_queue.setup(queues)
+                        self.log.info("🔌 [PYTHON_LISTENER] Work queue transport ready",
+                                    transport=self.work_queue.name)
+                        self._depth_sampler = asyncio.create_task(self._sample_queue_depths(queues))
+
+                    ready_queues = [q for q in queues if self._free_slots(q) > 0]
+                    if not ready_queues:
+                        self._capacity_available.clear()
+                        self.log.info("⏸️ [PYTHON_LISTENER] All workers busy, pausing dequeue")
+                        await self._capacity_available.wait()
+                        continue
+
+                    # 🔍 TIME THE FETCH OPERATION
+                    start_time = time.time()
+                    batch_size = min(self._free_slots(q) for q in ready_queues)
+
+                    # A bounded block lets the listener pick busy queues back up
+                    # as soon as their workers free up.
+                    items = await self.work_queue.fetch(
+                        ready_queues, batch_size, self.config.work_queue_block_timeout
+                    )
+                    if not items:
+                        continue
+
+                    consumption_time = time.time() - start_time
+                    self.log.info("⚡ [PYTHON_CONSUMER] Messages consumed successfully", 
+                                queues=sorted({item.queue for item in items}),
+                                batch_size=len(items),
+                                consumption_time_ms=round(consumption_time * 1000, 2))
+                    for item in items:
+                        await self._handle_work_item(item)
+
+                except Exception as e:
+                    self.log.exception("❌ [PYTHON_LISTENER] Error in work queue listener", 
+                                    error=str(e))
+                    await asyncio.sleep(1)
+        finally:
+            if self._depth_sampler:
+                self._depth_sampler.cancel()
+
+    async def _handle_work_item(self, item: WorkItem):
+        """Parses a consumed message and hands it to a worker."""
+        message_json = item.payload
+        if not message_json:
+            self.log.warning("❓ [PYTHON_CONSUMER] Fetched an empty message", queue=item.queue)
+            await self.work_queue.ack(item)
+            return
+
+        # 🔍 DETAILED MESSAGE ANALYSIS (debug only: the preview is costly to build)
+        if is_enabled_for(logging.DEBUG):
+            self.log.debug("📥 [PYTHON_PROCESSOR] Processing consumed message",
+                        queue=item.queue,
+                        raw_message_preview=repr(message_json[:100]),
+                        message_length=len(message_json))
+        try:
+            message = self.codec.decode(message_json)
+            if not isinstance(message, dict):
+                raise CodecError(f"Expected an object, got {type(message).__name__}")
+        except CodecError as e:
+            self.log.error("❌ [PYTHON_PROCESSOR] Message decode failed", 
+                        error=str(e), 
+                        raw_message=repr(message_json[:200]))
+            await self.work_queue.ack(item)
+            return
+
+        # 🎯 LOG MESSAGE DETAILS
+        self.log.info("✅ [PYTHON_PROCESSOR] Message parsed successfully",
+                    message_type=message.get('type'),
+                    client_id=message.get('ws_client'),
+                    trace_id=message.get('traceId'),  # From Node.js
+                    processing_queue=item.queue)
+
+        self._observe_queue_wait(item.queue, message)
+        record_dequeue(item.queue, message, self._queue_age(message))
+        if self._is_expired(item.queue, message):
+            self.log.info("🗑️ [PYTHON_PROCESSOR] Dropping expired message",
+                        queue=item.queue,
+                        client_id=message.get('ws_client'),
+                        trace_id=message.get('traceId'))
+            WORK_SHED.labels(queue=item.queue, action="expired").inc()
+            await self.work_queue.ack(item)
+            return
+        await self._dispatch(item, message)
+
+    async def _dispatch(self, item: WorkItem, message: dict):
+        """
+        Hands a message to a worker for its queue. The listener never fetches
+        more messages than a queue has free slots, so this never overcommits.
+        """
+        handler = self.queue_handlers.get(item.queue)
+        if handler is None:
+            self.log.warning("❓ [PYTHON_ROUTER] Unknown queue", queue=item.queue)
+            await self.work_queue.ack(item)
+            return
+
+        self.log.info("🎯 [PYTHON_ROUTER] Routing to worker", queue=item.queue, handler=handler.__name__)
+        if self.speculator:
+            self.speculator.cancel()
+        self.queue_in_flight[item.queue] += 1
+        task = asyncio.create_task(self._run_worker(item, handler, message))
+        self.in_flight_tasks.add(task)
+        task.add_done_callback(self.in_flight_tasks.discard)
+        if item.queue == "coaching_work_queue" and self.config.coalesce_game_states:
+            self._supersede_previous_game_state(message.get("ws_client"), task)
+
+    def _supersede_previous_game_state(self, ws_client: Optional[str], task: asyncio.Task):
+        """
+        Makes ``task`` the client's current coaching task. An older task for
+        the same client is cancelled if it is already running, or skipped when
+        it starts otherwise, so only the latest position is coached.
+        """
+        if not ws_client:
+            return
+        previous = self.coaching_tasks.get(ws_client)
+        self.coaching_tasks[ws_client] = task
+        if previous is None or previous.done():
+            return
+        self._superseded_tasks.add(previous)
+        if previous in self._running_tasks:
+            previous.cancel()
+        self.log.info("⏭️ [PYTHON_ROUTER] Superseded older game state", client_id=ws_client)
+
+    async def _run_worker(
+        self,
+        item: WorkItem,
+        handler: Callable[[dict], Awaitable[None]],
+        message: dict,
+    ):
+        """
+        Runs a handler in a worker slot, acknowledges the message once its
+        response has been published and frees the slot. Work cancelled by a
+        shutdown is left unacknowledged so another consumer can reclaim it.
+        """
+        task = asyncio.current_task()
+        WORK_IN_FLIGHT.labels(queue=item.queue).inc()
+        try:
+            self._running_tasks.add(task)
+            if task in self._superseded_tasks or await self._is_superseded(item.queue, message):
+                GAME_STATES_SUPERSEDED.labels(stage="queued").inc()
+            else:
+                with work_span(item.queue, message):
+                    await handler(message)
+            await self.work_queue.ack(item)
+        except asyncio.CancelledError:
+            if task not in self._superseded_tasks:
+                raise
+            GAME_STATES_SUPERSEDED.labels(stage="in_flight").inc()
+            await self.work_queue.ack(item)
+        except Exception:
+            self.log.exception("❌ [PYTHON_WORKER] Unhandled worker error", queue=item.queue)
+            await self.work_queue.ack(item)
+        finally:
+            self._running_tasks.discard(task)
+            self._superseded_tasks.discard(task)
+            ws_client = message.get("ws_client")
+            if self.coaching_tasks.get(ws_client) is task:
+                del self.coaching_tasks[ws_client]
+            WORK_IN_FLIGHT.labels(queue=item.queue).dec()
+            self.queue_in_flight[item.queue] -= 1
+            self._capacity_available.set()
+
+    async def _is_superseded(self, queue: str, message: dict) -> bool:
+        """
+        Checks the gateway's per-client sequence number, which catches newer
+        positions that are still queued or were taken by another replica.
+        If the check fails the message is treated as current, so it is
+        coached rather than dropped.
+        """
+        if queue != "coaching_work_queue" or not self.config.coalesce_game_states:
+            return False
+        ws_client = message.get("ws_client")
+        client_seq = message.get("clientSeq")
+        if not ws_client or not isinstance(client_seq, int):
+            return False
+        try:
+            latest = await self.redis_client.get(f"coaching:seq:{ws_client}")
+            return latest is not None and int(latest) > client_seq
+        except Exception as e:
+            self.log.warning("⚠️ [PYTHON_WORKER] Sequence check failed", client_id=ws_client, error=str(e))
+            return False
+
+    async def _sample_queue_depths(self, queues: list[str]):
+        """
+        Periodically records how many messages are waiting in each queue,
+        and sweeps and records the sizes of the in-process caches.
+        """
         while True:
             try:
-                if not self.redis_client:
-                    self.log.error("❌ [PYTHON_LISTENER] Redis client unavailable")
-                    await asyncio.sleep(5)
-                    continue
-
-                # 🔍 PRE-BLPOP: Check queue states
-                total_waiting = 0
+                self._sample_cache_sizes()
                 for queue in queues:
-                    length = await self.redis_client.llen(queue)
+                    length = await self.work_queue.depth(queue)
+                    WORK_QUEUE_DEPTH.labels(queue=queue).set(length)
                     if length > 0:
-                        total_waiting += length
-                        self.log.info("📋 [PYTHON_LISTENER] Messages waiting in queue", 
+                        self.log.info("📋 [PYTHON_LISTENER] Messages waiting in queue",
                                     queue=queue, length=length)
+            except Exception as e:
+                self.log.warning("❌ [PYTHON_LISTENER] Queue depth sampling failed", error=str(e))
+            await asyncio.sleep(self.config.queue_depth_sample_interval)
 
-                if total_waiting == 0:
-                    self.log.info("⏳ [PYTHON_LISTENER] No messages waiting, blocking for new arrivals...")
-                
-                # 🔍 TIME THE BLPOP OPERATION
-                start_time = time.time()
-                self.log.info("🔍 [PYTHON_LISTENER] About to call BLPOP", 
-                            queues=queues, 
-                            timeout="indefinite",
-                            total_waiting=total_waiting)
-
-                # ⚡ CRITICAL: This might be consuming messages immediately
-                queue_name, message_json = await self.redis_client.blpop(keys=queues)
-                
-                consumption_time = time.time() - start_time
-                self.log.info("⚡ [PYTHON_CONSUMER] Message consumed successfully", 
-                            queue=queue_name,
-                            consumption_time_ms=round(consumption_time * 1000, 2),
-                            message_size=len(message_json) if message_json else 0,
-                            was_waiting=total_waiting > 0)
-
-                if message_json:
-                    # 🔍 DETAILED MESSAGE ANALYSIS
-                    self.log.info("📥 [PYTHON_PROCESSOR] Processing consumed message",
-                                queue=queue_name,
-                                raw_message_preview=message_json[:100],
-                                message_length=len(message_json))
-                    
-                    try:
-                        message = json.loads(message_json)
-                        
-                        # 🎯 LOG MESSAGE DETAILS
-                        self.log.info("✅ [PYTHON_PROCESSOR] Message parsed successfully",
-                                    message_type=message.get('type'),
-                                    client_id=message.get('ws_client'),
-                                    trace_id=message.get('traceId'),  # From Node.js
-                                    message_keys=list(message.keys()),
-                                    processing_queue=queue_name)
-                        
-                        # Process based on queue
-                        if queue_name == "coaching_work_queue":
-                            self.log.info("🎯 [PYTHON_ROUTER] Routing to coaching processor")
-                            asyncio.create_task(self.process_game_state_change(message))
-                        elif queue_name == "illegal_move_work_queue":  
-                            self.log.info("🎯 [PYTHON_ROUTER] Routing to illegal move processor")
-                            asyncio.create_task(self.process_illegal_move(message))
-                        else:
-                            self.log.warning("❓ [PYTHON_ROUTER] Unknown queue", queue=queue_name)
-                            
-                    except json.JSONDecodeError as e:
-                        self.log.error("❌ [PYTHON_PROCESSOR] JSON decode failed", 
-                                    error=str(e), 
-                                    raw_message=message_json[:200])
-                else:
-                    self.log.warning("❓ [PYTHON_CONSUMER] BLPOP returned None message")
+    def _sample_cache_sizes(self):
+        caches = {"session_ids": self.session_ids, "rag": rag_cache.local}
+        if self.coaching_cache:
+            caches["coaching"] = self.coaching_cache.responses
+        for name, cache in caches.items():
+            cache.maybe_sweep()
+            stats = cache.stats()
+            CACHE_ENTRIES.labels(cache=name).set(stats["entries"])
+            CACHE_BYTES.labels(cache=name).set(stats["bytes"])
+        CACHE_ENTRIES.labels(cache="analysis").set(analysis_cache.stats()["entries"])
+
+    def _free_slots(self, queue: str) -> int:
+        return self.queue_limits[queue] - self.queue_in_flight[queue]
+
+    def _observe_queue_wait(self, queue_name: str, message: dict):
+        """Records how long the message waited in Redis, if it was stamped."""
+        wait_seconds = self._queue_age(message)
+        if wait_seconds is not None:
+            WORK_QUEUE_WAIT_SECONDS.labels(queue=queue_name).observe(wait_seconds)
+
+    @staticmethod
+    def _queue_age(message: dict) -> Optional[float]:
+        """Returns how long ago the gateway enqueued the message, in seconds."""
+        enqueued_at = message.get("enqueuedAt")
+        if not isinstance(enqueued_at, (int, float)):
+            return None
+        return max(0.0, time.time() - enqueued_at / 1000)
+
+    def _is_expired(self, queue_name: str, message: dict) -> bool:
+        """
+        Checks the message's deadline: an absolute ``deadline`` or a
+        ``ttlMs`` set by the gateway, or the queue's configured maximum age.
+        Unstamped messages never expire.
+        """
+        deadline = message.get("deadline")
+        if isinstance(deadline, (int, float)):
+            return time.time() > deadline / 1000
+        age = self._queue_age(message)
+        if age is None:
+            return False
+        ttl_ms = message.get("ttlMs")
+        max_age = ttl_ms / 1000 if isinstance(ttl_ms, (int, float)) else self.queue_max_age.get(queue_name, 0)
+        return max_age > 0 and age > max_age
 
+    def _should_degrade(self, message: dict) -> bool:
+        """
+        Returns True once a message has waited past the degradation
+        threshold, so it is answered by the cheap tier instead of the LLM.
+        """
+        age = self._queue_age(message)
+        threshold = self.config.degrade_after_queue_age
+        return threshold > 0 and age is not None and age > threshold
+
+    async def _get_session_id(self, client_id: str, runner: Runner) -> str:
+        """
+        Returns the client's session ID, looking it up in the session service
+        only on a cache miss. Concurrent messages from a new client share one
+        lookup, so they cannot create duplicate sessions.
+        """
+        async def load() -> str:
+            session = await self._get_or_create_session(client_id, runner)
+            return session.id
+
+        return await self.session_ids.get_or_load(self._session_key(client_id, runner), load)
+
+    def _invalidate_session(self, client_id: str, runner: Runner):
+        """Drops a cached session ID so the next message looks it up again."""
+        self.session_ids.delete(self._session_key(client_id, runner))
+
+    async def _refresh_session_id(self, client_id: str, runner: Runner, stale_session_id: str) -> str:
+        """
+        Replaces a cached session ID whose session no longer exists, for
+        example because another worker process compacted it, and returns
+        the session the client's message should run in instead.
+        """
+        self.log.info("Cached session is gone, looking it up again.",
+                      session_id=stale_session_id, client_id=client_id)
+        key = self._session_key(client_id, runner)
+        if self.session_ids.get(key) == stale_session_id:
+            self.session_ids.delete(key)
+        return await self._get_session_id(client_id, runner)
+
+    async def _record_session_turn(
+        self,
+        client_id: str,
+        runner: Runner,
+        session_id: str,
+        message_bytes: int,
+        events: list[Event],
+    ):
+        """
+        Counts a finished turn against the session's budget and compacts the
+        session once it goes over, pointing the cache at its replacement.
+        Turns of one client session are recorded one at a time, so a
+        session is compacted once even when several turns finish together.
+        """
+        if self.session_compactor is None:
+            return
+        key = self._session_key(client_id, runner)
+        lock = self._session_locks.get(key)
+        if lock is None:
+            lock = self._session_locks[key] = asyncio.Lock()
+        async with lock:
+            current_session_id = self.session_ids.get(key)
+            if current_session_id is not None and current_session_id != session_id:
+                return
+            try:
+                if not await self.session_compactor.record_turn(
+                    runner.session_service, SESSION_APP_NAME, client_id, session_id, message_bytes, events
+                ):
+                    return
+                new_session_id = await self.session_compactor.compact(
+                    runner.session_service, SESSION_APP_NAME, client_id, session_id
+                )
             except Exception as e:
-                self.log.exception("❌ [PYTHON_LISTENER] Error in work queue listener", 
-                                error=str(e))
-                await asyncio.sleep(1)
+                self.log.warning("Session compaction failed.", session_id=session_id, error=str(e))
+                return
+            if new_session_id:
+                self.session_ids.set(key, new_session_id)
+                await self._retire_session(runner, client_id, session_id)
+            else:
+                self._invalidate_session(client_id, runner)
+
+    async def _run_in_session(self, session_id: str, run: Awaitable[T]) -> T:
+        """Awaits a pipeline run, marking its session as in use until it finishes."""
+        self._session_runs[session_id] = self._session_runs.get(session_id, 0) + 1
+        try:
+            return await run
+        finally:
+            self._session_runs[session_id] -= 1
+            if not self._session_runs[session_id]:
+                del self._session_runs[session_id]
+                retired = self._retired_sessions.pop(session_id, None)
+                if retired:
+                    await self._delete_session(*retired, session_id)
+
+    async def _retire_session(self, runner: Runner, client_id: str, session_id: str):
+        """Deletes a compacted session now, or after the last run using it."""
+        if self._session_runs.get(session_id):
+            self._retired_sessions[session_id] = (runner, client_id)
+        else:
+            await self._delete_session(runner, client_id, session_id)
+
+    async def _delete_session(self, runner: Runner, client_id: str, session_id: str):
+        try:
+            await runner.session_service.delete_session(
+                app_name=SESSION_APP_NAME, user_id=client_id, session_id=session_id
+            )
+        except Exception as e:
+            self.log.warning("Failed to delete compacted session.", session_id=session_id, error=str(e))
+
+    @staticmethod
+    def _session_key(client_id: str, runner: Runner) -> str:
+        return f"{id(runner.session_service)}:{client_id}"
 
     async def _get_or_create_session(self, client_id: str, runner: Runner) -> Session:
         """
         Retrieves a session for a client, creating it if it doesn't exist.
         """
         existing_sessions = await runner.session_service.list_sessions(
-            app_name="ChessMateLegalMoveAgentsCoach", user_id=client_id
+            app_name=SESSION_APP_NAME, user_id=client_id
         )
         if existing_sessions.sessions:
             session_id = existing_sessions.sessions[0].id
@@ -178,7 +588,7 @@ class AgentIOService:
                 "Found existing session.", session_id=session_id, client_id=client_id
             )
             session = await runner.session_service.get_session(
-                app_name="ChessMateLegalMoveAgentsCoach", user_id=client_id, session_id=session_id
+                app_name=SESSION_APP_NAME, user_id=client_id, session_id=session_id
             )
             if session:
                 return session
@@ -187,7 +597,7 @@ class AgentIOService:
             "No existing session found, creating a new one.", client_id=client_id
         )
         session = await runner.session_service.create_session(
-            app_name="ChessMateLegalMoveAgentsCoach", user_id=client_id
+            app_name=SESSION_APP_NAME, user_id=client_id
         )
         self.log.info(
             "New session created.", session_id=session.id, client_id=client_id
@@ -204,32 +614,80 @@ class AgentIOService:
             return
 
         try:
-            session = await self._get_or_create_session(ws_client, self.legal_move_runner)
             fen = message.get("game", {}).get("fen")
             if not fen:
                 self.log.error("No FEN in message", message=message)
                 return
+            if self.speculator:
+                self.speculator.record_request(ws_client, fen)
+
+            if self.opening_book:
+                with time_stage("coaching", "opening_book"):
+                    book_payload = self.opening_book.coaching_payload(fen, message)
+                if book_payload:
+                    self.log.info("Answering game state change from the opening book.", fen=fen)
+                    await self.publish_coaching_message(
+                        {"coaching_message": json.dumps(book_payload)}, ws_client
+                    )
+                    return
+
+            if self._should_degrade(message):
+                await self._publish_degraded_coaching(message, fen, ws_client)
+                return
+
+            message_text = self.coaching_prompt(message)
+
+            # Partial output of a shared run is published from the run's
+            # own task, so this request's trace ID is captured here.
+            trace_id = message.get("traceId")
+
+            async def publish_partial(partial_message: str):
+                await self.publish_partial_coaching_message(partial_message, ws_client, trace_id)
+
+            cache_key = self.coaching_cache.key_for(message, fen) if self.coaching_cache else None
+            if cache_key:
+                with time_stage("coaching", "coaching_cache"):
+                    response_content = await self.coaching_cache.get_or_run(
+                        cache_key,
+                        lambda on_partial: self._run_shared_coaching(message_text, fen, on_partial),
+                        on_partial=publish_partial,
+                    )
+                with time_stage("coaching", "publish"):
+                    await self.publish_coaching_message({"coaching_message": response_content}, ws_client)
+                if self.speculator:
+                    self.speculator.speculate(ws_client, fen)
+                return
+
+            with time_stage("coaching", "session_lookup"):
+                session_id = await self._get_session_id(ws_client, self.legal_move_runner)
 
             self.log.info(
                 "Processing game state change with session.",
                 fen=fen,
-                session_id=session.id,
+                session_id=session_id,
             )
-            content = UserContent(parts=[Part(text=str(message))])
-            response_content = ""
-            async for event in self.legal_move_runner.run_async(
-                user_id=ws_client,
-                session_id=session.id,
-                new_message=content,
-                state_delta={"fen": fen},
-            ):
-                if event.content and event.content.parts and event.content.parts[0].text:
-                    response_content = event.content.parts[0].text
+            try:
+                response_content, events = await self._run_in_session(session_id, self._run_legal_move_runner(
+                    ws_client, session_id, message_text, fen, publish_partial
+                ))
+            except SessionNotFoundError:
+                session_id = await self._refresh_session_id(ws_client, self.legal_move_runner, session_id)
+                response_content, events = await self._run_in_session(session_id, self._run_legal_move_runner(
+                    ws_client, session_id, message_text, fen, publish_partial
+                ))
 
             coaching_response = {"coaching_message": response_content}
-            await self.publish_coaching_message(coaching_response, ws_client)
+            with time_stage("coaching", "publish"):
+                await self.publish_coaching_message(coaching_response, ws_client)
+            if self.speculator:
+                self.speculator.speculate(ws_client, fen)
+            with time_stage("coaching", "session_record"):
+                await self._record_session_turn(
+                    ws_client, self.legal_move_runner, session_id, len(message_text), events
+                )
 
         except Exception as e:
+            self._invalidate_session(ws_client, self.legal_move_runner)
             self.log.exception(
                 "An error occurred during ADK execution for legal move.",
                 error=str(e),
@@ -238,6 +696,129 @@ class AgentIOService:
             await self.publish_coaching_message({"coaching_message": "{}"}, ws_client, is_error=True)
 
 
+    @staticmethod
+    def coaching_prompt(message: dict) -> str:
+        """
+        Builds the agent's input for a game state change from the fields
+        the coaching pipeline uses, leaving out transport metadata such as
+        trace IDs, sequence numbers and timestamps.
+        """
+        game = message.get("game") or {}
+        lines = [f"FEN: {game.get('fen')}"]
+        if message.get("move"):
+            lines.append(f"Last move: {message['move']}")
+        if message.get("cognitiveStage"):
+            lines.append(f"Cognitive stage: {message['cognitiveStage']}")
+        if message.get("language"):
+            lines.append(f"Language: {message['language']}")
+        return "\n".join(lines)
+
+    async def _run_legal_move_runner(
+        self,
+        user_id: str,
+        session_id: str,
+        message_text: str,
+        fen: str,
+        on_partial: Optional[PartialCallback] = None,
+    ) -> tuple[str, list[Event]]:
+        """
+        Runs the legal move pipeline and returns the final text response and
+        the events it produced.
+
+        In streaming mode the model output arrives as partial events, and the
+        coaching agent's ``message`` field is passed to ``on_partial`` as it
+        grows. Partial events are not part of the returned events; the final
+        event of each agent carries the full text.
+        """
+        stream = self.config.stream_coaching_output and on_partial is not None
+        run_config = RunConfig(streaming_mode=StreamingMode.SSE) if stream else None
+        parser = PartialMessageParser()
+        published_chars = 0
+        response_content = ""
+        events = []
+        timer = AgentStageTimer("coaching")
+        async for event in self.legal_move_runner.run_async(
+            user_id=user_id,
+            session_id=session_id,
+            new_message=UserContent(parts=[Part(text=message_text)]),
+            state_delta={"fen": fen},
+            run_config=run_config,
+        ):
+            timer.observe(event)
+            if event.partial:
+                if event.author != STREAMED_AGENT_NAME or not event.content or not event.content.parts:
+                    continue
+                chunk = "".join(part.text for part in event.content.parts if part.text and not part.thought)
+                partial_message = parser.feed(chunk)
+                if partial_message and (
+                    published_chars == 0
+                    or parser.complete
+                    or len(partial_message) - published_chars >= self.config.coaching_partial_min_chars
+                ):
+                    published_chars = len(partial_message)
+                    await on_partial(partial_message)
+                continue
+            events.append(event)
+            if event.content and event.content.parts and event.content.parts[0].text:
+                response_content = event.content.parts[0].text
+        timer.finish()
+        return response_content, events
+
+    async def _run_shared_coaching(
+        self, message_text: str, fen: str, on_partial: Optional[PartialCallback] = None
+    ) -> str:
+        """
+        Runs the legal move pipeline for a cacheable request in a throwaway
+        session, so the response can be shared between clients.
+        """
+        session_service = self.legal_move_runner.session_service
+        session = await session_service.create_session(
+            app_name=SESSION_APP_NAME, user_id=SHARED_COACHING_USER
+        )
+        self.log.info("Processing game state change for the coaching cache.", fen=fen)
+        try:
+            response_content, _ = await self._run_legal_move_runner(
+                SHARED_COACHING_USER, session.id, message_text, fen, on_partial
+            )
+            return response_content
+        finally:
+            await session_service.delete_session(
+                app_name=SESSION_APP_NAME, user_id=SHARED_COACHING_USER, session_id=session.id
+            )
+
+    async def _publish_degraded_coaching(self, message: dict, fen: str, ws_client: str):
+        """
+        Answers a game state that waited too long without the agent
+        pipeline: from the coaching cache if it has the position, otherwise
+        from the deterministic position summary.
+        """
+        WORK_SHED.labels(queue="coaching_work_queue", action="degraded").inc()
+        cache_key = self.coaching_cache.key_for(message, fen) if self.coaching_cache else None
+        cached = self.coaching_cache.responses.get(cache_key) if cache_key else None
+        if cached is not None:
+            response_content = cached
+        else:
+            with time_stage("coaching", "degraded_summary"):
+                summary = await self.position_analyzer.summarize(fen)
+            response_content = json.dumps(fallback_payload(summary, message))
+        self.log.info("Answering stale game state from the fallback tier.", fen=fen, cached=cached is not None)
+        await self.publish_coaching_message({"coaching_message": response_content}, ws_client)
+
+    async def _precompute_coaching(self, fen: str, move: str):
+        """
+        Fills the coaching cache for a speculative position reached by
+        ``move``, under the key a request playing that move looks up. Unlike
+        a real request this does not join or start a shared run, so
+        cancelling the speculation also stops the pipeline run.
+        """
+        message = {"game": {"fen": fen}, "move": move}
+        cache_key = self.coaching_cache.key_for(message, fen)
+        if cache_key is None or self.coaching_cache.responses.get(cache_key) is not None:
+            return
+        response_content = await self._run_shared_coaching(self.coaching_prompt(message), fen)
+        if response_content:
+            self.coaching_cache.responses.set(cache_key, response_content)
+
     async def process_illegal_move(self, message: dict):
         """Processes an illegal move event by invoking the illegal move runner."""
         ws_client = message.get("ws_client")
@@ -259,18 +840,32 @@ class AgentIOService:
             return
 
         try:
-            session = await self._get_or_create_session(
-                ws_client, self.illegal_move_runner
-            )
             fen = message.get("fen")
             if not fen:
                 self.log.error("No FEN in message for illegal move", message=message)
                 return
 
+            explainer = self.illegal_move_explainer
+            if explainer is None and self._should_degrade(message):
+                WORK_SHED.labels(queue="illegal_move_work_queue", action="degraded").inc()
+                explainer = self.fallback_illegal_move_explainer
+            if explainer:
+                with time_stage("illegal_move", "template"):
+                    explained = await self._explain_illegal_move(explainer, message, fen, ws_client)
+                if explained and (
+                    explainer is not self.illegal_move_explainer or not self.config.illegal_move_llm_enrichment
+                ):
+                    return
+
+            with time_stage("illegal_move", "session_lookup"):
+                session_id = await self._get_session_id(
+                    ws_client, self.illegal_move_runner
+                )
+
             self.log.info(
                 "Processing illegal move with session.",
                 fen=fen,
-                session_id=session.id,
+                session_id=session_id,
             )
 
             state_delta={
@@ -279,22 +874,23 @@ class AgentIOService:
                 "legal_moves": ", ".join(message.get('legalMoves', [])),
             }
 
-            response_content = ""
-            async for event in self.illegal_move_runner.run_async(
-                user_id=ws_client,
-                session_id=session.id,
-                new_message=UserContent(parts=[Part(text="An illegal move was attempted.")]),
-                state_delta=state_delta,
-            ):
-                if (
-                    event.content
-                    and event.content.parts
-                    and event.content.parts[0].text
-                ):
-                    response_content = event.content.parts[0].text
+            try:
+                response_content, events = await self._run_in_session(
+                    session_id, self._run_illegal_move_runner(ws_client, session_id, state_delta)
+                )
+            except SessionNotFoundError:
+                session_id = await self._refresh_session_id(ws_client, self.illegal_move_runner, session_id)
+                response_content, events = await self._run_in_session(
+                    session_id, self._run_illegal_move_runner(ws_client, session_id, state_delta)
+                )
 
             coaching_response = {"coaching_message": response_content}
-            await self.publish_coaching_message(coaching_response, ws_client)
+            with time_stage("illegal_move", "publish"):
+                await self.publish_coaching_message(coaching_response, ws_client)
+            with time_stage("illegal_move", "session_record"):
+                await self._record_session_turn(
+                    ws_client, self.illegal_move_runner, session_id, len(str(state_delta)), events
+                )
 
             self.log.info(
                 "📤 [ILLEGAL_MOVE_PROCESSOR] Response published successfully",
@@ -303,6 +899,7 @@ class AgentIOService:
             )
 
         except Exception as e:
+            self._invalidate_session(ws_client, self.illegal_move_runner)
             self.log.exception(
                 "❌ [ILLEGAL_MOVE_PROCESSOR] Processing failed",
                 client_id=ws_client,
@@ -314,15 +911,97 @@ class AgentIOService:
                 {"coaching_message": "{}"}, ws_client, is_error=True
             )
 
+    async def _run_illegal_move_runner(
+        self, user_id: str, session_id: str, state_delta: dict
+    ) -> tuple[str, list[Event]]:
+        """Runs the illegal move pipeline and returns its final text response and events."""
+        response_content = ""
+        events = []
+        timer = AgentStageTimer("illegal_move")
+        async for event in self.illegal_move_runner.run_async(
+            user_id=user_id,
+            session_id=session_id,
+            new_message=UserContent(parts=[Part(text="An illegal move was attempted.")]),
+            state_delta=state_delta,
+        ):
+            timer.observe(event)
+            events.append(event)
+            if (
+                event.content
+                and event.content.parts
+                and event.content.parts[0].text
+            ):
+                response_content = event.content.parts[0].text
+        timer.finish()
+        return response_content, events
+
+    async def _explain_illegal_move(
+        self, explainer: IllegalMoveExplainer, message: dict, fen: str, ws_client: str
+    ) -> bool:
+        """
+        Publishes the template explanation of an illegal move. Returns False
+        if the move could not be explained, so the LLM responder answers.
+        """
+        try:
+            explanation = explainer.explain(
+                fen, message.get("from"), message.get("to"), language=message.get("language")
+            )
+        except ValueError as e:
+            self.log.warning("Could not explain illegal move from templates.", fen=fen, error=str(e))
+            return False
+        self.log.info(
+            "⚡ [ILLEGAL_MOVE_PROCESSOR] Answered from templates",
+            client_id=ws_client,
+            trace_id=message.get("traceId", "no-trace"),
+            reason=explanation.reason,
+        )
+        await self.publish_coaching_message(
+            {"coaching_message": json.dumps(explanation.to_payload(message))}, ws_client
+        )
+        return True
+
     async def shutdown(self):
         """
         Gracefully shuts down the service.
         """
         self.log.info("Shutting down Agent IO Service...")
+        self.accepting_work = False
+        if self.speculator:
+            self.speculator.cancel()
         if self.redis_client:
             await self.redis_client.close()
             self.log.info("Redis connection closed.")
 
+    async def publish_partial_coaching_message(
+        self, partial_message: str, ws_client: str, trace_id: Optional[str] = None
+    ):
+        """
+        Publishes the coaching message decoded so far. Each partial message
+        carries the full text up to that point, so a dropped one is
+        harmless; failures are logged rather than failing the turn.
+        """
+        if not self.redis_client:
+            return
+        message_to_publish = {
+            "type": "coaching:message_partial",
+            "ws_client": ws_client,
+            "payload": {"message": partial_message},
+        }
+        self._add_trace_id(message_to_publish, trace_id)
+        try:
+            await self.redis_client.publish(
+                "coaching:message_partial", self.codec.encode(message_to_publish)
+            )
+        except Exception as e:
+            self.log.warning("Failed to publish partial coaching message", error=str(e))
+
+    @staticmethod
+    def _add_trace_id(message_to_publish: dict, trace_id: Optional[str] = None):
+        """Carries the work message's trace ID, by default the one being handled, into a published message."""
+        trace_id = trace_id or current_trace_id()
+        if trace_id:
+            message_to_publish["traceId"] = trace_id
+
     async def publish_coaching_message(self, coaching_response: dict, ws_client: str, is_error: bool = False):
         """
         Publishes the coaching message to the Redis event bus.
@@ -343,10 +1022,11 @@ class AgentIOService:
                     "ws_client": ws_client,
                     "payload": payload_object
                 }
+                self._add_trace_id(message_to_publish)
                 await self.redis_client.publish(
-                    "coaching:message_ready", json.dumps(message_to_publish)
+                    "coaching:message_ready", self.codec.encode(message_to_publish)
                 )
-                self.log.info("Published coaching message", response=message_to_publish)
+                self.log.debug("Published coaching message", response=message_to_publish)
         except json.JSONDecodeError:
             self.log.error("Failed to decode JSON from agent response", response=response_text)
             fallback_payload = {
@@ -356,8 +1036,9 @@ class AgentIOService:
                     "message": "I seem to be having trouble structuring my thoughts. Please try again."
                 }
             }
+            self._add_trace_id(fallback_payload)
             await self.redis_client.publish(
-                "coaching:message_ready", json.dumps(fallback_payload)
+                "coaching:message_ready", self.codec.encode(fallback_payload)
             )
         except Exception as e:
             self.log.exception("Error publishing coaching message")
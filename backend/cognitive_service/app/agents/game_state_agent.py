@@ -7,8 +7,15 @@ Author: Vyaakar Labs <r.raajey@gmail.com>
 Location: India
 License: MIT
 """
+from typing import AsyncGenerator
+
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.genai.types import Content, Part
+
+from app.tools.position_analyzer import PositionAnalyzer
 
-from google.adk.agents import LlmAgent
 
 class GameStateAgent(LlmAgent):
     """
@@ -16,3 +23,29 @@ class GameStateAgent(LlmAgent):
     """
     def __init__(self, model, instruction, **kwargs):
         super().__init__(model=model, instruction=instruction, **kwargs)
+
+
+class DeterministicGameStateAgent(BaseAgent):
+    """
+    Fills the game state analysis from python-chess and Stockfish instead of
+    an LLM call. Reads the ``fen`` state key and writes its report to
+    ``output_key``.
+    """
+    analyzer: PositionAnalyzer
+    output_key: str = "game_state_analysis"
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        fen = ctx.session.state.get("fen")
+        if fen:
+            analysis = await self.analyzer.describe(fen)
+        else:
+            analysis = "No position was provided."
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            content=Content(role="model", parts=[Part(text=analysis)]),
+            actions=EventActions(state_delta={self.output_key: analysis}),
+        )
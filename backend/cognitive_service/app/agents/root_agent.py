@@ -12,9 +12,11 @@ from google.adk.agents import LlmAgent, SequentialAgent, ParallelAgent
 from google.adk.models.base_llm import BaseLlm
 
 from app.agents.knowledge_agent import KnowledgeAgent
-from app.agents.game_state_agent import GameStateAgent
+from app.agents.game_state_agent import DeterministicGameStateAgent, GameStateAgent
 from app.agents.coaching_agent import CoachingAgent
+from app.config import settings
 from app.tools.agent_workflow_prompt_factory import AgentWorkflowPromptFactory
+from app.tools.position_analyzer import PositionAnalyzer
 from app.tools.rag_tool import ChessKnowledgeRetrieverTool
 
 
@@ -25,9 +27,6 @@ def create_root_agent(model: BaseLlm) -> SequentialAgent:
     prompt_factory = AgentWorkflowPromptFactory()
     rag_tool = ChessKnowledgeRetrieverTool()
 
-    game_state_instruction = prompt_factory.create_prompt(
-        "game_state_agent", context_keys=["fen"]
-    )
     knowledge_agent_instruction = prompt_factory.create_prompt(
         "knowledge_agent", context_keys=["fen"]
     )
@@ -36,12 +35,21 @@ def create_root_agent(model: BaseLlm) -> SequentialAgent:
         context_keys=["game_state_analysis", "retrieved_knowledge"],
     )
 
-    game_state_agent = GameStateAgent(
-        name="game_state_agent",
-        model=model,
-        instruction=game_state_instruction,
-        output_key="game_state_analysis",
-    )
+    if settings.game_state_analyzer == "deterministic":
+        game_state_agent = DeterministicGameStateAgent(
+            name="game_state_agent",
+            analyzer=PositionAnalyzer(),
+            output_key="game_state_analysis",
+        )
+    else:
+        game_state_agent = GameStateAgent(
+            name="game_state_agent",
+            model=model,
+            instruction=prompt_factory.create_prompt(
+                "game_state_agent", context_keys=["fen"]
+            ),
+            output_key="game_state_analysis",
+        )
     knowledge_agent = KnowledgeAgent(
         name="knowledge_agent",
         model=model,
@@ -9,7 +9,7 @@ Location: India
 License: MIT
 """
 import os
-from typing import Optional, Dict, Any
+from typing import Any, Dict, Literal, Optional
 
 from google.genai import types as genai_types
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -64,9 +64,139 @@ class Settings(BaseSettings):
 
     # Timeouts and Resilience
     genai_toolbox_timeout: float = 5.0
+    toolbox_max_concurrency: int = 16
+    toolbox_tool_refresh_interval: float = 300.0
     enable_caching: bool = True
     enable_fallbacks: bool = True
 
+    # RAG Result Cache
+    rag_cache_ttl: float = 300.0
+    rag_cache_max_entries: int = 1024
+    rag_cache_max_bytes: int = 16 * 1024 * 1024
+    rag_cache_sweep_interval: float = 60.0
+    enable_shared_cache: bool = True
+    rag_cache_namespace: str = "chessmate:rag_cache"
+    rag_cache_l2_ttl: int = 3600
+    rag_cache_compress_threshold: int = 1024
+
+    # Work Queue Consumption
+    coaching_queue_concurrency: int = 8
+    illegal_move_queue_concurrency: int = 4
+    work_queue_block_timeout: float = 1.0
+    queue_depth_sample_interval: float = 5.0
+    work_queue_transport: Literal["list", "streams"] = "list"
+    stream_consumer_group: str = "cognitive-service"
+    # Pending entries idle for this long are reclaimed from their consumer;
+    # keep it above coaching_work_max_age so running work is not taken twice.
+    stream_claim_min_idle: float = 180.0
+    stream_max_len: int = 10000
+    stream_max_deliveries: int = 5
+    coalesce_game_states: bool = True
+    # Deadlines: messages older than their queue's max age (or the message's
+    # own ttlMs/deadline) are dropped; older than degrade_after_queue_age
+    # they are answered without the LLM. 0 disables either check.
+    coaching_work_max_age: float = 120.0
+    illegal_move_work_max_age: float = 30.0
+    degrade_after_queue_age: float = 15.0
+    session_cache_ttl: float = 1800.0
+    session_cache_max_entries: int = 10000
+    # Codec for published messages: "json" and "orjson" write plain JSON,
+    # "msgpack" writes an enveloped binary payload. Consumed messages are
+    # decoded by their envelope whatever this is set to.
+    message_codec: Literal["json", "orjson", "msgpack"] = "orjson"
+
+    # Logging: hot-path events (one per consumed message) are sampled and
+    # rate limited per event; ADK debug tracing is toggled with SIGUSR1.
+    log_level: str = "INFO"
+    log_hot_path_sample_rate: float = 1.0
+    log_hot_path_max_per_second: float = 50.0
+    log_queue_size: int = 10000
+    adk_debug_logging: bool = False
+
+    # Tracing: "none", "file" (JSON lines at tracing_file_path) or "otlp"
+    # (needs opentelemetry-exporter-otlp-proto-http; the endpoint defaults
+    # to OTEL_EXPORTER_OTLP_TRACES_ENDPOINT or localhost:4318)
+    tracing_exporter: Literal["none", "file", "otlp"] = "none"
+    tracing_file_path: str = "logs/traces.jsonl"
+    tracing_otlp_endpoint: str = ""
+
+    # Prometheus metrics endpoint (served by the supervisor when it runs
+    # the workers); 0 disables it
+    metrics_host: str = "0.0.0.0"
+    metrics_port: int = 9100
+
+    # Worker Supervisor (python -m app.supervisor, opt-in); 0 workers means
+    # one per CPU. Session IDs and per-client coalescing are per process.
+    worker_processes: int = 1
+    worker_restart_max_backoff: float = 30.0
+    worker_shutdown_timeout: float = 20.0
+    metrics_multiproc_dir: str = "/tmp/chessmate_metrics"
+
+    # ADK Session Compaction
+    enable_session_compaction: bool = True
+    session_max_turns: int = 12
+    session_keep_turns: int = 4
+    session_max_bytes: int = 64 * 1024
+    session_summary_max_bytes: int = 4096
+
+    # Coaching Response Cache
+    # Off by default: cached coaching runs in a throwaway session, without
+    # the client's conversation history (and its session compaction).
+    # Game-state messages with "personalizedCoaching": true bypass the cache
+    # and are coached in the client's own session.
+    enable_coaching_cache: bool = False
+    coaching_cache_ttl: float = 3600.0
+    coaching_cache_max_entries: int = 2048
+    coaching_cache_max_bytes: int = 8 * 1024 * 1024
+
+    # Coaching Output Streaming
+    # Publishes coaching:message_partial events while the coaching agent is
+    # still writing, then coaching:message_ready as before.
+    stream_coaching_output: bool = True
+    coaching_partial_min_chars: int = 24
+
+    # Illegal Move Responder
+    # "template" explains illegal moves with python-chess and localized
+    # templates; "llm" keeps the illegal move agent. With enrichment the
+    # agent's reply follows the template one.
+    illegal_move_responder: Literal["template", "llm"] = "template"
+    illegal_move_language: str = "en"
+    illegal_move_llm_enrichment: bool = False
+
+    # Speculative Precomputation
+    # After coaching a position, precompute the analysis and RAG retrieval
+    # of the engine's top replies while the service is idle.
+    enable_speculation: bool = False
+    speculation_top_k: int = 2
+    speculation_cognitive_stage: Literal["novice", "developing", "expert"] = "novice"
+    speculate_coaching: bool = False
+
+    # Stockfish Engine Pool
+    stockfish_path: str = "/usr/games/stockfish"
+    engine_pool_size: int = 2
+    engine_threads: int = 1
+    engine_hash_mb: int = 16
+    engine_checkout_timeout: float = 2.0
+    # Engines idle for longer than this are pinged when next checked out.
+    engine_health_check_interval: float = 30.0
+
+    # Stockfish Analysis
+    # "deterministic" fills game_state_analysis from python-chess and
+    # Stockfish; "llm" keeps the GameStateAgent LLM call.
+    game_state_analyzer: Literal["deterministic", "llm"] = "deterministic"
+    analysis_time_limit: float = 0.1
+    analysis_multipv: int = 3
+    # Memory only by default; a SQLite path persists analyses across
+    # restarts and can be shared by the workers of one host.
+    analysis_cache_path: Optional[str] = None
+    analysis_cache_max_entries: int = 10000
+
+    # Opening Book
+    opening_book_path: Optional[str] = "data/opening_book.bin"
+    eco_index_path: Optional[str] = "data/eco.tsv"
+    opening_book_max_ply: int = 20
+    opening_book_moves: int = 3
+
     # ADK and LLM Configuration
     llm_provider: str = "gemini"
     llm_model: str = "gemini-1.5-flash-latest"
@@ -77,6 +207,18 @@ class Settings(BaseSettings):
     use_vertex_ai: bool = False
     gemini_api_base: str = "https://generativelanguage.googleapis.com/v1beta"
 
+    # LLM Response Cache
+    # "cache" answers identical LLM requests from the cache; "record" stores
+    # every response without expiry and "replay" answers only from stored
+    # responses, failing on a miss, for offline and deterministic runs.
+    # Record and replay need the "disk" backend.
+    llm_cache_mode: Literal["off", "cache", "record", "replay"] = "cache"
+    llm_cache_backend: Literal["memory", "disk"] = "memory"
+    llm_cache_ttl: float = 3600.0
+    llm_cache_max_entries: int = 4096
+    llm_cache_max_bytes: int = 32 * 1024 * 1024
+    llm_cache_path: str = "data/llm_cache.sqlite3"
+
     # Data Quality and Quarantine
     enable_data_quality_quarantine: bool = True
     quarantine_log_path: str = "data/quarantine.log"
@@ -28,3 +28,15 @@ class DatabaseConnectionError(ChessMateException):
 class ConfigurationError(ChessMateException):
     """Raised for missing or invalid configuration."""
     pass
+
+class EngineUnavailableError(ChessMateException):
+    """Raised when no chess engine can be checked out of the engine pool."""
+    pass
+
+class CodecError(ChessMateException):
+    """Raised when a queue or pub/sub payload cannot be decoded."""
+    pass
+
+class LlmCacheMissError(ChessMateException):
+    """Raised in replay mode when no response was recorded for an LLM request."""
+    pass
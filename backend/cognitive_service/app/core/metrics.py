@@ -1,13 +1,22 @@
-"""ChessMate Cognitive Service - Data Quality Metrics
+"""ChessMate Cognitive Service - Metrics
 
 This module defines the data structures used for tracking the quality
-and progress of data ingestion pipelines.
+and progress of data ingestion pipelines, and the Prometheus metrics
+recorded by the long-running cognitive service.
 
 Author: Vyaakar Labs <r.raajey@gmail.com>
 Location: India
 License: MIT
 """
+import os
+import time
+from contextlib import contextmanager
 from dataclasses import dataclass
+from typing import Iterator
+
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+
+from app.core.tracing import tracer
 
 
 @dataclass
@@ -37,3 +46,137 @@ class DataQualityMetrics:
             success_rate = (self.games_processed / self.games_found) * 100
             print(f"Success Rate: {success_rate:.2f}%")
         print("-------------------------\n")
+
+
+# --- Cognitive Service Metrics ---
+
+WORK_IN_FLIGHT = Gauge(
+    "chessmate_work_in_flight",
+    "Messages currently being processed, per work queue.",
+    ["queue"],
+    multiprocess_mode="livesum",
+)
+WORK_QUEUE_DEPTH = Gauge(
+    "chessmate_work_queue_depth",
+    "Messages waiting in each work queue, sampled periodically.",
+    ["queue"],
+    multiprocess_mode="livemax",
+)
+WORK_QUEUE_WAIT_SECONDS = Histogram(
+    "chessmate_work_queue_wait_seconds",
+    "Time a message spent in the Redis work queue before being dequeued.",
+    ["queue"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300),
+)
+GAME_STATES_SUPERSEDED = Counter(
+    "chessmate_game_states_superseded_total",
+    "Game-state messages not coached because a newer position for the same "
+    "client arrived, by whether they were still queued or already in flight.",
+    ["stage"],
+)
+OPENING_BOOK_LOOKUPS = Counter(
+    "chessmate_opening_book_lookups_total",
+    "Game-state positions looked up in the opening book, by hit or miss.",
+    ["result"],
+)
+COACHING_CACHE_LOOKUPS = Counter(
+    "chessmate_coaching_cache_lookups_total",
+    "Cacheable game-state requests, by whether they were served from the "
+    "coaching cache, joined a run in flight or started a new run.",
+    ["result"],
+)
+SPECULATIVE_POSITIONS = Counter(
+    "chessmate_speculative_positions_total",
+    "Positions precomputed ahead of a client's next move, by whether the "
+    "client then sent that position (hit), another one (wasted), or the "
+    "work was cancelled by real work before it finished.",
+    ["outcome"],
+)
+WORK_SHED = Counter(
+    "chessmate_work_shed_total",
+    "Messages dropped because their deadline passed (expired) or answered by "
+    "the cheap fallback tier because they waited too long (degraded).",
+    ["queue", "action"],
+)
+LLM_CACHE_LOOKUPS = Counter(
+    "chessmate_llm_cache_lookups_total",
+    "LLM requests looked up in the response cache, by hit or miss.",
+    ["result"],
+)
+PIPELINE_STAGE_SECONDS = Histogram(
+    "chessmate_pipeline_stage_seconds",
+    "Time spent in each stage of the coaching, illegal move and RAG "
+    "pipelines; agent stages are labelled agent:<sub-agent name>.",
+    ["pipeline", "stage"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+CACHE_ENTRIES = Gauge(
+    "chessmate_cache_entries",
+    "Entries held in each in-process cache, sampled periodically.",
+    ["cache"],
+    multiprocess_mode="livesum",
+)
+CACHE_BYTES = Gauge(
+    "chessmate_cache_bytes",
+    "Approximate bytes held in each size-bounded in-process cache, sampled periodically.",
+    ["cache"],
+    multiprocess_mode="livesum",
+)
+
+
+@contextmanager
+def time_stage(pipeline: str, stage: str) -> Iterator[None]:
+    """
+    Records how long the block takes, whether or not it raises, and traces
+    it as a ``<pipeline>.<stage>`` span.
+    """
+    start = time.perf_counter()
+    try:
+        with tracer.start_as_current_span(f"{pipeline}.{stage}"):
+            yield
+    finally:
+        PIPELINE_STAGE_SECONDS.labels(pipeline=pipeline, stage=stage).observe(time.perf_counter() - start)
+
+
+class AgentStageTimer:
+    """
+    Times each sub-agent of an ADK run from the authors of the events it
+    yields: a sub-agent's stage runs from the end of the previous stage to
+    its own last event.
+    """
+
+    def __init__(self, pipeline: str):
+        self.pipeline = pipeline
+        self.author = None
+        self.started = self.last_event = time.perf_counter()
+
+    def observe(self, event) -> None:
+        now = time.perf_counter()
+        author = getattr(event, "author", None) or "unknown"
+        if author != self.author:
+            self._record()
+            self.author = author
+            self.started = self.last_event
+        self.last_event = now
+
+    def finish(self) -> None:
+        self._record()
+        self.author = None
+
+    def _record(self) -> None:
+        if self.author is not None:
+            PIPELINE_STAGE_SECONDS.labels(pipeline=self.pipeline, stage=f"agent:{self.author}").observe(
+                self.last_event - self.started
+            )
+
+
+def start_metrics_server(port: int, host: str = "0.0.0.0") -> bool:
+    """
+    Serves this process's metrics over HTTP. Workers started by the
+    supervisor leave this to the supervisor, which serves the combined
+    metrics of all workers. Returns whether a server was started.
+    """
+    if not port or os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        return False
+    start_http_server(port, addr=host)
+    return True
@@ -0,0 +1,194 @@
+"""ChessMate Cognitive Service - Tracing
+
+This module sets up OpenTelemetry tracing for the cognitive service. Each
+work message becomes one trace: the gateway's ``traceId`` is mapped to an
+OpenTelemetry trace ID, so every span recorded for the message, including
+the agent, LLM and tool spans the ADK emits itself, can be found from the
+ID the gateway logged. A W3C ``traceparent`` on the message takes
+precedence when a producer sends one.
+
+Spans are exported in the background to a JSON-lines file or, when the
+OTLP exporter is installed, to a collector.
+
+Author: Vyaakar Labs <r.raajey@gmail.com>
+Location: India
+License: MIT
+"""
+import contextvars
+import hashlib
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional, Sequence
+
+import structlog
+from opentelemetry import context as otel_context
+from opentelemetry import propagate, trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import ReadableSpan, TracerProvider
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor,
+    SpanExporter,
+    SpanExportResult,
+)
+from opentelemetry.trace import NonRecordingSpan, SpanContext, TraceFlags
+
+from app.core.exceptions import ConfigurationError
+
+log = structlog.get_logger()
+
+tracer = trace.get_tracer("chessmate.cognitive_service")
+
+# The gateway trace ID of the message being handled by the current task.
+_current_trace_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "chessmate_trace_id", default=None
+)
+
+
+def current_trace_id() -> Optional[str]:
+    """Returns the gateway trace ID of the message being handled, if any."""
+    return _current_trace_id.get()
+
+
+def _digest(gateway_trace_id: str) -> bytes:
+    return hashlib.sha256(gateway_trace_id.encode("utf-8")).digest()
+
+
+def trace_id_for(gateway_trace_id: str) -> int:
+    """Maps a gateway trace ID to a stable, non-zero 128-bit OpenTelemetry trace ID."""
+    return int.from_bytes(_digest(gateway_trace_id)[:16], "big") or 1
+
+
+def parent_context(message: dict) -> otel_context.Context:
+    """
+    Returns the context to start a message's spans in: the message's W3C
+    ``traceparent`` if it has one, otherwise a remote parent whose trace
+    ID is derived from the gateway ``traceId``.
+    """
+    if message.get("traceparent"):
+        return propagate.extract({"traceparent": message["traceparent"]})
+    gateway_trace_id = message.get("traceId")
+    if not gateway_trace_id:
+        return otel_context.Context()
+    parent = SpanContext(
+        trace_id=trace_id_for(str(gateway_trace_id)),
+        span_id=int.from_bytes(_digest(str(gateway_trace_id))[16:24], "big") or 1,
+        is_remote=True,
+        trace_flags=TraceFlags(TraceFlags.SAMPLED),
+    )
+    return trace.set_span_in_context(NonRecordingSpan(parent))
+
+
+def record_dequeue(queue: str, message: dict, queue_age: Optional[float]):
+    """
+    Records a span for the time a message waited in its queue, from the
+    gateway's enqueue stamp until it was dequeued.
+    """
+    if queue_age is None:
+        return
+    now_ns = time.time_ns()
+    span = tracer.start_span(
+        "dequeue",
+        context=parent_context(message),
+        start_time=now_ns - int(queue_age * 1e9),
+        attributes=_message_attributes(queue, message),
+    )
+    span.end(end_time=now_ns)
+
+
+@contextmanager
+def work_span(queue: str, message: dict) -> Iterator[trace.Span]:
+    """
+    Handles a message inside its trace: the span of the whole handler is
+    current, and the gateway trace ID is available to publishers and bound
+    into the log context of the running task.
+    """
+    gateway_trace_id = message.get("traceId")
+    token = _current_trace_id.set(gateway_trace_id)
+    if gateway_trace_id:
+        structlog.contextvars.bind_contextvars(trace_id=gateway_trace_id)
+    try:
+        with tracer.start_as_current_span(
+            f"handle {queue}",
+            context=parent_context(message),
+            attributes=_message_attributes(queue, message),
+        ) as span:
+            yield span
+    finally:
+        if gateway_trace_id:
+            structlog.contextvars.unbind_contextvars("trace_id")
+        _current_trace_id.reset(token)
+
+
+def _message_attributes(queue: str, message: dict) -> dict:
+    attributes = {"messaging.destination.name": queue}
+    for key, attribute in (
+        ("traceId", "chessmate.trace_id"),
+        ("ws_client", "chessmate.client_id"),
+        ("type", "chessmate.message_type"),
+    ):
+        if message.get(key):
+            attributes[attribute] = str(message[key])
+    return attributes
+
+
+class JsonLinesSpanExporter(SpanExporter):
+    """Appends finished spans to a file, one JSON object per line."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        lines = [json.dumps(self.to_dict(span)) + "\n" for span in spans]
+        try:
+            with self._lock, open(self.path, "a", encoding="utf-8") as f:
+                f.writelines(lines)
+        except OSError as e:
+            log.warning("TRACE_EXPORT_FAILED", path=self.path, error=str(e))
+            return SpanExportResult.FAILURE
+        return SpanExportResult.SUCCESS
+
+    @staticmethod
+    def to_dict(span: ReadableSpan) -> dict:
+        context = span.get_span_context()
+        return {
+            "name": span.name,
+            "trace_id": f"{context.trace_id:032x}",
+            "span_id": f"{context.span_id:016x}",
+            "parent_span_id": f"{span.parent.span_id:016x}" if span.parent else None,
+            "start_time_ns": span.start_time,
+            "end_time_ns": span.end_time,
+            "duration_ms": round((span.end_time - span.start_time) / 1e6, 3),
+            "status": span.status.status_code.name,
+            "attributes": dict(span.attributes or {}),
+        }
+
+
+def setup_tracing(exporter: str, file_path: str = "", otlp_endpoint: str = "", service_name: str = "chessmate-cognitive-service"):
+    """
+    Installs a tracer provider exporting to ``exporter``: "file", "otlp"
+    or "none". Spans are batched and exported by a background thread.
+    """
+    if exporter == "none":
+        return
+    if exporter == "file":
+        span_exporter = JsonLinesSpanExporter(file_path)
+    elif exporter == "otlp":
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import (
+                OTLPSpanExporter,
+            )
+        except ImportError as e:
+            raise ConfigurationError(
+                "TRACING_EXPORTER=otlp needs the opentelemetry-exporter-otlp-proto-http package."
+            ) from e
+        span_exporter = OTLPSpanExporter(endpoint=otlp_endpoint) if otlp_endpoint else OTLPSpanExporter()
+    else:
+        raise ConfigurationError(f"Unknown tracing exporter: {exporter}")
+
+    provider = TracerProvider(resource=Resource.create({"service.name": service_name}))
+    provider.add_span_processor(BatchSpanProcessor(span_exporter))
+    trace.set_tracer_provider(provider)
+    log.info("Tracing enabled.", exporter=exporter)
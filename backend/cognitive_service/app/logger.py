@@ -3,45 +3,202 @@
 This file configures a structured, centralized logger using structlog.
 Adheres to the project's coding standards for high-value, low-noise logging.
 
+Log records are handed to a bounded queue and rendered and written by a
+background thread, so formatting and stdout writes never block the event
+loop. Info and debug events on the per-message hot path are sampled and
+rate limited, and ADK debug tracing can be switched on and off at runtime.
+
 Author: Vyaakar Labs <r.raajey@gmail.com>
 Location: India
 License: MIT
 """
+import atexit
 import datetime
 import logging
+import logging.handlers
+import queue
+import random
 import sys
+import time
+from typing import Optional
 
 import structlog
 
+ADK_LOGGER_NAME = "google_adk"
+
+# Events tagged with these are logged for every consumed message.
+HOT_PATH_TAGS = ("[PYTHON_CONSUMER]", "[PYTHON_PROCESSOR]", "[PYTHON_ROUTER]")
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
 
 # Custom processor to convert UTC timestamps to IST
 def to_ist(logger, method_name, event_dict):
     event_dict["timestamp"] = datetime.datetime.now(datetime.timezone(datetime.timedelta(hours=5, minutes=30))).strftime("%Y-%m-%d %H:%M:%S")
     return event_dict
 
-def setup_logging():
+
+def capture_exc_info(logger, method_name, event_dict):
+    """
+    Resolves ``exc_info=True`` to the exception being handled, which the
+    writer thread could not do later.
+    """
+    if event_dict.get("exc_info") is True:
+        event_dict["exc_info"] = sys.exc_info()
+    return event_dict
+
+
+class HotPathSampler:
+    """
+    A structlog processor that keeps a ``sample_rate`` share of hot-path
+    events, and at most ``max_per_second`` of each event per second.
+    Warnings and errors are never dropped.
+    """
+
+    def __init__(self, sample_rate: float = 1.0, max_per_second: float = 0, tags: tuple[str, ...] = HOT_PATH_TAGS):
+        self.sample_rate = sample_rate
+        self.max_per_second = max_per_second
+        self.tags = tags
+        self.dropped = 0
+        self._windows: dict[str, list] = {}
+
+    def __call__(self, logger, method_name, event_dict):
+        if method_name not in ("debug", "info"):
+            return event_dict
+        event = str(event_dict.get("event", ""))
+        if not any(tag in event for tag in self.tags):
+            return event_dict
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            self._drop()
+        if self.max_per_second > 0:
+            now = time.monotonic()
+            window = self._windows.setdefault(event, [now, 0])
+            if now - window[0] >= 1.0:
+                window[0], window[1] = now, 0
+            if window[1] >= self.max_per_second:
+                self._drop()
+            window[1] += 1
+        return event_dict
+
+    def _drop(self):
+        self.dropped += 1
+        raise structlog.DropEvent
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Puts records on the queue as they are, leaving formatting to the
+    writer thread, and drops them rather than blocking when it is full.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def is_enabled_for(level: int, name: Optional[str] = None) -> bool:
+    """
+    Returns whether a level is logged, so callers can skip building
+    expensive log arguments.
+    """
+    return logging.getLogger(name).isEnabledFor(level)
+
+
+def set_adk_debug(enabled: bool):
+    """
+    Switches ADK debug tracing on or off. When off, the ADK logger follows
+    the root level.
+    """
+    logging.getLogger(ADK_LOGGER_NAME).setLevel(logging.DEBUG if enabled else logging.NOTSET)
+
+
+def toggle_adk_debug() -> bool:
+    """Flips ADK debug tracing and returns whether it is now on."""
+    enabled = logging.getLogger(ADK_LOGGER_NAME).level != logging.DEBUG
+    set_adk_debug(enabled)
+    return enabled
+
+
+def setup_logging(
+    level: str = "INFO",
+    hot_path_sample_rate: float = 1.0,
+    hot_path_max_per_second: float = 0,
+    queue_size: int = 10000,
+    adk_debug: bool = False,
+):
     """
     Configures structlog for the application.
     """
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(message)s",
-        stream=sys.stdout,
+    global _listener
+    if _listener is None:
+        atexit.register(stop_logging)
+    else:
+        _listener.stop()
+
+    log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+    writer = logging.StreamHandler(sys.stdout)
+    writer.setFormatter(
+        structlog.stdlib.ProcessorFormatter(
+            processor=structlog.dev.ConsoleRenderer(),
+            foreign_pre_chain=[
+                structlog.stdlib.add_log_level,
+                structlog.stdlib.add_logger_name,
+                to_ist,
+            ],
+        )
     )
+    _listener = logging.handlers.QueueListener(log_queue, writer, respect_handler_level=True)
+    _listener.start()
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(NonBlockingQueueHandler(log_queue))
+    root.setLevel(level.upper())
 
     structlog.configure(
         processors=[
+            structlog.stdlib.filter_by_level,
+            structlog.contextvars.merge_contextvars,
+            HotPathSampler(hot_path_sample_rate, hot_path_max_per_second),
             structlog.stdlib.add_log_level,
             structlog.stdlib.add_logger_name,
             to_ist,
             structlog.processors.StackInfoRenderer(),
             structlog.dev.set_exc_info,
-            structlog.dev.ConsoleRenderer(),
+            capture_exc_info,
+            structlog.stdlib.ProcessorFormatter.wrap_for_formatter,
         ],
         logger_factory=structlog.stdlib.LoggerFactory(),
         wrapper_class=structlog.stdlib.BoundLogger,
         cache_logger_on_first_use=True,
     )
+    set_adk_debug(adk_debug)
+
+
+def setup_logging_from(config):
+    """Configures logging from the application settings."""
+    setup_logging(
+        level=config.log_level,
+        hot_path_sample_rate=config.log_hot_path_sample_rate,
+        hot_path_max_per_second=config.log_hot_path_max_per_second,
+        queue_size=config.log_queue_size,
+        adk_debug=config.adk_debug_logging,
+    )
+
 
-# Call setup function immediately to configure logging upon import
-setup_logging()
+def stop_logging():
+    """Writes out the records still queued and stops the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
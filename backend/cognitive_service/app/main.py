@@ -1,5 +1,4 @@
 import asyncio
-import logging
 import os
 import signal
 
@@ -10,6 +9,16 @@ from google.adk.sessions.database_session_service import DatabaseSessionService
 from app.agent_io_service import AgentIOService
 from app.agents.root_agent import create_root_agent, create_illegal_move_root_agent
 from app.config import settings, configure_llm_provider, create_llm_model
+from app.core.exceptions import EngineUnavailableError
+from app.core.metrics import start_metrics_server
+from app.core.tracing import setup_tracing
+from app.logger import setup_logging_from, toggle_adk_debug
+from app.services.analysis_cache import analysis_cache
+from app.services.engine_pool import engine_pool
+from app.services.llm_cache import CachedLlm, with_response_cache
+from app.services.opening_book import opening_book
+from app.services.redis_cache import rag_cache
+from app.services.toolbox_client import toolbox_client
 
 log = structlog.get_logger()
 
@@ -18,35 +27,28 @@ async def main():
     """
     Main entry point for the ChessMate Cognitive Service.
     """
-    # --- High-Value ADK Trace Configuration ---
-    # The following lines are critical for debugging the ADK framework.
-    # They configure the root 'google_adk' logger to output DEBUG level
-    # messages, providing deep insight into the internal operations of agents,
-    # planners, and tool-calling mechanisms.
-
-    adk_logger = logging.getLogger("google_adk")
-    adk_logger.setLevel(logging.DEBUG)
-    stream_handler = logging.StreamHandler()
-    formatter = logging.Formatter(
-        "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-    )
-    stream_handler.setFormatter(formatter)
-    adk_logger.addHandler(stream_handler)
-    adk_logger.propagate = False
-    # --- End ADK Trace Configuration ---
+    # Logs are written off the event loop. ADK debug tracing gives deep
+    # insight into agents, planners and tool calls but is costly, so it is
+    # off unless ADK_DEBUG_LOGGING is set, and SIGUSR1 toggles it at runtime.
+    setup_logging_from(settings)
+    setup_tracing(settings.tracing_exporter, settings.tracing_file_path, settings.tracing_otlp_endpoint)
 
     log.info("-------------------------------------------------")
     log.info("--- Starting ChessMate Cognitive Service... ---")
     log.info("-------------------------------------------------")
 
     agent_io_service = None
+    llm_model = None
     try:
-        # 1. Log the configuration
+        # 1. Log the configuration and serve metrics
         log.info("Configuration loaded.", config=settings.model_dump())
+        if start_metrics_server(settings.metrics_port, settings.metrics_host):
+            log.info("Serving Prometheus metrics.", port=settings.metrics_port)
 
-        # 2. Configure and create the LLM model
+        # 2. Configure and create the LLM model, answering identical
+        # requests from the response cache
         configure_llm_provider(settings)
-        llm_model = create_llm_model(settings)
+        llm_model = with_response_cache(create_llm_model(settings), settings)
         log.info("LLM model created successfully.")
 
         # 3. Create the root agents, injecting the model dependency
@@ -81,12 +83,22 @@ async def main():
             )
         log.info("ADK Runners created.")
 
-        # 5. Create and start the AgentIOService
+        # 5. Warm up the Stockfish engine pool
+        try:
+            await engine_pool.start()
+        except EngineUnavailableError:
+            log.warning("Stockfish engine pool unavailable; RAG queries will use basic terms.")
+
+        # 6. Map the opening book so book positions skip the agent pipeline
+        opening_book.load()
+
+        # 7. Create and start the AgentIOService
         log.info("Creating AgentIOService...")
         agent_io_service = AgentIOService(
             settings,
             legal_move_runner=legal_move_runner,
             illegal_move_runner=illegal_move_runner,
+            opening_book=opening_book,
         )
 
         loop = asyncio.get_running_loop()
@@ -95,6 +107,10 @@ async def main():
                 sig,
                 lambda s=sig: asyncio.create_task(shutdown(s, agent_io_service))
             )
+        loop.add_signal_handler(
+            signal.SIGUSR1,
+            lambda: log.info("ADK debug tracing toggled.", enabled=toggle_adk_debug()),
+        )
 
         log.info("Starting Agent IO Service listener...")
         await agent_io_service.start()
@@ -107,6 +123,13 @@ async def main():
     finally:
         if agent_io_service:
             await agent_io_service.shutdown()
+        await engine_pool.close()
+        analysis_cache.close()
+        if isinstance(llm_model, CachedLlm):
+            llm_model.close()
+        opening_book.close()
+        await rag_cache.close()
+        await toolbox_client.close()
         log.info("--- ChessMate Cognitive Service has shut down. ---")
 
 
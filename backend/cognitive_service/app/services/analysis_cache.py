@@ -0,0 +1,250 @@
+"""ChessMate Cognitive Service - Analysis Cache
+
+This module provides a two-tier transposition cache for Stockfish analyses.
+Positions are keyed by their Zobrist hash, which ignores the halfmove and
+fullmove clocks, so the same position reached by different move orders or
+at a different move number shares one entry. A bounded in-memory LRU tier
+sits in front of a SQLite tier that survives restarts.
+
+Author: Vyaakar Labs <r.raajey@gmail.com>
+Location: India
+License: MIT
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from typing import Any, Optional
+
+import chess
+import chess.engine
+import chess.polyglot
+import structlog
+
+from app.config import settings
+
+log = structlog.get_logger()
+
+
+def position_key(board: chess.Board) -> str:
+    """Returns the clock-independent cache key for a position."""
+    return f"{chess.polyglot.zobrist_hash(board):016x}"
+
+
+@dataclass
+class PositionAnalysis:
+    """A serializable summary of a MultiPV engine analysis."""
+    lines: list[dict[str, Any]] = field(default_factory=list)
+    depth: int = 0
+    time: float = 0.0
+    multipv: int = 0
+
+    @classmethod
+    def from_engine_info(
+        cls,
+        board: chess.Board,
+        infos: list[chess.engine.InfoDict],
+        limit: chess.engine.Limit,
+        multipv: int,
+    ) -> "PositionAnalysis":
+        """
+        Builds an analysis from the InfoDicts returned by ``engine.analyse``.
+        The requested MultiPV is recorded even when the position has fewer
+        legal moves, so the entry still answers identical requests.
+        """
+        lines = []
+        for info in infos:
+            score = info.get("score")
+            relative = score.pov(board.turn) if score else None
+            lines.append({
+                "pv": [move.uci() for move in info.get("pv", [])],
+                "score_cp": relative.score() if relative else None,
+                "mate": relative.mate() if relative else None,
+            })
+        depth = max((info.get("depth", 0) for info in infos), default=0)
+        elapsed = max((info.get("time", 0.0) for info in infos), default=0.0)
+        return cls(
+            lines=lines,
+            depth=depth,
+            time=max(elapsed, limit.time or 0.0),
+            multipv=multipv,
+        )
+
+    def satisfies(self, limit: chess.engine.Limit, multipv: int) -> bool:
+        """
+        Returns True if this analysis is at least as deep as the request, so a
+        deeper cached result can answer a shallower request.
+        """
+        if self.multipv < multipv:
+            return False
+        if limit.depth is not None:
+            return self.depth >= limit.depth
+        if limit.time is not None:
+            return self.time >= limit.time
+        return True
+
+    def is_deeper_than(self, other: "PositionAnalysis") -> bool:
+        return self.depth >= other.depth and self.multipv >= other.multipv
+
+    def best_moves(self, board: chess.Board) -> list[chess.Move]:
+        """Returns the first move of every principal variation."""
+        moves = []
+        for line in self.lines:
+            if line["pv"]:
+                move = chess.Move.from_uci(line["pv"][0])
+                if move in board.legal_moves:
+                    moves.append(move)
+        return moves
+
+
+class AnalysisCache:
+    """
+    A transposition cache with an in-memory LRU tier and an optional
+    persistent SQLite tier.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = 10000):
+        self.path = path
+        self.max_entries = max_entries
+        self._memory: OrderedDict[str, PositionAnalysis] = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    async def get(
+        self, board: chess.Board, limit: chess.engine.Limit, multipv: int = 1
+    ) -> Optional[PositionAnalysis]:
+        """
+        Returns a cached analysis that satisfies the requested limit, if any.
+        """
+        key = position_key(board)
+        analysis = self._memory.get(key)
+        if analysis and analysis.satisfies(limit, multipv):
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            return analysis
+
+        if self.path:
+            stored = await asyncio.to_thread(self._load, key)
+            if stored and stored.satisfies(limit, multipv):
+                self._remember(key, stored)
+                self.disk_hits += 1
+                return stored
+
+        self.misses += 1
+        return None
+
+    async def put(self, board: chess.Board, analysis: PositionAnalysis) -> None:
+        """
+        Stores an analysis unless a deeper one is already cached.
+        """
+        key = position_key(board)
+        current = self._memory.get(key)
+        if current and not analysis.is_deeper_than(current):
+            return
+        self._remember(key, analysis)
+        if self.path:
+            await asyncio.to_thread(self._store, key, analysis)
+
+    def stats(self) -> dict[str, int]:
+        """Returns the cache's counters."""
+        return {
+            "entries": len(self._memory),
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+        }
+
+    def close(self) -> None:
+        with self._db_lock:
+            if self._db:
+                self._db.close()
+                self._db = None
+
+    def _remember(self, key: str, analysis: PositionAnalysis) -> None:
+        self._memory[key] = analysis
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._db is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Worker processes can share the file: wait for their locks
+            # instead of failing with "database is locked".
+            self._db = sqlite3.connect(self.path, timeout=10.0, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS position_analysis (
+                    key TEXT PRIMARY KEY,
+                    depth INTEGER NOT NULL,
+                    time REAL NOT NULL,
+                    multipv INTEGER NOT NULL,
+                    lines TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+        return self._db
+
+    def _load(self, key: str) -> Optional[PositionAnalysis]:
+        try:
+            with self._db_lock:
+                row = self._connection().execute(
+                    "SELECT depth, time, multipv, lines FROM position_analysis WHERE key = ?",
+                    (key,),
+                ).fetchone()
+        except sqlite3.Error as e:
+            log.error("ANALYSIS_CACHE_READ_FAILED", error=str(e), path=self.path)
+            return None
+        if not row:
+            return None
+        depth, elapsed, multipv, lines = row
+        return PositionAnalysis(lines=json.loads(lines), depth=depth, time=elapsed, multipv=multipv)
+
+    def _store(self, key: str, analysis: PositionAnalysis) -> None:
+        record = asdict(analysis)
+        try:
+            with self._db_lock:
+                db = self._connection()
+                db.execute(
+                    """
+                    INSERT INTO position_analysis (key, depth, time, multipv, lines, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(key) DO UPDATE SET
+                        depth = excluded.depth,
+                        time = excluded.time,
+                        multipv = excluded.multipv,
+                        lines = excluded.lines,
+                        updated_at = excluded.updated_at
+                    WHERE excluded.depth >= position_analysis.depth
+                        AND excluded.multipv >= position_analysis.multipv
+                    """,
+                    (
+                        key,
+                        record["depth"],
+                        record["time"],
+                        record["multipv"],
+                        json.dumps(record["lines"], separators=(",", ":")),
+                        time.time(),
+                    ),
+                )
+                db.commit()
+        except sqlite3.Error as e:
+            log.error("ANALYSIS_CACHE_WRITE_FAILED", error=str(e), path=self.path)
+
+
+analysis_cache = AnalysisCache(
+    path=settings.analysis_cache_path,
+    max_entries=settings.analysis_cache_max_entries,
+)
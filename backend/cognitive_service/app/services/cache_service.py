@@ -1,45 +1,201 @@
 """ChessMate Cognitive Service - Cache Service
 
-This module provides a simple in-memory cache with a Time-To-Live (TTL)
+This module provides a bounded in-memory cache with a Time-To-Live (TTL)
 to reduce redundant calls to the RAG service for identical queries.
+Entries are evicted in least-recently-used order once the entry or byte
+budget is exceeded, expired entries are swept periodically rather than
+only when read, and concurrent misses for the same key share one load.
 
 Author: Vyaakar Labs <r.raajey@gmail.com>
 Location: India
 License: MIT
 """
+import asyncio
+import json
+import sys
 import time
-from typing import Any, Optional
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Optional
 
+import structlog
 
-class InMemoryCache:
+from app.config import settings
+
+log = structlog.get_logger()
+
+
+@dataclass
+class CacheEntry:
+    value: Any
+    expires_at: float
+    size: int
+
+
+def estimate_size(value: Any) -> int:
+    """
+    Estimates the memory footprint of a cached value in bytes. RAG payloads
+    are JSON-like, so their serialized length is a cheap, stable proxy.
+    """
+    try:
+        return len(json.dumps(value, separators=(",", ":"), default=str))
+    except (TypeError, ValueError):
+        return sys.getsizeof(value)
+
+
+class BoundedTTLCache:
     """
-    A simple in-memory cache with TTL support.
+    An in-memory LRU cache bounded by entry count and approximate byte size,
+    with TTL expiry and per-key single-flight loading.
     """
-    def __init__(self, ttl: int = 300):
-        self.cache: dict[str, dict[str, Any]] = {}
+    def __init__(
+        self,
+        ttl: float = 300,
+        max_entries: int = 1024,
+        max_bytes: int = 16 * 1024 * 1024,
+        sweep_interval: float = 60,
+    ):
+        self.cache: OrderedDict[str, CacheEntry] = OrderedDict()
         self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self.total_bytes = 0
+        self._last_sweep = time.monotonic()
+        self._in_flight: dict[str, asyncio.Task] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.coalesced = 0
 
     def get(self, key: str) -> Optional[Any]:
         """
         Retrieves an item from the cache if it exists and has not expired.
         """
-        if key not in self.cache:
+        self.maybe_sweep()
+        entry = self.cache.get(key)
+        if entry is None:
+            self.misses += 1
             return None
 
-        entry = self.cache[key]
-        if time.time() - entry['timestamp'] > self.ttl:
-            del self.cache[key]
+        if entry.expires_at <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
             return None
 
-        return entry['value']
+        self.cache.move_to_end(key)
+        self.hits += 1
+        return entry.value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """
+        Adds an item to the cache, evicting the least recently used entries
+        if the cache is over budget. Values larger than the whole byte
+        budget are not cached.
+        """
+        self.maybe_sweep()
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            log.warn("CACHE_VALUE_TOO_LARGE", key=key, size=size, max_bytes=self.max_bytes)
+            return
+
+        if key in self.cache:
+            self._remove(key)
+        self.cache[key] = CacheEntry(
+            value=value,
+            expires_at=time.monotonic() + (self.ttl if ttl is None else ttl),
+            size=size,
+        )
+        self.total_bytes += size
 
-    def set(self, key: str, value: Any):
+        while len(self.cache) > self.max_entries or self.total_bytes > self.max_bytes:
+            oldest_key = next(iter(self.cache))
+            self._remove(oldest_key)
+            self.evictions += 1
+
+    def delete(self, key: str):
+        """Removes an item from the cache if it is present."""
+        if key in self.cache:
+            self._remove(key)
+
+    async def get_or_load(
+        self, key: str, loader: Callable[[], Awaitable[Any]], ttl: Optional[float] = None
+    ) -> Any:
+        """
+        Returns the cached value for ``key``, calling ``loader`` on a miss.
+        Concurrent callers that miss on the same key wait for the first
+        caller's load instead of starting their own; a failed load is
+        propagated to every waiter and nothing is cached. The load runs in
+        its own task, so a caller that is cancelled stops waiting without
+        cancelling the load the other callers are waiting on.
+        """
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return await asyncio.shield(task)
+
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+
+        task = asyncio.create_task(self._load(key, loader, ttl))
+        self._in_flight[key] = task
+        # Retrieve the exception so a load nobody awaits any more does not warn.
+        task.add_done_callback(lambda done: done.cancelled() or done.exception())
+        return await asyncio.shield(task)
+
+    async def _load(self, key: str, loader: Callable[[], Awaitable[Any]], ttl: Optional[float]) -> Any:
+        try:
+            value = await loader()
+            self.set(key, value, ttl=ttl)
+            return value
+        finally:
+            del self._in_flight[key]
+
+    def sweep(self) -> int:
         """
-        Adds an item to the cache with the current timestamp.
+        Removes every expired entry and returns how many were removed.
         """
-        self.cache[key] = {
-            'value': value,
-            'timestamp': time.time()
+        now = time.monotonic()
+        self._last_sweep = now
+        expired = [key for key, entry in self.cache.items() if entry.expires_at <= now]
+        for key in expired:
+            self._remove(key)
+        self.expirations += len(expired)
+        return len(expired)
+
+    def stats(self) -> dict[str, int]:
+        """Returns the cache's size and hit/miss/eviction counters."""
+        return {
+            "entries": len(self.cache),
+            "bytes": self.total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "coalesced": self.coalesced,
         }
 
-cache_service = InMemoryCache()
+    def maybe_sweep(self):
+        """
+        Sweeps expired entries if ``sweep_interval`` has passed since the
+        last sweep. Runs on every read and write, and from the service's
+        periodic cache sampler so entries also expire while it is idle.
+        """
+        if time.monotonic() - self._last_sweep >= self.sweep_interval:
+            self.sweep()
+
+    def _remove(self, key: str):
+        entry = self.cache.pop(key)
+        self.total_bytes -= entry.size
+
+
+cache_service = BoundedTTLCache(
+    ttl=settings.rag_cache_ttl,
+    max_entries=settings.rag_cache_max_entries,
+    max_bytes=settings.rag_cache_max_bytes,
+    sweep_interval=settings.rag_cache_sweep_interval,
+)
@@ -0,0 +1,147 @@
+"""ChessMate Cognitive Service - Coaching Response Cache
+
+This module caches complete coaching responses from the legal-move agent
+pipeline. Many students reach the same positions, so a response is keyed
+on the normalized position, the move that reached it and the coaching
+parameters rather than on the client, and identical requests that arrive while the pipeline is still
+running share that one run, including any partial output it streams.
+
+Author: Vyaakar Labs <r.raajey@gmail.com>
+Location: India
+License: MIT
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Optional
+
+import chess
+import structlog
+
+from app.core.metrics import COACHING_CACHE_LOOKUPS
+from app.services.cache_service import BoundedTTLCache
+
+log = structlog.get_logger()
+
+PartialCallback = Callable[[str], Awaitable[None]]
+COGNITIVE_STAGES = ("Novice", "Developing", "Expert")
+
+
+def normalize_fen(fen: str) -> Optional[str]:
+    """
+    Returns the position part of a FEN without the move clocks, with the
+    en passant square kept only when a capture is legal, or ``None`` for
+    an invalid FEN.
+    """
+    try:
+        return chess.Board(fen).epd()
+    except ValueError:
+        return None
+
+
+def fallback_payload(text: str, message: dict, language: str = "en") -> dict[str, Any]:
+    """
+    Builds the coaching payload for a response written without the agents,
+    keeping the client's cognitive stage (Novice if it sent none the
+    frontend accepts). The payload is labelled with the ``language`` the
+    text is written in, which is not necessarily the one requested.
+    """
+    requested = str(message.get("cognitiveStage") or "").lower()
+    stage = next((s for s in COGNITIVE_STAGES if s.lower() == requested), "Novice")
+    return {"message": text, "cognitiveStage": stage, "language": language}
+
+
+class CoachingResponseCache:
+    """
+    A TTL and size bounded cache of coaching responses with request
+    coalescing.
+
+    Unlike ``BoundedTTLCache.get_or_load``, a shared run is a task of its
+    own: one waiter being cancelled, for example because its client moved
+    on to a newer position, neither cancels the run nor fails the others.
+    """
+
+    def __init__(self, ttl: float = 3600, max_entries: int = 2048, max_bytes: int = 8 * 1024 * 1024):
+        self.responses = BoundedTTLCache(ttl=ttl, max_entries=max_entries, max_bytes=max_bytes)
+        self._runs: dict[str, asyncio.Task] = {}
+        self._listeners: dict[str, list[PartialCallback]] = {}
+        self._latest_partial: dict[str, str] = {}
+
+    @staticmethod
+    def key_for(message: dict, fen: str) -> Optional[str]:
+        """
+        Returns the cache key for a game-state message, or ``None`` if the
+        response must not be shared: the client asked for personalized
+        coaching, or the FEN is invalid. The last move is part of the key
+        because the coaching prompt comments on it.
+        """
+        if message.get("personalizedCoaching"):
+            return None
+        position = normalize_fen(fen)
+        if position is None:
+            return None
+        move = str(message.get("move") or "-")
+        stage = str(message.get("cognitiveStage") or "default").lower()
+        language = str(message.get("language") or "default").lower()
+        return f"{position}|{move}|{stage}|{language}"
+
+    async def get_or_run(
+        self,
+        key: str,
+        run: Callable[[PartialCallback], Awaitable[str]],
+        on_partial: Optional[PartialCallback] = None,
+    ) -> str:
+        """
+        Returns the cached response for ``key``, joining a run already in
+        flight for it or starting ``run`` otherwise. Empty responses and
+        failed runs are not cached.
+
+        ``run`` is given a callback for partial output, which is passed on
+        to the ``on_partial`` of every waiter; a waiter that joins late first
+        receives the latest partial output.
+        """
+        cached = self.responses.get(key)
+        if cached is not None:
+            COACHING_CACHE_LOOKUPS.labels(result="hit").inc()
+            return cached
+
+        task = self._runs.get(key)
+        if task is None:
+            COACHING_CACHE_LOOKUPS.labels(result="miss").inc()
+            self._listeners[key] = []
+            task = asyncio.create_task(run(lambda partial: self._publish_partial(key, partial)))
+            self._runs[key] = task
+            task.add_done_callback(lambda done: self._finish_run(key, done))
+        else:
+            COACHING_CACHE_LOOKUPS.labels(result="coalesced").inc()
+
+        if on_partial is None:
+            return await asyncio.shield(task)
+        listeners = self._listeners[key]
+        listeners.append(on_partial)
+        try:
+            if key in self._latest_partial:
+                await on_partial(self._latest_partial[key])
+            return await asyncio.shield(task)
+        finally:
+            listeners.remove(on_partial)
+
+    def stats(self) -> dict[str, int]:
+        """Returns the cache's counters and the number of shared runs in flight."""
+        return {**self.responses.stats(), "runs_in_flight": len(self._runs)}
+
+    async def _publish_partial(self, key: str, partial: str):
+        self._latest_partial[key] = partial
+        for on_partial in list(self._listeners.get(key, ())):
+            await on_partial(partial)
+
+    def _finish_run(self, key: str, task: asyncio.Task):
+        if self._runs.get(key) is task:
+            del self._runs[key]
+            del self._listeners[key]
+            self._latest_partial.pop(key, None)
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is not None:
+            log.warning("COACHING_CACHE_RUN_FAILED", key=key, error=str(error))
+        elif task.result():
+            self.responses.set(key, task.result())
@@ -0,0 +1,109 @@
+"""ChessMate Cognitive Service - Coaching Stream Parser
+
+This module reads the coaching agent's JSON output while it is still being
+generated. The agent writes a ``CoachingPayload`` object whose ``message``
+field is what the student reads first, so that field is decoded as soon as
+it starts filling and can be published before the rest of the object, and
+the closing brace, arrive.
+
+Author: Vyaakar Labs <r.raajey@gmail.com>
+Location: India
+License: MIT
+"""
+import re
+from typing import Optional
+
+MESSAGE_KEY = re.compile(r'"message"\s*:\s*"')
+ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+class PartialMessageParser:
+    """
+    Incrementally decodes the ``message`` string of a streamed JSON object.
+
+    Text is fed in chunks as the model produces it. Only complete characters
+    are decoded, so an escape sequence split across two chunks is picked up
+    once its second half arrives.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.message = ""
+        self.complete = False
+        self._pos: Optional[int] = None
+
+    def feed(self, chunk: str) -> Optional[str]:
+        """
+        Adds a chunk of output and returns the decoded message so far if it
+        grew, or ``None`` if it did not.
+        """
+        self.buffer += chunk
+        if self.complete:
+            return None
+        if self._pos is None:
+            match = MESSAGE_KEY.search(self.buffer)
+            if match is None:
+                return None
+            self._pos = match.end()
+
+        decoded = self._decode()
+        if not decoded:
+            return None
+        self.message += decoded
+        return self.message
+
+    def _decode(self) -> str:
+        """Decodes from the current position up to the end of complete input."""
+        out = []
+        buffer, pos = self.buffer, self._pos
+        while pos < len(buffer):
+            char = buffer[pos]
+            if char == '"':
+                self.complete = True
+                pos += 1
+                break
+            if char != "\\":
+                out.append(char)
+                pos += 1
+                continue
+            if pos + 1 >= len(buffer):
+                break
+            escape = buffer[pos + 1]
+            if escape != "u":
+                out.append(ESCAPES.get(escape, escape))
+                pos += 2
+                continue
+            code = self._unicode_escape(buffer, pos)
+            if code is None:
+                break
+            value, length = code
+            out.append(value)
+            pos += length
+        self._pos = pos
+        return "".join(out)
+
+    @staticmethod
+    def _unicode_escape(buffer: str, pos: int) -> Optional[tuple[str, int]]:
+        r"""
+        Decodes a ``\uXXXX`` escape at ``pos``, joining a surrogate pair.
+        Returns the character and the length consumed, or ``None`` if the
+        escape is not complete yet.
+        """
+        digits = buffer[pos + 2:pos + 6]
+        if len(digits) < 4:
+            return None
+        try:
+            high = int(digits, 16)
+        except ValueError:
+            return "\ufffd", 6
+        if not 0xD800 <= high <= 0xDBFF:
+            return chr(high), 6
+        if len(buffer) < pos + 12:
+            return None
+        try:
+            low = int(buffer[pos + 8:pos + 12], 16) if buffer[pos + 6:pos + 8] == "\\u" else -1
+        except ValueError:
+            low = -1
+        if not 0xDC00 <= low <= 0xDFFF:
+            return "\ufffd", 6
+        return chr(0x10000 + ((high - 0xD800) << 10) + (low - 0xDC00)), 12
@@ -0,0 +1,232 @@
+"""ChessMate Cognitive Service - Stockfish Engine Pool
+
+This module provides a pool of long-lived, pre-configured Stockfish
+processes. Spawning an engine and completing the UCI handshake costs far
+more than a short analysis, so engines are started once and borrowed by
+callers for the duration of a single analysis.
+
+Author: Vyaakar Labs <r.raajey@gmail.com>
+Location: India
+License: MIT
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+import chess.engine
+import structlog
+
+from app.config import settings
+from app.core.exceptions import EngineUnavailableError
+
+log = structlog.get_logger()
+
+
+class StockfishEnginePool:
+    """
+    An asyncio pool of warm Stockfish engines.
+
+    The pool owns a fixed number of slots. Each slot holds either a running
+    engine or ``None`` when its engine has died and is waiting to be
+    respawned. Slots are handed out in FIFO order, so waiters are served
+    fairly, and a checkout gives up after ``checkout_timeout`` seconds.
+
+    An engine that has sat idle for longer than ``health_check_interval``
+    is pinged when it is next checked out and replaced if it does not
+    answer, so health checks never take capacity away from callers. Every
+    running engine is tracked, so ``close`` also stops borrowed ones.
+    """
+
+    def __init__(
+        self,
+        stockfish_path: str = "/usr/games/stockfish",
+        size: int = 2,
+        threads: int = 1,
+        hash_mb: int = 16,
+        checkout_timeout: float = 2.0,
+        health_check_interval: float = 30.0,
+        start_retry_interval: float = 30.0,
+    ):
+        self.stockfish_path = stockfish_path
+        self.size = size
+        self.threads = threads
+        self.hash_mb = hash_mb
+        self.checkout_timeout = checkout_timeout
+        self.health_check_interval = health_check_interval
+        self.start_retry_interval = start_retry_interval
+
+        self._slots: asyncio.Queue[Optional[chess.engine.UciProtocol]] = asyncio.Queue()
+        self._start_lock = asyncio.Lock()
+        self._started = False
+        self._last_start_failure: Optional[float] = None
+        # Every running engine, with the time it was last returned or spawned.
+        self._engines: dict[chess.engine.UciProtocol, float] = {}
+
+        self.checkouts = 0
+        self.checkout_timeouts = 0
+        self.restarts = 0
+
+    async def start(self) -> None:
+        """
+        Spawns the engines for every slot. Safe to call more than once.
+        """
+        if self._started:
+            return
+        async with self._start_lock:
+            if self._started:
+                return
+            if (
+                self._last_start_failure is not None
+                and time.monotonic() - self._last_start_failure < self.start_retry_interval
+            ):
+                raise EngineUnavailableError("Stockfish engine failed to start recently.")
+
+            engines = []
+            try:
+                for _ in range(self.size):
+                    engines.append(await self._spawn_engine())
+            except (FileNotFoundError, chess.engine.EngineError, OSError) as e:
+                log.error("ENGINE_POOL_START_FAILED", error=str(e), path=self.stockfish_path)
+                for engine in engines:
+                    await self._quit_engine(engine)
+                self._last_start_failure = time.monotonic()
+                raise EngineUnavailableError(f"Could not start Stockfish: {e}") from e
+
+            self._slots = asyncio.Queue()
+            for engine in engines:
+                self._slots.put_nowait(engine)
+            self._started = True
+            self._last_start_failure = None
+            log.info(
+                "ENGINE_POOL_STARTED",
+                size=self.size,
+                threads=self.threads,
+                hash_mb=self.hash_mb,
+            )
+
+    async def close(self) -> None:
+        """
+        Quits every engine, including ones that are still checked out; their
+        borrowers see the engine terminate and return an empty slot.
+        """
+        self._slots = asyncio.Queue()
+        for engine in list(self._engines):
+            await self._quit_engine(engine)
+        self._started = False
+        log.info("ENGINE_POOL_CLOSED")
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[chess.engine.UciProtocol]:
+        """
+        Borrows an engine for the duration of the ``async with`` block.
+
+        Raises:
+            EngineUnavailableError: If no engine could be checked out in time
+                or a replacement engine could not be spawned.
+        """
+        await self.start()
+        try:
+            engine = await asyncio.wait_for(self._slots.get(), timeout=self.checkout_timeout)
+        except asyncio.TimeoutError as e:
+            self.checkout_timeouts += 1
+            log.warn("ENGINE_POOL_CHECKOUT_TIMEOUT", timeout=self.checkout_timeout)
+            raise EngineUnavailableError("Timed out waiting for a Stockfish engine.") from e
+
+        if (
+            engine is not None
+            and self._is_alive(engine)
+            and self._idle_too_long(engine)
+            and not await self._is_healthy(engine)
+        ):
+            log.warn("ENGINE_POOL_HEALTH_CHECK_FAILED")
+            await self._quit_engine(engine)
+            engine = None
+
+        if engine is None or not self._is_alive(engine):
+            try:
+                engine = await self._respawn(engine)
+            except EngineUnavailableError:
+                self._slots.put_nowait(None)
+                raise
+
+        self.checkouts += 1
+        healthy = True
+        try:
+            yield engine
+        except chess.engine.EngineTerminatedError:
+            log.error("ENGINE_POOL_ENGINE_TERMINATED")
+            healthy = False
+            raise
+        finally:
+            # A dead engine leaves an empty slot behind; it is respawned on the
+            # next checkout.
+            if healthy and self._is_alive(engine):
+                self._engines[engine] = time.monotonic()
+                self._slots.put_nowait(engine)
+            else:
+                self._engines.pop(engine, None)
+                self._slots.put_nowait(None)
+
+    def stats(self) -> dict[str, int]:
+        """Returns the pool's counters."""
+        return {
+            "size": self.size,
+            "idle": self._slots.qsize(),
+            "checkouts": self.checkouts,
+            "checkout_timeouts": self.checkout_timeouts,
+            "restarts": self.restarts,
+        }
+
+    async def _spawn_engine(self) -> chess.engine.UciProtocol:
+        _, engine = await chess.engine.popen_uci(self.stockfish_path)
+        self._engines[engine] = time.monotonic()
+        await engine.configure({"Threads": self.threads, "Hash": self.hash_mb})
+        return engine
+
+    async def _respawn(
+        self, engine: Optional[chess.engine.UciProtocol]
+    ) -> chess.engine.UciProtocol:
+        if engine:
+            await self._quit_engine(engine)
+        try:
+            new_engine = await self._spawn_engine()
+        except (FileNotFoundError, chess.engine.EngineError, OSError) as e:
+            log.error("ENGINE_POOL_RESTART_FAILED", error=str(e), path=self.stockfish_path)
+            raise EngineUnavailableError(f"Could not restart Stockfish: {e}") from e
+        self.restarts += 1
+        log.info("ENGINE_POOL_ENGINE_RESTARTED", restarts=self.restarts)
+        return new_engine
+
+    def _idle_too_long(self, engine: chess.engine.UciProtocol) -> bool:
+        if self.health_check_interval <= 0:
+            return False
+        return time.monotonic() - self._engines.get(engine, 0.0) > self.health_check_interval
+
+    async def _is_healthy(self, engine: chess.engine.UciProtocol) -> bool:
+        try:
+            await asyncio.wait_for(engine.ping(), timeout=self.checkout_timeout)
+            return True
+        except (asyncio.TimeoutError, chess.engine.EngineError):
+            return False
+
+    @staticmethod
+    def _is_alive(engine: chess.engine.UciProtocol) -> bool:
+        return not engine.returncode.done()
+
+    async def _quit_engine(self, engine: chess.engine.UciProtocol) -> None:
+        self._engines.pop(engine, None)
+        try:
+            await asyncio.wait_for(engine.quit(), timeout=1.0)
+        except Exception as e:
+            log.warn("ENGINE_POOL_QUIT_FAILED", error=str(e))
+
+
+engine_pool = StockfishEnginePool(
+    stockfish_path=settings.stockfish_path,
+    size=settings.engine_pool_size,
+    threads=settings.engine_threads,
+    hash_mb=settings.engine_hash_mb,
+    checkout_timeout=settings.engine_checkout_timeout,
+    health_check_interval=settings.engine_health_check_interval,
+)
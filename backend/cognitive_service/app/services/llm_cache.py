@@ -0,0 +1,266 @@
+"""ChessMate Cognitive Service - LLM Response Cache
+
+This module provides a content-addressed cache for LLM responses. A
+request is keyed by a hash of the model, the system instruction, the
+contents and the generation config, so identical prompts, which are
+common for illegal moves and repeated positions, are answered without
+going back to the provider.
+
+The cache has three modes:
+
+- "cache" answers from the store when it can and stores new responses
+  for ``llm_cache_ttl`` seconds.
+- "record" always calls the model and stores its responses without
+  expiry.
+- "replay" answers only from stored responses and raises
+  LlmCacheMissError on a miss, so recorded runs can be repeated offline
+  and deterministically.
+
+Responses are kept in memory or in a SQLite file that survives restarts.
+
+Author: Vyaakar Labs <r.raajey@gmail.com>
+Location: India
+License: MIT
+"""
+import asyncio
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from contextlib import AbstractAsyncContextManager
+from typing import Any, AsyncGenerator, Literal, Optional, Protocol
+
+import structlog
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.base_llm_connection import BaseLlmConnection
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+
+from app.core.exceptions import ConfigurationError, LlmCacheMissError
+from app.core.metrics import LLM_CACHE_LOOKUPS
+from app.services.cache_service import BoundedTTLCache
+
+log = structlog.get_logger()
+
+CacheMode = Literal["off", "cache", "record", "replay"]
+
+
+def request_key(model: str, llm_request: LlmRequest) -> str:
+    """
+    Returns the content hash of a request. Function call IDs are left out:
+    the ADK generates them per run, so they would defeat replay.
+    """
+    config = (
+        llm_request.config.model_dump(mode="json", exclude_none=True, exclude={"http_options"})
+        if llm_request.config
+        else {}
+    )
+    contents = [
+        _without_call_ids(content.model_dump(mode="json", exclude_none=True))
+        for content in llm_request.contents
+    ]
+    payload = json.dumps(
+        {"model": model, "config": config, "contents": contents},
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _without_call_ids(content: dict) -> dict:
+    for part in content.get("parts", []):
+        for field in ("function_call", "function_response"):
+            if field in part:
+                part[field].pop("id", None)
+    return content
+
+
+class ResponseStore(Protocol):
+    """Stores the serialized responses to a request under its key."""
+
+    async def get(self, key: str) -> Optional[list[dict]]: ...
+
+    async def set(self, key: str, responses: list[dict], ttl: Optional[float] = None) -> None: ...
+
+    def stats(self) -> dict[str, int]: ...
+
+    def close(self) -> None: ...
+
+
+class MemoryResponseStore:
+    """Keeps responses in a bounded in-memory LRU cache."""
+
+    def __init__(self, ttl: float = 3600, max_entries: int = 4096, max_bytes: int = 32 * 1024 * 1024):
+        self.cache = BoundedTTLCache(ttl=ttl, max_entries=max_entries, max_bytes=max_bytes)
+
+    async def get(self, key: str) -> Optional[list[dict]]:
+        return self.cache.get(key)
+
+    async def set(self, key: str, responses: list[dict], ttl: Optional[float] = None) -> None:
+        """Stores ``responses``; a ``ttl`` of None keeps them until evicted."""
+        self.cache.set(key, responses, ttl=math.inf if ttl is None else ttl)
+
+    def stats(self) -> dict[str, int]:
+        return self.cache.stats()
+
+    def close(self) -> None:
+        pass
+
+
+class SqliteResponseStore:
+    """Keeps responses in a SQLite file, read and written off the event loop."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> Optional[list[dict]]:
+        responses = await asyncio.to_thread(self._load, key)
+        if responses is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return responses
+
+    async def set(self, key: str, responses: list[dict], ttl: Optional[float] = None) -> None:
+        """Stores ``responses``; a ``ttl`` of None keeps them indefinitely."""
+        await asyncio.to_thread(self._store, key, responses, ttl)
+
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+    def close(self) -> None:
+        with self._db_lock:
+            if self._db:
+                self._db.close()
+                self._db = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._db is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_responses (
+                    key TEXT PRIMARY KEY,
+                    responses TEXT NOT NULL,
+                    expires_at REAL,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+            self._db.execute("DELETE FROM llm_responses WHERE expires_at <= ?", (time.time(),))
+            self._db.commit()
+        return self._db
+
+    def _load(self, key: str) -> Optional[list[dict]]:
+        try:
+            with self._db_lock:
+                row = self._connection().execute(
+                    "SELECT responses FROM llm_responses WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                    (key, time.time()),
+                ).fetchone()
+        except sqlite3.Error as e:
+            log.error("LLM_CACHE_READ_FAILED", error=str(e), path=self.path)
+            return None
+        return json.loads(row[0]) if row else None
+
+    def _store(self, key: str, responses: list[dict], ttl: Optional[float]) -> None:
+        now = time.time()
+        try:
+            with self._db_lock:
+                db = self._connection()
+                db.execute(
+                    "INSERT OR REPLACE INTO llm_responses (key, responses, expires_at, created_at) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(responses, separators=(",", ":")), None if ttl is None else now + ttl, now),
+                )
+                db.commit()
+        except sqlite3.Error as e:
+            log.error("LLM_CACHE_WRITE_FAILED", error=str(e), path=self.path)
+
+
+class CachedLlm(BaseLlm):
+    """
+    Wraps a model so identical requests are answered from ``store``.
+    Streamed responses are stored with their partial chunks and replayed
+    as they were streamed; a request that is not streamed gets only the
+    final responses. Responses with an error code are not stored.
+    """
+
+    llm: BaseLlm
+    store: Any
+    mode: CacheMode = "cache"
+    ttl: Optional[float] = None
+
+    @property
+    def capabilities(self):
+        return self.llm.capabilities
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        key = request_key(f"{type(self.llm).__name__}:{self.llm.model}", llm_request)
+        if self.mode != "record":
+            recorded = await self.store.get(key)
+            if recorded is not None:
+                LLM_CACHE_LOOKUPS.labels(result="hit").inc()
+                for data in recorded:
+                    response = LlmResponse.model_validate(data)
+                    if stream or not response.partial:
+                        yield response
+                return
+            LLM_CACHE_LOOKUPS.labels(result="miss").inc()
+            if self.mode == "replay":
+                raise LlmCacheMissError(f"No recorded LLM response for request {key[:16]}.")
+
+        responses = []
+        cacheable = True
+        async for response in self.llm.generate_content_async(llm_request, stream=stream):
+            # Serialized before the ADK sees the response, which may amend it.
+            cacheable = cacheable and not response.error_code
+            responses.append(response.model_dump(mode="json", exclude_none=True))
+            yield response
+        if cacheable and responses:
+            await self.store.set(key, responses, None if self.mode == "record" else self.ttl)
+
+    def connect(self, llm_request: LlmRequest) -> AbstractAsyncContextManager[BaseLlmConnection]:
+        """Live connections are not cached."""
+        return self.llm.connect(llm_request)
+
+    def close(self) -> None:
+        self.store.close()
+
+
+def with_response_cache(model: BaseLlm, config) -> BaseLlm:
+    """
+    Wraps ``model`` in the response cache selected by the settings, or
+    returns it unchanged when ``llm_cache_mode`` is "off".
+    """
+    if config.llm_cache_mode == "off":
+        return model
+    if config.llm_cache_backend == "disk":
+        store = SqliteResponseStore(config.llm_cache_path)
+    elif config.llm_cache_mode in ("record", "replay"):
+        raise ConfigurationError(
+            f"LLM_CACHE_MODE={config.llm_cache_mode} needs LLM_CACHE_BACKEND=disk to keep the recording."
+        )
+    else:
+        store = MemoryResponseStore(
+            ttl=config.llm_cache_ttl,
+            max_entries=config.llm_cache_max_entries,
+            max_bytes=config.llm_cache_max_bytes,
+        )
+    log.info("LLM response cache enabled.", mode=config.llm_cache_mode, backend=config.llm_cache_backend)
+    return CachedLlm(
+        model=model.model, llm=model, store=store, mode=config.llm_cache_mode, ttl=config.llm_cache_ttl
+    )
@@ -0,0 +1,110 @@
+"""ChessMate Cognitive Service - Message Codecs
+
+This module encodes and decodes the payloads the AgentIOService exchanges
+over Redis work queues and pub/sub channels. Plain JSON stays the default
+wire format, so existing producers and subscribers keep working. A binary
+codec such as msgpack is negotiated per message through an envelope
+header, which plain JSON can never start with:
+
+    b"\\x00" + codec name + b"\\x00" + body
+
+orjson and msgpack are optional dependencies; a codec that is not
+installed falls back to the stdlib ``json`` module when encoding.
+
+Author: Vyaakar Labs <r.raajey@gmail.com>
+Location: India
+License: MIT
+"""
+import json
+from typing import Any, Callable, NamedTuple, Union
+
+import structlog
+
+from app.core.exceptions import CodecError
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - depends on the environment
+    msgpack = None
+
+log = structlog.get_logger()
+
+ENVELOPE_MARKER = b"\x00"
+# Work queue payloads arrive through a client with decode_responses=True;
+# it must be created with this errors handler so binary payloads survive.
+REDIS_ENCODING_ERRORS = "surrogateescape"
+
+Payload = Union[str, bytes]
+
+
+class Codec(NamedTuple):
+    name: str
+    encode: Callable[[Any], bytes]
+    decode: Callable[[bytes], Any]
+    # JSON codecs are written without an envelope so any JSON reader can
+    # consume them.
+    is_json: bool
+
+
+def _json_dumps(obj: Any) -> bytes:
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+CODECS: dict[str, Codec] = {"json": Codec("json", _json_dumps, json.loads, True)}
+if orjson is not None:
+    CODECS["orjson"] = Codec("orjson", orjson.dumps, orjson.loads, True)
+if msgpack is not None:
+    CODECS["msgpack"] = Codec(
+        "msgpack",
+        lambda obj: msgpack.packb(obj, use_bin_type=True),
+        lambda data: msgpack.unpackb(data, raw=False),
+        False,
+    )
+
+# Plain JSON payloads are parsed with the fastest JSON codec installed.
+_JSON_DECODER = CODECS.get("orjson", CODECS["json"])
+
+
+class MessageCodec:
+    """
+    Encodes messages with the configured codec and decodes payloads from
+    any producer: enveloped payloads name their codec, everything else is
+    read as plain JSON.
+    """
+
+    def __init__(self, name: str = "json"):
+        if name not in CODECS:
+            log.warning("Message codec not installed, using json.", codec=name)
+            name = "json"
+        self.codec = CODECS[name]
+
+    @property
+    def name(self) -> str:
+        return self.codec.name
+
+    def encode(self, obj: Any) -> Payload:
+        """Returns JSON text for the JSON codecs and enveloped bytes otherwise."""
+        body = self.codec.encode(obj)
+        if self.codec.is_json:
+            return body.decode("utf-8")
+        return ENVELOPE_MARKER + self.codec.name.encode("ascii") + ENVELOPE_MARKER + body
+
+    def decode(self, payload: Payload) -> Any:
+        """Decodes a payload, raising CodecError if it is malformed or its codec is unknown."""
+        if isinstance(payload, str):
+            payload = payload.encode("utf-8", REDIS_ENCODING_ERRORS)
+        codec = _JSON_DECODER
+        if payload.startswith(ENVELOPE_MARKER):
+            name, separator, payload = payload[1:].partition(ENVELOPE_MARKER)
+            codec = CODECS.get(name.decode("ascii", "replace"))
+            if not separator or codec is None:
+                raise CodecError(f"Unknown message codec {name[:32].decode('ascii', 'replace')!r}")
+        try:
+            return codec.decode(payload)
+        except Exception as e:
+            raise CodecError(f"Could not decode {codec.name} payload: {e}") from e
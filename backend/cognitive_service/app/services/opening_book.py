@@ -0,0 +1,206 @@
+"""ChessMate Cognitive Service - Opening Book
+
+This module provides a local opening-book tier that answers positions from
+standard opening theory without running the agent pipeline. Book moves come
+from a Polyglot ``.bin`` book, which ``chess.polyglot`` memory-maps, and
+opening names come from an ECO index in the lichess ``chess-openings`` TSV
+format (``eco``, ``name`` and ``pgn`` columns). Both are keyed by the
+position's Zobrist hash, so transpositions into a named line are found.
+
+Author: Vyaakar Labs <r.raajey@gmail.com>
+Location: India
+License: MIT
+"""
+import csv
+import os
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+import chess
+import chess.polyglot
+import structlog
+
+from app.config import settings
+from app.core.metrics import OPENING_BOOK_LOOKUPS
+from app.services.coaching_cache import fallback_payload
+
+log = structlog.get_logger()
+
+
+@dataclass
+class OpeningInfo:
+    """An ECO code and opening name."""
+    eco: str
+    name: str
+
+
+@dataclass
+class BookPosition:
+    """What the book knows about a position."""
+    opening: Optional[OpeningInfo] = None
+    book_moves: list[str] = field(default_factory=list)
+
+
+class OpeningBook:
+    """
+    A Polyglot book plus an ECO name index, consulted before the agent
+    pipeline for early-game positions.
+
+    Coaching payloads are built once per book position and memoized, since
+    the same book positions recur in almost every game.
+    """
+
+    def __init__(
+        self,
+        book_path: Optional[str] = None,
+        eco_path: Optional[str] = None,
+        max_ply: int = 20,
+        max_moves: int = 3,
+    ):
+        self.book_path = book_path
+        self.eco_path = eco_path
+        self.max_ply = max_ply
+        self.max_moves = max_moves
+        self._reader: Optional[chess.polyglot.MemoryMappedReader] = None
+        self._openings: dict[int, OpeningInfo] = {}
+        self._payloads: dict[int, dict[str, Any]] = {}
+
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def loaded(self) -> bool:
+        return self._reader is not None or bool(self._openings)
+
+    def load(self) -> None:
+        """
+        Memory-maps the Polyglot book and builds the ECO index. Missing files
+        are logged and skipped, leaving the tier disabled if neither loads.
+        """
+        if self.book_path:
+            if os.path.exists(self.book_path):
+                self._reader = chess.polyglot.open_reader(self.book_path)
+                log.info("OPENING_BOOK_LOADED", path=self.book_path)
+            else:
+                log.warning("OPENING_BOOK_NOT_FOUND", path=self.book_path)
+        if self.eco_path:
+            if os.path.exists(self.eco_path):
+                self._openings = self._load_eco_index(self.eco_path)
+                log.info("ECO_INDEX_LOADED", path=self.eco_path, openings=len(self._openings))
+            else:
+                log.warning("ECO_INDEX_NOT_FOUND", path=self.eco_path)
+
+    def close(self) -> None:
+        if self._reader:
+            self._reader.close()
+            self._reader = None
+
+    def lookup(self, board: chess.Board) -> Optional[BookPosition]:
+        """Returns what the book knows about a position, or ``None``."""
+        key = chess.polyglot.zobrist_hash(board)
+        opening = self._openings.get(key)
+        book_moves = []
+        if self._reader:
+            entries = sorted(self._reader.find_all(board), key=lambda e: e.weight, reverse=True)
+            book_moves = [board.san(entry.move) for entry in entries[:self.max_moves]]
+        if opening is None and not book_moves:
+            return None
+        return BookPosition(opening=opening, book_moves=book_moves)
+
+    def coaching_payload(self, fen: str, message: Optional[dict] = None) -> Optional[dict[str, Any]]:
+        """
+        Returns a CoachingPayload for a book position, or ``None`` if the
+        position is out of book and the agent pipeline has to answer. The
+        cognitive stage is taken from the request ``message``; the book text
+        is English and labelled as such.
+        """
+        if not self.loaded:
+            return None
+        try:
+            board = chess.Board(fen)
+        except ValueError:
+            return None
+        payload = None
+        if board.ply() <= self.max_ply:
+            key = chess.polyglot.zobrist_hash(board)
+            payload = self._payloads.get(key)
+            if payload is None:
+                position = self.lookup(board)
+                if position:
+                    payload = self._payloads[key] = self._build_payload(board, position)
+
+        if payload is None:
+            self.misses += 1
+            OPENING_BOOK_LOOKUPS.labels(result="miss").inc()
+        else:
+            self.hits += 1
+            OPENING_BOOK_LOOKUPS.labels(result="hit").inc()
+            payload = {**payload, **fallback_payload(payload["message"], message or {})}
+        return payload
+
+    def stats(self) -> dict[str, int]:
+        """Returns the book's counters."""
+        total = self.hits + self.misses
+        return {
+            "openings": len(self._openings),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate_pct": round(100 * self.hits / total) if total else 0,
+        }
+
+    def _build_payload(self, board: chess.Board, position: BookPosition) -> dict[str, Any]:
+        side = "White" if board.turn == chess.WHITE else "Black"
+        if position.opening:
+            message = (
+                f"You are in the {position.opening.name} ({position.opening.eco}), "
+                "a well-known line of opening theory."
+            )
+        else:
+            message = "This position is well-known opening theory."
+        if position.book_moves:
+            message += (
+                f" The most popular continuations for {side} here are "
+                f"{', '.join(position.book_moves)}."
+            )
+        message += " Keep developing your pieces, control the center and get your king to safety."
+
+        payload: dict[str, Any] = {"message": message}
+        if position.opening:
+            payload["culturalContext"] = {
+                "title": position.opening.name,
+                "content": (
+                    f"{position.opening.name} is classified as {position.opening.eco} "
+                    "in the Encyclopaedia of Chess Openings."
+                ),
+            }
+        return payload
+
+    @staticmethod
+    def _load_eco_index(path: str) -> dict[int, OpeningInfo]:
+        """
+        Replays every line of the ECO TSV and indexes its final position.
+        Lines that fail to parse are skipped.
+        """
+        openings: dict[int, OpeningInfo] = {}
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f, delimiter="\t"):
+                board = chess.Board()
+                try:
+                    for token in row["pgn"].split():
+                        if token.endswith("."):
+                            continue
+                        board.push_san(token)
+                except (KeyError, ValueError):
+                    continue
+                openings[chess.polyglot.zobrist_hash(board)] = OpeningInfo(
+                    eco=row["eco"], name=row["name"]
+                )
+        return openings
+
+
+opening_book = OpeningBook(
+    book_path=settings.opening_book_path,
+    eco_path=settings.eco_index_path,
+    max_ply=settings.opening_book_max_ply,
+    max_moves=settings.opening_book_moves,
+)
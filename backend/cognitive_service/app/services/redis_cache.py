@@ -0,0 +1,208 @@
+"""ChessMate Cognitive Service - Shared Redis Cache
+
+This module provides a Redis-backed second cache tier so that every
+cognitive-service replica shares RAG retrieval results instead of warming
+its own process-local cache. Keys live under a versioned namespace; a
+knowledge-base rebuild invalidates every cached result by bumping the
+version counter rather than flushing Redis.
+
+Author: Vyaakar Labs <r.raajey@gmail.com>
+Location: India
+License: MIT
+"""
+import hashlib
+import json
+import time
+import zlib
+from typing import Any, Awaitable, Callable, Optional
+
+import redis.asyncio as aioredis
+import structlog
+
+from app.config import settings
+from app.services.cache_service import BoundedTTLCache, cache_service
+
+log = structlog.get_logger()
+
+# One-byte headers that identify how a cached value was encoded.
+_RAW_JSON = b"j"
+_ZLIB_JSON = b"z"
+
+
+def encode_value(value: Any, compress_threshold: int) -> bytes:
+    """Serializes a value as compact JSON, compressing it if it is large."""
+    payload = json.dumps(value, separators=(",", ":"), default=str).encode("utf-8")
+    if len(payload) >= compress_threshold:
+        return _ZLIB_JSON + zlib.compress(payload)
+    return _RAW_JSON + payload
+
+
+def decode_value(data: bytes) -> Any:
+    """Reverses ``encode_value``."""
+    header, payload = data[:1], data[1:]
+    if header == _ZLIB_JSON:
+        payload = zlib.decompress(payload)
+    elif header != _RAW_JSON:
+        raise ValueError(f"Unknown cache encoding header: {header!r}")
+    return json.loads(payload)
+
+
+class RedisCache:
+    """
+    A namespaced, versioned cache stored in Redis. Redis failures are logged
+    and treated as misses so the shared tier can never break a request.
+    """
+
+    def __init__(
+        self,
+        redis_url: str,
+        namespace: str = "chessmate:rag_cache",
+        ttl: int = 3600,
+        compress_threshold: int = 1024,
+        version_refresh_interval: float = 30.0,
+        socket_timeout: float = 0.5,
+    ):
+        self.redis_url = redis_url
+        self.namespace = namespace
+        self.ttl = ttl
+        self.compress_threshold = compress_threshold
+        self.version_refresh_interval = version_refresh_interval
+        self.socket_timeout = socket_timeout
+        self.redis_client: Optional[aioredis.Redis] = None
+        self._version: Optional[int] = None
+        self._version_checked_at = 0.0
+
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    @property
+    def version_key(self) -> str:
+        return f"{self.namespace}:version"
+
+    async def get(self, key: str) -> Optional[Any]:
+        """Returns the cached value for ``key`` or None."""
+        try:
+            client = self._client()
+            data = await client.get(await self._versioned_key(key))
+        except aioredis.RedisError as e:
+            self._record_error("REDIS_CACHE_GET_FAILED", e)
+            return None
+        if data is None:
+            self.misses += 1
+            return None
+        try:
+            value = decode_value(data)
+        except (ValueError, zlib.error) as e:
+            self._record_error("REDIS_CACHE_DECODE_FAILED", e)
+            return None
+        self.hits += 1
+        return value
+
+    async def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        """Stores ``value`` under ``key`` with a TTL."""
+        try:
+            client = self._client()
+            await client.set(
+                await self._versioned_key(key),
+                encode_value(value, self.compress_threshold),
+                ex=ttl or self.ttl,
+            )
+        except aioredis.RedisError as e:
+            self._record_error("REDIS_CACHE_SET_FAILED", e)
+
+    async def bump_version(self) -> int:
+        """
+        Invalidates every cached entry by moving to a new namespace version.
+        Old entries are left to expire through their TTL.
+        """
+        self._version = await self._client().incr(self.version_key)
+        self._version_checked_at = time.monotonic()
+        log.info("REDIS_CACHE_VERSION_BUMPED", namespace=self.namespace, version=self._version)
+        return self._version
+
+    def stats(self) -> dict[str, int]:
+        """Returns the shared tier's counters."""
+        return {
+            "version": self._version or 0,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+        }
+
+    async def close(self) -> None:
+        if self.redis_client:
+            await self.redis_client.close()
+            self.redis_client = None
+
+    def _client(self) -> aioredis.Redis:
+        if self.redis_client is None:
+            self.redis_client = aioredis.from_url(
+                self.redis_url,
+                socket_timeout=self.socket_timeout,
+                socket_connect_timeout=self.socket_timeout,
+            )
+        return self.redis_client
+
+    async def _versioned_key(self, key: str) -> str:
+        if (
+            self._version is None
+            or time.monotonic() - self._version_checked_at >= self.version_refresh_interval
+        ):
+            version = await self._client().get(self.version_key)
+            self._version = int(version) if version else 0
+            self._version_checked_at = time.monotonic()
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest()
+        return f"{self.namespace}:v{self._version}:{digest}"
+
+    def _record_error(self, event: str, error: Exception) -> None:
+        self.errors += 1
+        log.warn(event, error=str(error), namespace=self.namespace)
+
+
+class TieredCache:
+    """
+    Combines the in-process cache (L1) with the shared Redis cache (L2).
+    Lookups that miss L1 try L2 before calling the loader, and the L1
+    single-flight ensures concurrent misses hit L2 and the loader once.
+    """
+
+    def __init__(self, local: BoundedTTLCache, shared: Optional[RedisCache] = None):
+        self.local = local
+        self.shared = shared
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Returns the value for ``key`` from L1, then L2, then ``loader``."""
+
+        async def load_through_shared() -> Any:
+            if self.shared:
+                value = await self.shared.get(key)
+                if value is not None:
+                    return value
+            value = await loader()
+            if self.shared:
+                await self.shared.set(key, value)
+            return value
+
+        return await self.local.get_or_load(key, load_through_shared)
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        stats = {"l1": self.local.stats()}
+        if self.shared:
+            stats["l2"] = self.shared.stats()
+        return stats
+
+    async def close(self) -> None:
+        if self.shared:
+            await self.shared.close()
+
+
+rag_cache = TieredCache(
+    local=cache_service,
+    shared=RedisCache(
+        redis_url=settings.redis_url,
+        namespace=settings.rag_cache_namespace,
+        ttl=settings.rag_cache_l2_ttl,
+        compress_threshold=settings.rag_cache_compress_threshold,
+    ) if settings.enable_shared_cache else None,
+)
@@ -0,0 +1,226 @@
+"""ChessMate Cognitive Service - Session Compactor
+
+This module bounds the size of the long-lived ADK session kept per client.
+Every coaching turn appends the incoming message and each sub-agent's
+output to the session, so without compaction session loads, stored rows
+and prompt tokens all grow with the length of the game.
+
+Once a session goes over its turn or byte budget, it is rewritten as a new
+session holding the current state, a rolling plain-text summary of the
+dropped turns and only the most recent turns. The usage counted against the
+budget lives in the session's own state, so every worker process sees the
+same totals. Deleting the old session is left to the caller, which knows
+when the runs still using it have finished.
+
+Author: Vyaakar Labs <r.raajey@gmail.com>
+Location: India
+License: MIT
+"""
+from dataclasses import asdict, dataclass
+from typing import Iterable, Optional
+
+import structlog
+from google.adk.events import Event, EventActions
+from google.adk.sessions import BaseSessionService
+from google.adk.sessions.base_session_service import GetSessionConfig
+from google.genai.types import Content, Part
+
+log = structlog.get_logger()
+
+SUMMARY_STATE_KEY = "session_summary"
+USAGE_STATE_KEY = "session_usage"
+USAGE_AUTHOR = "session_compactor"
+SUMMARY_PREFIX = "Summary of earlier coaching in this game:\n"
+
+
+@dataclass
+class SessionUsage:
+    """Turns and approximate bytes appended to a session since it was created."""
+    turns: int = 0
+    bytes: int = 0
+
+
+def event_size(event: Event) -> int:
+    """Approximates the stored size of an event by its serialized length."""
+    return len(event.model_dump_json(exclude_none=True))
+
+
+def event_text(event: Event) -> str:
+    """Returns the text parts of an event's content, joined."""
+    if not event.content or not event.content.parts:
+        return ""
+    return " ".join(part.text for part in event.content.parts if part.text)
+
+
+def split_turns(events: Iterable[Event]) -> list[list[Event]]:
+    """
+    Groups events into turns. A turn starts at each user-authored event and
+    holds every agent event that followed it.
+    """
+    turns: list[list[Event]] = []
+    for event in events:
+        if event.author == "user" or not turns:
+            turns.append([])
+        turns[-1].append(event)
+    return turns
+
+
+class SessionCompactor:
+    """
+    Tracks how much each session has grown and compacts the ones that go
+    over budget.
+
+    Usage is kept in the session's state and updated with a state-only
+    event after each turn, which the agents never see as conversation.
+    Checking the budget reads the state without loading any events; only a
+    compaction loads and rewrites the session.
+    """
+
+    def __init__(
+        self,
+        max_turns: int = 12,
+        keep_turns: int = 4,
+        max_bytes: int = 64 * 1024,
+        summary_max_bytes: int = 4096,
+        summary_line_chars: int = 200,
+    ):
+        self.max_turns = max_turns
+        self.keep_turns = keep_turns
+        self.max_bytes = max_bytes
+        self.summary_max_bytes = summary_max_bytes
+        self.summary_line_chars = summary_line_chars
+
+        self.compactions = 0
+        self.turns_dropped = 0
+
+    async def record_turn(
+        self,
+        session_service: BaseSessionService,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        message_bytes: int,
+        events: Iterable[Event],
+    ) -> bool:
+        """
+        Records one turn appended to a session and returns whether the
+        session is now over budget. A session that no longer exists is
+        never over budget.
+        """
+        session = await session_service.get_session(
+            app_name=app_name,
+            user_id=user_id,
+            session_id=session_id,
+            config=GetSessionConfig(num_recent_events=0),
+        )
+        if session is None:
+            return False
+        usage = SessionUsage(**session.state.get(USAGE_STATE_KEY, {}))
+        usage.turns += 1
+        usage.bytes += message_bytes + sum(event_size(event) for event in events)
+        await session_service.append_event(session, self._usage_event(usage))
+        return usage.turns > self.max_turns or usage.bytes > self.max_bytes
+
+    async def compact(
+        self,
+        session_service: BaseSessionService,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+    ) -> Optional[str]:
+        """
+        Rewrites an over-budget session and returns the ID of its
+        replacement, or ``None`` if the session no longer exists. The old
+        session is left in place for the caller to delete.
+        """
+        session = await session_service.get_session(
+            app_name=app_name, user_id=user_id, session_id=session_id
+        )
+        if session is None:
+            return None
+
+        turns = split_turns(
+            event for event in session.events if not self._is_summary(event) and event.author != USAGE_AUTHOR
+        )
+        kept = turns[-self.keep_turns:] if self.keep_turns > 0 else []
+        # Leave room for the turns still to come before the next compaction.
+        while kept and sum(event_size(e) for turn in kept for e in turn) > self.max_bytes // 2:
+            kept = kept[1:]
+        dropped = turns[:len(turns) - len(kept)]
+
+        summary = self._roll_summary(session.state.get(SUMMARY_STATE_KEY, ""), dropped)
+        state = {k: v for k, v in session.state.items() if not k.startswith("temp:")}
+        state[SUMMARY_STATE_KEY] = summary
+        state[USAGE_STATE_KEY] = asdict(SessionUsage(
+            turns=len(kept),
+            bytes=sum(event_size(event) for turn in kept for event in turn),
+        ))
+
+        replacement = await session_service.create_session(
+            app_name=app_name, user_id=user_id, state=state
+        )
+        if summary:
+            await session_service.append_event(replacement, self._summary_event(summary))
+        for turn in kept:
+            for event in turn:
+                await session_service.append_event(replacement, self._without_state_delta(event))
+
+        self.compactions += 1
+        self.turns_dropped += len(dropped)
+        log.info(
+            "SESSION_COMPACTED",
+            user_id=user_id,
+            old_session_id=session_id,
+            new_session_id=replacement.id,
+            turns_dropped=len(dropped),
+            turns_kept=len(kept),
+        )
+        return replacement.id
+
+    def _roll_summary(self, previous: str, dropped: list[list[Event]]) -> str:
+        """
+        Appends one line per dropped turn to the previous summary, keeping
+        the most recent lines within ``summary_max_bytes``.
+        """
+        lines = previous.splitlines() if previous else []
+        for turn in dropped:
+            request = self._turn_position(turn[0]) or event_text(turn[0])[:self.summary_line_chars]
+            replies = [event_text(event) for event in turn[1:]]
+            reply = next((text for text in reversed(replies) if text), "")[:self.summary_line_chars]
+            lines.append(f"- {request} => {reply}" if reply else f"- {request}")
+
+        while lines and len("\n".join(lines).encode()) > self.summary_max_bytes:
+            lines.pop(0)
+        return "\n".join(lines)
+
+    @staticmethod
+    def _turn_position(event: Event) -> Optional[str]:
+        """Returns the FEN a turn was about, from the state delta sent with it."""
+        state_delta = event.actions.state_delta if event.actions else {}
+        fen = state_delta.get("fen") or state_delta.get("current_fen")
+        return f"Position {fen}" if fen else None
+
+    @staticmethod
+    def _usage_event(usage: SessionUsage) -> Event:
+        return Event(author=USAGE_AUTHOR, actions=EventActions(state_delta={USAGE_STATE_KEY: asdict(usage)}))
+
+    @staticmethod
+    def _summary_event(summary: str) -> Event:
+        return Event(
+            author="user",
+            content=Content(role="user", parts=[Part(text=SUMMARY_PREFIX + summary)]),
+        )
+
+    @staticmethod
+    def _is_summary(event: Event) -> bool:
+        return event.author == "user" and event_text(event).startswith(SUMMARY_PREFIX)
+
+    @staticmethod
+    def _without_state_delta(event: Event) -> Event:
+        """
+        Copies an event without its state delta. The replacement session is
+        created with the final state already, so replaying deltas would
+        only repeat writes.
+        """
+        actions = event.actions.model_copy(update={"state_delta": {}}) if event.actions else EventActions()
+        return event.model_copy(update={"actions": actions})
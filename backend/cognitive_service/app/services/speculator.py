@@ -0,0 +1,167 @@
+"""ChessMate Cognitive Service - Speculative Precomputation
+
+This module uses the time between a student's moves. After a position has
+been coached, the engine's top replies from the analysis already in the
+cache are played out, and the work the next request would need for each
+resulting position (Stockfish analysis, RAG retrieval and optionally the
+coaching response) is done ahead of time so it lands in the caches.
+
+Speculation only runs while the service is otherwise idle and is cancelled
+as soon as real work arrives. Hits and wasted positions are counted so the
+mode can be judged on real traffic.
+
+Author: Vyaakar Labs <r.raajey@gmail.com>
+Location: India
+License: MIT
+"""
+import asyncio
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional
+
+import chess
+import structlog
+
+from app.core.metrics import SPECULATIVE_POSITIONS
+from app.services.analysis_cache import PositionAnalysis, position_key
+
+log = structlog.get_logger()
+
+
+class Speculator:
+    """
+    Precomputes likely next positions per client in background tasks.
+
+    ``analyse`` and ``retrieve`` fill the analysis and RAG caches for a
+    position; ``coach``, if given, fills the coaching response cache for a
+    position and the move (in SAN) that reaches it.
+    """
+
+    def __init__(
+        self,
+        analyse: Callable[[chess.Board], Awaitable[PositionAnalysis]],
+        retrieve: Callable[[str], Awaitable[Any]],
+        coach: Optional[Callable[[str, str], Awaitable[Any]]] = None,
+        is_idle: Callable[[], bool] = lambda: True,
+        top_k: int = 2,
+        idle_poll_interval: float = 0.05,
+        max_clients: int = 10000,
+    ):
+        self.analyse = analyse
+        self.retrieve = retrieve
+        self.coach = coach
+        self.is_idle = is_idle
+        self.top_k = top_k
+        self.idle_poll_interval = idle_poll_interval
+        self.max_clients = max_clients
+        self._tasks: dict[str, asyncio.Task] = {}
+        # Positions precomputed for each client since its last request.
+        self._ready: OrderedDict[str, set[str]] = OrderedDict()
+
+        self.outcomes = {"hit": 0, "wasted": 0, "cancelled": 0}
+
+    def speculate(self, client_id: str, fen: str):
+        """
+        Starts precomputing the likely replies to ``fen`` for a client,
+        replacing any speculation still running for it.
+        """
+        previous = self._tasks.get(client_id)
+        if previous:
+            previous.cancel()
+        task = asyncio.create_task(self._run(client_id, fen))
+        self._tasks[client_id] = task
+        task.add_done_callback(lambda done: self._forget_task(client_id, done))
+
+    def cancel(self):
+        """Cancels every running speculation, because real work has arrived."""
+        for task in self._tasks.values():
+            task.cancel()
+
+    def record_request(self, client_id: str, fen: str):
+        """
+        Scores a client's speculation against the position it actually
+        sent: a precomputed match is a hit, every other one is wasted.
+        """
+        ready = self._ready.pop(client_id, None)
+        if not ready:
+            return
+        try:
+            key = position_key(chess.Board(fen))
+        except ValueError:
+            key = None
+        if key in ready:
+            ready.discard(key)
+            self._count("hit")
+        self._count("wasted", len(ready))
+
+    def stats(self) -> dict[str, int]:
+        """Returns the speculation counters and the hit and waste ratios."""
+        hits, wasted = self.outcomes["hit"], self.outcomes["wasted"]
+        scored = hits + wasted
+        return {
+            "running": len(self._tasks),
+            "hits": hits,
+            "wasted": wasted,
+            "cancelled": self.outcomes["cancelled"],
+            "hit_rate_pct": round(100 * hits / scored) if scored else 0,
+            "waste_rate_pct": round(100 * wasted / scored) if scored else 0,
+        }
+
+    async def _run(self, client_id: str, fen: str):
+        candidates: list[chess.Move] = []
+        done = 0
+        try:
+            board = chess.Board(fen)
+            await self._wait_until_idle()
+            analysis = await self.analyse(board)
+            candidates = analysis.best_moves(board)[:self.top_k]
+            ready = self._new_ready_set(client_id)
+            for move in candidates:
+                san = board.san(move)
+                child = board.copy(stack=False)
+                child.push(move)
+                await self._wait_until_idle()
+                try:
+                    await self._precompute(child, san)
+                except Exception as e:
+                    log.warning("SPECULATION_FAILED", fen=child.fen(), error=str(e))
+                else:
+                    ready.add(position_key(child))
+                done += 1
+        except asyncio.CancelledError:
+            self._count("cancelled", len(candidates) - done)
+            raise
+        except Exception as e:
+            log.warning("SPECULATION_FAILED", fen=fen, error=str(e))
+
+    async def _precompute(self, board: chess.Board, san: str):
+        await self.analyse(board)
+        fen = board.fen()
+        await self.retrieve(fen)
+        if self.coach:
+            await self.coach(fen, san)
+
+    async def _wait_until_idle(self):
+        while not self.is_idle():
+            await asyncio.sleep(self.idle_poll_interval)
+
+    def _new_ready_set(self, client_id: str) -> set[str]:
+        """
+        Starts a client's set of precomputed positions. Positions left over
+        from an earlier speculation, or from the oldest clients once
+        ``max_clients`` is reached, are counted as wasted.
+        """
+        self._count("wasted", len(self._ready.pop(client_id, ())))
+        ready = self._ready[client_id] = set()
+        while len(self._ready) > self.max_clients:
+            _, evicted = self._ready.popitem(last=False)
+            self._count("wasted", len(evicted))
+        return ready
+
+    def _forget_task(self, client_id: str, task: asyncio.Task):
+        if self._tasks.get(client_id) is task:
+            del self._tasks[client_id]
+
+    def _count(self, outcome: str, amount: int = 1):
+        if amount > 0:
+            self.outcomes[outcome] += amount
+            SPECULATIVE_POSITIONS.labels(outcome=outcome).inc(amount)
@@ -0,0 +1,156 @@
+"""ChessMate Cognitive Service - Toolbox Client Manager
+
+This module manages a single long-lived genai-toolbox client. The HTTP
+session is kept alive between requests and the loaded tool handle is
+reused, so a retrieval costs one round trip instead of three. The handle
+is reloaded periodically and whenever a call fails in a way that suggests
+the tool's schema has changed on the server.
+
+Author: Vyaakar Labs <r.raajey@gmail.com>
+Location: India
+License: MIT
+"""
+import asyncio
+import inspect
+import time
+from typing import Any, Optional
+
+import aiohttp
+import structlog
+from toolbox_core import ToolboxClient
+from toolbox_core.tool import ToolboxTool
+
+from app.config import settings
+
+log = structlog.get_logger()
+
+
+class ToolboxClientManager:
+    """
+    Owns a keep-alive HTTP session, a ToolboxClient bound to it and a cached
+    handle for one tool. Concurrent calls are bounded by a semaphore and
+    every call is subject to a timeout.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        tool_name: str,
+        timeout: float = 5.0,
+        max_concurrency: int = 16,
+        tool_refresh_interval: float = 300.0,
+        keepalive_timeout: float = 30.0,
+    ):
+        self.url = url
+        self.tool_name = tool_name
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.tool_refresh_interval = tool_refresh_interval
+        self.keepalive_timeout = keepalive_timeout
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._client: Optional[ToolboxClient] = None
+        self._tool: Optional[ToolboxTool] = None
+        self._tool_signature: Optional[str] = None
+        self._tool_loaded_at = 0.0
+        self._tool_lock = asyncio.Lock()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+        self.in_flight = 0
+        self.calls = 0
+        self.timeouts = 0
+        self.tool_reloads = 0
+
+    async def invoke(self, **params: Any) -> Any:
+        """
+        Invokes the tool with ``params``.
+
+        Raises:
+            asyncio.TimeoutError: If the call, including waiting for a free
+                slot and loading the tool, exceeds the timeout.
+        """
+        try:
+            return await asyncio.wait_for(self._invoke(params), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            log.warn("TOOLBOX_REQUEST_TIMEOUT", tool=self.tool_name, timeout=self.timeout)
+            raise
+
+    async def close(self) -> None:
+        """Closes the toolbox client and its HTTP session."""
+        if self._client:
+            await self._client.close()
+            self._client = None
+        if self._session:
+            await self._session.close()
+            self._session = None
+        self._tool = None
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "calls": self.calls,
+            "timeouts": self.timeouts,
+            "tool_reloads": self.tool_reloads,
+            "in_flight": self.in_flight,
+        }
+
+    async def _invoke(self, params: dict[str, Any]) -> Any:
+        async with self._semaphore:
+            self.calls += 1
+            self.in_flight += 1
+            try:
+                tool = await self._get_tool()
+                try:
+                    return await tool(**params)
+                except TypeError as e:
+                    # The arguments no longer match the cached signature, which
+                    # means the tool was redefined on the server.
+                    log.warn("TOOLBOX_TOOL_SIGNATURE_MISMATCH", tool=self.tool_name, error=str(e))
+                    tool = await self._get_tool(force_reload=True)
+                    return await tool(**params)
+            finally:
+                self.in_flight -= 1
+
+    async def _get_tool(self, force_reload: bool = False) -> ToolboxTool:
+        if self._tool and not force_reload and not self._tool_is_stale():
+            return self._tool
+        async with self._tool_lock:
+            if self._tool and not force_reload and not self._tool_is_stale():
+                return self._tool
+            tool = await self._toolbox_client().load_tool(self.tool_name)
+            signature = str(inspect.signature(tool))
+            if self._tool_signature is not None and signature != self._tool_signature:
+                log.info(
+                    "TOOLBOX_TOOL_SCHEMA_CHANGED",
+                    tool=self.tool_name,
+                    old=self._tool_signature,
+                    new=signature,
+                )
+            self._tool = tool
+            self._tool_signature = signature
+            self._tool_loaded_at = time.monotonic()
+            self.tool_reloads += 1
+            return tool
+
+    def _tool_is_stale(self) -> bool:
+        return time.monotonic() - self._tool_loaded_at >= self.tool_refresh_interval
+
+    def _toolbox_client(self) -> ToolboxClient:
+        if self._client is None:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.max_concurrency,
+                    keepalive_timeout=self.keepalive_timeout,
+                ),
+            )
+            self._client = ToolboxClient(self.url, session=self._session)
+        return self._client
+
+
+toolbox_client = ToolboxClientManager(
+    url=settings.mcp_toolbox_url,
+    tool_name="search_chess_knowledge",
+    timeout=settings.genai_toolbox_timeout,
+    max_concurrency=settings.toolbox_max_concurrency,
+    tool_refresh_interval=settings.toolbox_tool_refresh_interval,
+)
@@ -0,0 +1,239 @@
+"""ChessMate Cognitive Service - Work Queue Transports
+
+This module defines the transports the AgentIOService uses to take work
+off Redis. The list transport pops messages with BLPOP, which removes them
+before any processing happens. The streams transport reads through a
+consumer group, acknowledges each message only once its response has been
+published, and reclaims messages left pending by consumers that died.
+
+Author: Vyaakar Labs <r.raajey@gmail.com>
+Location: India
+License: MIT
+"""
+import os
+import socket
+import time
+from dataclasses import dataclass
+from typing import Optional, Union
+
+import redis.asyncio as aioredis
+import structlog
+
+log = structlog.get_logger()
+
+
+@dataclass
+class WorkItem:
+    """A raw message taken from a work queue."""
+    queue: str
+    payload: str
+    message_id: Optional[str] = None
+
+
+class ListWorkQueue:
+    """
+    Consumes Redis lists. A batch is taken with pipelined LPOPs in a single
+    round trip, and BLPOP is only used to block when every list is empty.
+    Messages are removed when they are read, so acknowledging them is a
+    no-op.
+    """
+
+    name = "list"
+
+    def __init__(self, redis_client: aioredis.Redis):
+        self.redis_client = redis_client
+
+    async def setup(self, queues: list[str]) -> None:
+        pass
+
+    async def fetch(self, queues: list[str], count: int, timeout: float) -> list[WorkItem]:
+        """Takes up to ``count`` messages from each queue."""
+        items = await self._pop_batch(queues, count)
+        if items:
+            return items
+
+        popped = await self.redis_client.blpop(keys=queues, timeout=timeout)
+        if popped is None:
+            return []
+        queue_name, payload = popped
+        items = [WorkItem(queue=queue_name, payload=payload)]
+        if count > 1:
+            items.extend(await self._pop_batch([queue_name], count - 1))
+        return items
+
+    async def ack(self, item: WorkItem) -> None:
+        pass
+
+    async def depth(self, queue: str) -> int:
+        return await self.redis_client.llen(queue)
+
+    async def _pop_batch(self, queues: list[str], count: int) -> list[WorkItem]:
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for queue in queues:
+                pipe.lpop(queue, count)
+            results = await pipe.execute()
+        return [
+            WorkItem(queue=queue, payload=payload)
+            for queue, payloads in zip(queues, results)
+            for payload in payloads or []
+        ]
+
+
+class StreamWorkQueue:
+    """
+    Consumes Redis Streams through a consumer group.
+
+    Messages are read in batches with XREADGROUP and stay in the group's
+    pending entries list until ``ack`` is called, so a worker that crashes
+    mid-flight does not lose them: any consumer reclaims entries that have
+    been idle for longer than ``claim_min_idle`` with XAUTOCLAIM. Entries
+    delivered more than ``max_deliveries`` times are treated as poison: they
+    are moved to a ``<stream>:dead`` stream and acknowledged instead of being
+    retried forever. Streams are trimmed to roughly ``max_len`` entries.
+
+    ``claim_min_idle`` must be longer than the slowest handler is allowed to
+    run, otherwise a message still being coached is claimed and coached a
+    second time.
+    """
+
+    name = "streams"
+
+    def __init__(
+        self,
+        redis_client: aioredis.Redis,
+        group: str = "cognitive-service",
+        consumer: Optional[str] = None,
+        claim_min_idle: float = 180.0,
+        maintenance_interval: float = 15.0,
+        max_len: int = 10000,
+        max_deliveries: int = 5,
+    ):
+        self.redis_client = redis_client
+        self.group = group
+        self.consumer = consumer or f"{socket.gethostname()}-{os.getpid()}"
+        self.claim_min_idle = claim_min_idle
+        self.maintenance_interval = maintenance_interval
+        self.max_len = max_len
+        self.max_deliveries = max_deliveries
+        self._last_maintenance = 0.0
+        self.reclaimed = 0
+        self.dead_lettered = 0
+
+    async def setup(self, queues: list[str]) -> None:
+        """Creates the consumer group on every stream if it does not exist."""
+        for queue in queues:
+            try:
+                await self.redis_client.xgroup_create(queue, self.group, id="0", mkstream=True)
+                log.info("STREAM_GROUP_CREATED", stream=queue, group=self.group)
+            except aioredis.ResponseError as e:
+                if "BUSYGROUP" not in str(e):
+                    raise
+
+    async def fetch(self, queues: list[str], count: int, timeout: float) -> list[WorkItem]:
+        if time.monotonic() - self._last_maintenance >= self.maintenance_interval:
+            self._last_maintenance = time.monotonic()
+            await self._trim(queues)
+            reclaimed = await self._reclaim(queues, count)
+            if reclaimed:
+                return reclaimed
+
+        response = await self.redis_client.xreadgroup(
+            self.group,
+            self.consumer,
+            dict.fromkeys(queues, ">"),
+            count=count,
+            block=max(1, int(timeout * 1000)),
+        )
+        items = []
+        for stream, entries in response or []:
+            for message_id, fields in entries:
+                items.append(WorkItem(queue=stream, payload=(fields or {}).get("payload"), message_id=message_id))
+        return items
+
+    async def ack(self, item: WorkItem) -> None:
+        await self.redis_client.xack(item.queue, self.group, item.message_id)
+
+    async def depth(self, queue: str) -> int:
+        """Returns the number of entries not yet delivered to the group."""
+        groups = await self.redis_client.xinfo_groups(queue)
+        for group in groups:
+            if group.get("name") == self.group:
+                lag = group.get("lag")
+                if lag is not None:
+                    return lag
+        return await self.redis_client.xlen(queue)
+
+    async def _reclaim(self, queues: list[str], count: int) -> list[WorkItem]:
+        items = []
+        for queue in queues:
+            if len(items) >= count:
+                break
+            # Redis 6.2 replies [next_id, entries]; 7.0 adds the deleted ids.
+            reply = await self.redis_client.xautoclaim(
+                queue,
+                self.group,
+                self.consumer,
+                min_idle_time=int(self.claim_min_idle * 1000),
+                start_id="0-0",
+                count=count - len(items),
+            )
+            entries = reply[1]
+            if not entries:
+                continue
+            deliveries = await self._delivery_counts(queue, [message_id for message_id, _ in entries])
+            for message_id, fields in entries:
+                item = WorkItem(queue=queue, payload=(fields or {}).get("payload"), message_id=message_id)
+                if deliveries.get(message_id, 0) > self.max_deliveries:
+                    await self._dead_letter(item, deliveries[message_id])
+                else:
+                    items.append(item)
+        if items:
+            self.reclaimed += len(items)
+            log.warning("STREAM_MESSAGES_RECLAIMED", count=len(items), consumer=self.consumer)
+        return items
+
+    async def _delivery_counts(self, queue: str, message_ids: list[str]) -> dict[str, int]:
+        """Reads each entry's delivery count from the group's pending list."""
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for message_id in message_ids:
+                pipe.xpending_range(queue, self.group, min=message_id, max=message_id, count=1)
+            results = await pipe.execute()
+        return {
+            entry["message_id"]: entry["times_delivered"]
+            for pending in results
+            for entry in pending
+        }
+
+    async def _dead_letter(self, item: WorkItem, deliveries: int) -> None:
+        """Moves a poison entry to the dead-letter stream and acknowledges it."""
+        dead_stream = f"{item.queue}:dead"
+        await self.redis_client.xadd(
+            dead_stream,
+            {"payload": item.payload or "", "message_id": item.message_id, "deliveries": deliveries},
+            maxlen=self.max_len,
+            approximate=True,
+        )
+        await self.ack(item)
+        self.dead_lettered += 1
+        log.error("STREAM_MESSAGE_DEAD_LETTERED", stream=item.queue, dead_stream=dead_stream,
+                  message_id=item.message_id, deliveries=deliveries)
+
+    async def _trim(self, queues: list[str]) -> None:
+        for queue in queues:
+            await self.redis_client.xtrim(queue, maxlen=self.max_len, approximate=True)
+
+
+WorkQueue = Union[ListWorkQueue, StreamWorkQueue]
+
+
+def create_work_queue(config, redis_client: aioredis.Redis) -> WorkQueue:
+    """Builds the work queue transport selected by ``work_queue_transport``."""
+    if config.work_queue_transport == "streams":
+        return StreamWorkQueue(
+            redis_client,
+            group=config.stream_consumer_group,
+            claim_min_idle=config.stream_claim_min_idle,
+            max_len=config.stream_max_len,
+            max_deliveries=config.stream_max_deliveries,
+        )
+    return ListWorkQueue(redis_client)
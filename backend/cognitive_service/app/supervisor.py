@@ -0,0 +1,214 @@
+"""ChessMate Cognitive Service - Worker Supervisor
+
+This module is a multi-process entry point for the cognitive service. One
+asyncio process shares a single core between the event loop and CPU work
+(python-chess, JSON parsing, log rendering), so the supervisor starts
+several worker processes, each running the full service from ``app.main``
+against the shared Redis work queues.
+
+The supervisor restarts workers that crash, with a per-slot backoff,
+forwards SIGINT and SIGTERM to every worker, and serves one combined
+Prometheus view of all workers through prometheus_client's multiprocess
+mode. In-process caches and the Stockfish engine pool are per worker.
+
+Author: Vyaakar Labs <r.raajey@gmail.com>
+Location: India
+License: MIT
+"""
+import asyncio
+import multiprocessing
+import os
+import shutil
+import signal
+import time
+from dataclasses import dataclass
+from multiprocessing.connection import wait
+from multiprocessing.process import BaseProcess
+from typing import Optional
+
+import structlog
+
+from app.config import settings
+from app.logger import setup_logging_from
+
+log = structlog.get_logger()
+
+# A worker that stays up this long has its restart backoff reset.
+HEALTHY_UPTIME = 60.0
+
+
+def run_worker(worker_id: int):
+    """Runs the cognitive service in a worker process."""
+    structlog.contextvars.bind_contextvars(worker_id=worker_id)
+    os.environ["WORKER_ID"] = str(worker_id)
+    # Imported here so the worker's metrics are created after the
+    # multiprocess directory is set in its environment.
+    from app.main import main
+
+    try:
+        asyncio.run(main())
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        log.info("Worker event loop stopped.")
+
+
+@dataclass
+class WorkerSlot:
+    """A worker slot and the process currently filling it."""
+    worker_id: int
+    process: Optional[BaseProcess] = None
+    started_at: float = 0.0
+    restarts: int = 0
+    backoff: float = 0.0
+    restart_at: float = 0.0
+
+
+class Supervisor:
+    """
+    Keeps ``workers`` worker processes running until it receives SIGINT or
+    SIGTERM, then stops them within ``shutdown_timeout`` seconds.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        metrics_dir: str,
+        metrics_port: int = 0,
+        metrics_host: str = "0.0.0.0",
+        max_backoff: float = 30.0,
+        shutdown_timeout: float = 20.0,
+    ):
+        self.context = multiprocessing.get_context("spawn")
+        self.slots = [WorkerSlot(worker_id=i) for i in range(workers)]
+        self.metrics_dir = metrics_dir
+        self.metrics_port = metrics_port
+        self.metrics_host = metrics_host
+        self.max_backoff = max_backoff
+        self.shutdown_timeout = shutdown_timeout
+        self.stopping = False
+
+    def run(self):
+        """Starts the workers and supervises them until a shutdown signal."""
+        self._prepare_metrics_dir()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, self._handle_signal)
+        if self.metrics_port:
+            self._serve_metrics()
+
+        log.info("SUPERVISOR_STARTING", workers=len(self.slots), pid=os.getpid())
+        for slot in self.slots:
+            self._start(slot)
+        try:
+            while not self.stopping:
+                self._supervise_once(timeout=1.0)
+        finally:
+            self._stop_all()
+        log.info("SUPERVISOR_STOPPED")
+
+    def _supervise_once(self, timeout: float):
+        """Waits for a worker to exit, then restarts any slot that is due."""
+        sentinels = [slot.process.sentinel for slot in self.slots if slot.process]
+        if sentinels:
+            wait(sentinels, timeout=timeout)
+        else:
+            time.sleep(timeout)
+
+        now = time.monotonic()
+        for slot in self.slots:
+            if slot.process and not slot.process.is_alive():
+                self._reap(slot, now)
+            if slot.process is None and not self.stopping and now >= slot.restart_at:
+                self._start(slot)
+
+    def _start(self, slot: WorkerSlot):
+        process = self.context.Process(
+            target=run_worker,
+            args=(slot.worker_id,),
+            name=f"cognitive-worker-{slot.worker_id}",
+        )
+        process.start()
+        slot.process = process
+        slot.started_at = time.monotonic()
+        log.info("SUPERVISOR_WORKER_STARTED", worker_id=slot.worker_id, pid=process.pid)
+
+    def _reap(self, slot: WorkerSlot, now: float):
+        """Records a worker's exit and schedules its restart with backoff."""
+        process = slot.process
+        self._mark_dead(process.pid)
+        slot.process = None
+        if self.stopping:
+            return
+
+        if now - slot.started_at >= HEALTHY_UPTIME:
+            slot.backoff = 0.0
+        slot.backoff = min(self.max_backoff, slot.backoff * 2 if slot.backoff else 1.0)
+        slot.restart_at = now + slot.backoff
+        slot.restarts += 1
+        log.error(
+            "SUPERVISOR_WORKER_EXITED",
+            worker_id=slot.worker_id,
+            pid=process.pid,
+            exitcode=process.exitcode,
+            restart_in=slot.backoff,
+            restarts=slot.restarts,
+        )
+
+    def _handle_signal(self, signum: int, frame):
+        if not self.stopping:
+            log.info("SUPERVISOR_SIGNAL_RECEIVED", signal=signal.Signals(signum).name)
+        self.stopping = True
+
+    def _stop_all(self):
+        """Sends SIGTERM to every worker and kills the ones that outlive the timeout."""
+        self.stopping = True
+        running = [slot.process for slot in self.slots if slot.process and slot.process.is_alive()]
+        for process in running:
+            process.terminate()
+        deadline = time.monotonic() + self.shutdown_timeout
+        for process in running:
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                log.warning("SUPERVISOR_WORKER_KILLED", pid=process.pid)
+                process.kill()
+                process.join()
+            self._mark_dead(process.pid)
+        for slot in self.slots:
+            slot.process = None
+
+    def _prepare_metrics_dir(self):
+        """Starts from an empty multiprocess metrics directory."""
+        shutil.rmtree(self.metrics_dir, ignore_errors=True)
+        os.makedirs(self.metrics_dir, exist_ok=True)
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = self.metrics_dir
+
+    def _serve_metrics(self):
+        from prometheus_client import CollectorRegistry, start_http_server
+        from prometheus_client.multiprocess import MultiProcessCollector
+
+        registry = CollectorRegistry()
+        MultiProcessCollector(registry, path=self.metrics_dir)
+        start_http_server(self.metrics_port, addr=self.metrics_host, registry=registry)
+        log.info("SUPERVISOR_METRICS_SERVING", port=self.metrics_port)
+
+    def _mark_dead(self, pid: Optional[int]):
+        if pid is None:
+            return
+        from prometheus_client.multiprocess import mark_process_dead
+
+        mark_process_dead(pid, self.metrics_dir)
+
+
+def main():
+    setup_logging_from(settings)
+    workers = settings.worker_processes or os.cpu_count() or 1
+    Supervisor(
+        workers=workers,
+        metrics_dir=settings.metrics_multiproc_dir,
+        metrics_port=settings.metrics_port,
+        metrics_host=settings.metrics_host,
+        max_backoff=settings.worker_restart_max_backoff,
+        shutdown_timeout=settings.worker_shutdown_timeout,
+    ).run()
+
+
+if __name__ == "__main__":
+    main()
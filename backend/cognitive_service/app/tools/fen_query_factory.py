@@ -8,12 +8,17 @@ Location: India
 License: MIT
 """
 
-import asyncio
 import chess
 import chess.engine
-from typing import List
+from typing import Optional
 import structlog
 
+from app.config import settings
+from app.core.exceptions import EngineUnavailableError
+from app.core.metrics import time_stage
+from app.services.analysis_cache import AnalysisCache, PositionAnalysis, analysis_cache
+from app.services.engine_pool import StockfishEnginePool, engine_pool
+
 log = structlog.get_logger()
 
 class FENQueryFactory:
@@ -21,27 +26,37 @@ class FENQueryFactory:
     A factory to generate natural language queries from a FEN string for semantic search.
     """
 
-    def __init__(self, stockfish_path: str = "/usr/games/stockfish"):
+    def __init__(
+        self,
+        pool: Optional[StockfishEnginePool] = None,
+        cache: Optional[AnalysisCache] = None,
+    ):
         """
-        Initializes the factory with the path to the Stockfish engine.
+        Initializes the factory with the engine pool to borrow Stockfish from
+        and the transposition cache that stores its analyses.
         """
-        self.stockfish_path = stockfish_path
-        self.engine = None
+        self.engine_pool = pool or engine_pool
+        self.analysis_cache = cache or analysis_cache
+        self.limit = chess.engine.Limit(time=settings.analysis_time_limit)
+        self.multipv = settings.analysis_multipv
 
-    async def __aenter__(self):
-        """Asynchronously opens the engine."""
-        try:
-            transport, engine = await chess.engine.popen_uci(self.stockfish_path)
-            self.engine = engine
-        except FileNotFoundError:
-            log.error("FEN_QUERY_FACTORY_STOCKFISH_ERROR", error="Stockfish engine not found", path=self.stockfish_path)
-            self.engine = None
-        return self
+    async def analyse(self, board: chess.Board) -> PositionAnalysis:
+        """
+        Returns the MultiPV analysis for a position, consulting the
+        transposition cache before borrowing an engine.
+        """
+        cached = await self.analysis_cache.get(board, self.limit, self.multipv)
+        if cached:
+            log.info("FEN_QUERY_FACTORY_ANALYSIS_CACHE_HIT", depth=cached.depth)
+            return cached
 
-    async def __aexit__(self, exc_type, exc_val, exc_tb):
-        """Asynchronously closes the engine."""
-        if self.engine:
-            await self.engine.quit()
+        # Includes waiting for an engine, which is how a busy pool shows up.
+        with time_stage("analysis", "stockfish"):
+            async with self.engine_pool.acquire() as engine:
+                info = await engine.analyse(board, self.limit, multipv=self.multipv)
+        analysis = PositionAnalysis.from_engine_info(board, info, self.limit, self.multipv)
+        await self.analysis_cache.put(board, analysis)
+        return analysis
 
     async def generate_query(self, fen: str) -> str:
         """
@@ -53,10 +68,6 @@ class FENQueryFactory:
         Returns:
             A natural language query describing the position and best moves.
         """
-        if not self.engine:
-            log.warn("FEN_QUERY_FACTORY_NO_ENGINE", msg="Stockfish engine not available, returning basic query.")
-            return "General chess principles and openings"
-            
         query = ""
         try:
             board = chess.Board(fen)
@@ -65,18 +76,15 @@ class FENQueryFactory:
             turn = "White" if board.turn == chess.WHITE else "Black"
             move_number = board.fullmove_number
             
-            # Analyze the position for the top 3 moves
-            info = await self.engine.analyse(board, chess.engine.Limit(time=0.1), multipv=3)
-            
-            best_moves = []
-            for move_info in info:
-                if "pv" in move_info and move_info["pv"]:
-                    move = move_info["pv"][0]
-                    san = board.san(move)
-                    best_moves.append(san)
-            
+            # Analyze the position for the top moves
+            analysis = await self.analyse(board)
+            best_moves = [board.san(move) for move in analysis.best_moves(board)]
+
             query = f"Chess position analysis for {turn} to move on move {move_number}. Key moves to consider are {', '.join(best_moves)}. Focus on opening theory, middle game strategy, or tactical opportunities related to this board state."
 
+        except EngineUnavailableError as e:
+            log.warn("FEN_QUERY_FACTORY_NO_ENGINE", msg="Stockfish engine not available, returning basic query.", error=str(e))
+            return "General chess principles and openings"
         except chess.engine.EngineTerminatedError as e:
             log.error("FEN_QUERY_FACTORY_STOCKFISH_ERROR", error=str(e), fen=fen)
             return "General chess strategy"
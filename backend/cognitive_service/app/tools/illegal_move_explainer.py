@@ -0,0 +1,253 @@
+"""ChessMate Illegal Move Explainer
+
+This module defines the IllegalMoveExplainer, a deterministic responder for
+illegal move attempts. The attempted move, the position and the legal moves
+are fully structured, so python-chess can tell exactly why a move is not
+allowed (a pinned piece, a king left in check, a blocked path or a piece
+that does not move that way) and the explanation is rendered from
+localized templates without an LLM call.
+
+Author: Vyaakar Labs <r.raajey@gmail.com>
+Location: India
+License: MIT
+"""
+from dataclasses import dataclass, field
+from typing import Optional
+
+import chess
+
+from app.services.coaching_cache import fallback_payload
+
+DEFAULT_LANGUAGE = "en"
+
+TEMPLATES = {
+    "en": {
+        "no_piece": "There is no piece on {from_square} to move.",
+        "not_your_turn": "It is {turn}'s turn, so the {piece} on {from_square} cannot move right now.",
+        "same_square": "A piece has to move to a different square.",
+        "own_piece": "Your {piece} cannot move to {to_square} because one of your own pieces is already there.",
+        "in_check": "Your king is in check, and moving the {piece} to {to_square} does not get it out of check.",
+        "pinned": "Your {piece} on {from_square} is pinned: moving it would expose your king to attack.",
+        "king_into_check": "Your king cannot move to {to_square} because that square is attacked.",
+        "castling": "You cannot castle that way right now. The king and rook must not have moved, the squares between them must be empty, and the king cannot castle out of, through or into check.",
+        "blocked": "Your {piece} cannot reach {to_square} because another piece is in the way.",
+        "pawn_capture": "Pawns only move diagonally when they capture, and there is nothing to capture on {to_square}.",
+        "wrong_movement": "A {piece} does not move like that. {movement}",
+        "exposes_king": "Moving the {piece} to {to_square} would leave your king in check.",
+        "suggest_piece": "Your {piece} on {from_square} can go to: {moves}.",
+        "suggest_other": "That {piece} has no legal moves right now. You could try: {moves}.",
+        "suggest_any": "You could try: {moves}.",
+        "no_moves": "There are no legal moves in this position.",
+        "white": "White",
+        "black": "Black",
+        "pieces": {
+            chess.PAWN: "pawn", chess.KNIGHT: "knight", chess.BISHOP: "bishop",
+            chess.ROOK: "rook", chess.QUEEN: "queen", chess.KING: "king",
+        },
+        "movement": {
+            chess.PAWN: "Pawns move straight forward one square, or two from their starting square.",
+            chess.KNIGHT: "Knights move in an L shape: two squares one way and one square to the side.",
+            chess.BISHOP: "Bishops move diagonally.",
+            chess.ROOK: "Rooks move along ranks and files.",
+            chess.QUEEN: "Queens move along ranks, files and diagonals.",
+            chess.KING: "Kings move one square in any direction.",
+        },
+    },
+    "hi": {
+        "no_piece": "{from_square} पर चलने के लिए कोई मोहरा नहीं है।",
+        "not_your_turn": "अभी {turn} की चाल है, इसलिए {from_square} पर रखा {piece} अभी नहीं चल सकता।",
+        "same_square": "मोहरे को किसी दूसरे खाने पर जाना होगा।",
+        "own_piece": "आपका {piece} {to_square} पर नहीं जा सकता, क्योंकि वहाँ पहले से आपका ही एक मोहरा है।",
+        "in_check": "आपके राजा पर शह है, और {piece} को {to_square} पर ले जाने से शह नहीं हटती।",
+        "pinned": "{from_square} पर आपका {piece} बंधा हुआ है: उसे हटाने से आपका राजा हमले में आ जाएगा।",
+        "king_into_check": "आपका राजा {to_square} पर नहीं जा सकता, क्योंकि उस खाने पर हमला है।",
+        "castling": "अभी आप इस तरह कैसलिंग नहीं कर सकते। राजा और हाथी पहले चले नहीं होने चाहिए, उनके बीच के खाने खाली होने चाहिए, और राजा शह में, शह से होकर या शह में जाकर कैसलिंग नहीं कर सकता।",
+        "blocked": "आपका {piece} {to_square} तक नहीं पहुँच सकता, क्योंकि रास्ते में कोई दूसरा मोहरा है।",
+        "pawn_capture": "प्यादा तिरछा सिर्फ़ मारते समय चलता है, और {to_square} पर मारने के लिए कुछ नहीं है।",
+        "wrong_movement": "{piece} इस तरह नहीं चलता। {movement}",
+        "exposes_king": "{piece} को {to_square} पर ले जाने से आपके राजा पर शह आ जाएगी।",
+        "suggest_piece": "{from_square} पर आपका {piece} इन खानों पर जा सकता है: {moves}।",
+        "suggest_other": "उस {piece} के पास अभी कोई वैध चाल नहीं है। आप ये चालें आज़मा सकते हैं: {moves}।",
+        "suggest_any": "आप ये चालें आज़मा सकते हैं: {moves}।",
+        "no_moves": "इस स्थिति में कोई वैध चाल नहीं है।",
+        "white": "सफ़ेद",
+        "black": "काले",
+        "pieces": {
+            chess.PAWN: "प्यादा", chess.KNIGHT: "घोड़ा", chess.BISHOP: "ऊँट",
+            chess.ROOK: "हाथी", chess.QUEEN: "वज़ीर", chess.KING: "राजा",
+        },
+        "movement": {
+            chess.PAWN: "प्यादा सीधा एक खाना आगे चलता है, या अपने शुरुआती खाने से दो खाने।",
+            chess.KNIGHT: "घोड़ा ढाई घर चलता है: एक तरफ़ दो खाने और फिर बगल में एक खाना।",
+            chess.BISHOP: "ऊँट तिरछा चलता है।",
+            chess.ROOK: "हाथी सीधी पंक्तियों और स्तंभों में चलता है।",
+            chess.QUEEN: "वज़ीर सीधा और तिरछा, दोनों तरह चलता है।",
+            chess.KING: "राजा किसी भी दिशा में एक खाना चलता है।",
+        },
+    },
+}
+
+
+@dataclass
+class IllegalMoveExplanation:
+    """Why a move is illegal and what could be played instead."""
+    reason: str
+    message: str
+    legal_moves_by_piece: dict[str, list[str]] = field(default_factory=dict)
+    language: str = DEFAULT_LANGUAGE
+
+    def to_payload(self, request: Optional[dict] = None) -> dict:
+        """
+        Returns the explanation as a CoachingPayload, in the cognitive stage
+        of the ``request`` message and labelled with the template language.
+        """
+        payload = fallback_payload(self.message, request or {}, language=self.language)
+        payload["illegalMoveReason"] = self.reason
+        payload["legalMovesByPiece"] = self.legal_moves_by_piece
+        return payload
+
+
+class IllegalMoveExplainer:
+    """
+    Explains illegal move attempts from the position alone. Raises
+    ValueError for an invalid FEN or square, so the caller can fall back
+    to the LLM responder.
+    """
+
+    def __init__(self, language: str = DEFAULT_LANGUAGE, max_suggestions: int = 6, max_groups: int = 3):
+        self.language = language if language in TEMPLATES else DEFAULT_LANGUAGE
+        self.max_suggestions = max_suggestions
+        self.max_groups = max_groups
+
+    def explain(
+        self, fen: str, from_square: str, to_square: str, language: Optional[str] = None
+    ) -> IllegalMoveExplanation:
+        board = chess.Board(fen)
+        origin = chess.parse_square(from_square)
+        target = chess.parse_square(to_square)
+        language = language if language in TEMPLATES else self.language
+        templates = TEMPLATES[language]
+
+        reason = self.reason(board, origin, target)
+        piece = board.piece_at(origin)
+        piece_name = templates["pieces"][piece.piece_type] if piece else ""
+        sentence = templates[reason].format(
+            piece=piece_name,
+            from_square=from_square,
+            to_square=to_square,
+            turn=templates["white" if board.turn == chess.WHITE else "black"],
+            movement=templates["movement"][piece.piece_type] if piece else "",
+        )
+
+        by_piece = self.legal_moves_by_piece(board, templates)
+        suggestion = self._suggestion(board, origin, piece, piece_name, from_square, by_piece, templates)
+        return IllegalMoveExplanation(
+            reason=reason,
+            message=f"{sentence} {suggestion}",
+            legal_moves_by_piece=by_piece,
+            language=language,
+        )
+
+    def reason(self, board: chess.Board, origin: chess.Square, target: chess.Square) -> str:
+        """Returns the key of the template that explains why the move is illegal."""
+        piece = board.piece_at(origin)
+        if piece is None:
+            return "no_piece"
+        if piece.color != board.turn:
+            return "not_your_turn"
+        if origin == target:
+            return "same_square"
+        if self._is_castling_attempt(board, piece, origin, target):
+            return "castling"
+        occupant = board.piece_at(target)
+        if occupant and occupant.color == piece.color:
+            return "own_piece"
+
+        move = chess.Move(origin, target)
+        if piece.piece_type == chess.PAWN and chess.square_rank(target) in (0, 7):
+            move.promotion = chess.QUEEN
+        if board.is_pseudo_legal(move):
+            # The piece can make the move; it is illegal only because of the king.
+            if piece.piece_type == chess.KING:
+                return "king_into_check"
+            if board.is_check():
+                return "in_check"
+            if board.is_pinned(piece.color, origin):
+                return "pinned"
+            return "exposes_king"
+        return self._geometry_reason(board, piece, origin, target)
+
+    def legal_moves_by_piece(self, board: chess.Board, templates: dict) -> dict[str, list[str]]:
+        """Groups the legal moves in SAN by the piece that makes them, e.g. ``"knight on g1"``."""
+        grouped: dict[str, list[str]] = {}
+        for move in board.legal_moves:
+            piece = board.piece_at(move.from_square)
+            label = f"{templates['pieces'][piece.piece_type]} {chess.square_name(move.from_square)}"
+            grouped.setdefault(label, []).append(board.san(move))
+        return grouped
+
+    def _suggestion(
+        self,
+        board: chess.Board,
+        origin: chess.Square,
+        piece: Optional[chess.Piece],
+        piece_name: str,
+        from_square: str,
+        by_piece: dict[str, list[str]],
+        templates: dict,
+    ) -> str:
+        if not by_piece:
+            return templates["no_moves"]
+        own_moves = [board.san(move) for move in board.legal_moves if move.from_square == origin]
+        if own_moves:
+            moves = ", ".join(own_moves[:self.max_suggestions])
+            return templates["suggest_piece"].format(piece=piece_name, from_square=from_square, moves=moves)
+        groups = "; ".join(
+            f"{label}: {', '.join(moves[:3])}" for label, moves in list(by_piece.items())[:self.max_groups]
+        )
+        if piece is None or piece.color != board.turn:
+            return templates["suggest_any"].format(moves=groups)
+        return templates["suggest_other"].format(piece=piece_name, moves=groups)
+
+    @staticmethod
+    def _is_castling_attempt(board: chess.Board, piece: chess.Piece, origin: chess.Square, target: chess.Square) -> bool:
+        return (
+            piece.piece_type == chess.KING
+            and origin == (chess.E1 if piece.color == chess.WHITE else chess.E8)
+            and chess.square_rank(target) == chess.square_rank(origin)
+            and abs(chess.square_file(target) - chess.square_file(origin)) == 2
+        )
+
+    @staticmethod
+    def _geometry_reason(board: chess.Board, piece: chess.Piece, origin: chess.Square, target: chess.Square) -> str:
+        """
+        Explains a move the piece cannot make even ignoring the king: either
+        the piece does not move that way, or something blocks its path.
+        """
+        file_delta = chess.square_file(target) - chess.square_file(origin)
+        rank_delta = chess.square_rank(target) - chess.square_rank(origin)
+        blocked = bool(chess.between(origin, target) & board.occupied)
+        straight = file_delta == 0 or rank_delta == 0
+        diagonal = abs(file_delta) == abs(rank_delta)
+
+        if piece.piece_type == chess.PAWN:
+            forward = 1 if piece.color == chess.WHITE else -1
+            start_rank = 1 if piece.color == chess.WHITE else 6
+            if file_delta == 0 and (
+                rank_delta == forward
+                or (rank_delta == 2 * forward and chess.square_rank(origin) == start_rank)
+            ):
+                return "blocked"
+            if abs(file_delta) == 1 and rank_delta == forward:
+                return "pawn_capture"
+            return "wrong_movement"
+        if piece.piece_type in (chess.KNIGHT, chess.KING):
+            return "wrong_movement"
+        moves_that_way = {
+            chess.BISHOP: diagonal,
+            chess.ROOK: straight,
+            chess.QUEEN: diagonal or straight,
+        }[piece.piece_type]
+        if moves_that_way and blocked:
+            return "blocked"
+        return "wrong_movement"
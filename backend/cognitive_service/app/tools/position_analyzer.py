@@ -0,0 +1,230 @@
+"""ChessMate Position Analyzer
+
+This module defines the PositionAnalyzer, a deterministic replacement for
+the LLM-based game state analysis. Material, piece activity, checks and
+hanging pieces are computed exactly with python-chess, and the evaluation
+and best line come from the Stockfish analysis shared with the
+FENQueryFactory, so no LLM call is needed to describe a position.
+
+Author: Vyaakar Labs <r.raajey@gmail.com>
+Location: India
+License: MIT
+"""
+from dataclasses import dataclass, field
+from typing import Optional
+
+import chess
+import chess.engine
+import structlog
+
+from app.core.exceptions import EngineUnavailableError
+from app.tools.fen_query_factory import FENQueryFactory
+
+log = structlog.get_logger()
+
+PIECE_VALUES = {
+    chess.PAWN: 1,
+    chess.KNIGHT: 3,
+    chess.BISHOP: 3,
+    chess.ROOK: 5,
+    chess.QUEEN: 9,
+}
+COLOR_NAMES = {chess.WHITE: "White", chess.BLACK: "Black"}
+
+
+@dataclass
+class GameStateReport:
+    """The deterministic analysis of a single position."""
+    fen: str
+    turn: str
+    move_number: int
+    status: str
+    material: dict[str, int]
+    mobility: dict[str, int]
+    checks: list[str] = field(default_factory=list)
+    hanging: dict[str, list[str]] = field(default_factory=dict)
+    eval_cp: Optional[int] = None
+    mate: Optional[int] = None
+    best_line: list[str] = field(default_factory=list)
+
+    @property
+    def material_balance(self) -> int:
+        """White's material minus Black's, in pawns."""
+        return self.material["White"] - self.material["Black"]
+
+    def to_text(self) -> str:
+        """Renders the report as the text stored in ``game_state_analysis``."""
+        balance = self.material_balance
+        if balance == 0:
+            material = "Material is level"
+        else:
+            leader = "White" if balance > 0 else "Black"
+            material = f"{leader} is ahead by {abs(balance)}"
+
+        lines = [
+            f"Position: {self.fen}",
+            f"Turn: {self.turn} to move (move {self.move_number}). Status: {self.status}.",
+            f"Material: White {self.material['White']}, Black {self.material['Black']}. {material}.",
+            f"Piece activity (available moves): White {self.mobility['White']}, Black {self.mobility['Black']}.",
+            f"Checks available to {self.turn}: {', '.join(self.checks) or 'none'}.",
+        ]
+        for color in ("White", "Black"):
+            pieces = self.hanging.get(color) or []
+            lines.append(f"Hanging {color} pieces: {', '.join(pieces) or 'none'}.")
+
+        if self.mate is not None:
+            lines.append(f"Evaluation: mate in {abs(self.mate)} for "
+                         f"{self.turn if self.mate > 0 else self._opponent()}.")
+        elif self.eval_cp is not None:
+            lines.append(f"Evaluation: {self.eval_cp / 100:+.2f} pawns for {self.turn}.")
+        if self.best_line:
+            lines.append(f"Best move: {self.best_line[0]}. Best line: {' '.join(self.best_line)}.")
+        return "\n".join(lines)
+
+    def summary(self) -> str:
+        """
+        Renders a short student-facing summary, used as coaching when the
+        agent pipeline is skipped.
+        """
+        if self.status in ("checkmate", "stalemate", "draw by insufficient material"):
+            return f"The game is over: {self.status}."
+        balance = self.material_balance
+        if balance == 0:
+            sentences = [f"{self.turn} to move, and material is level."]
+        else:
+            leader = "White" if balance > 0 else "Black"
+            sentences = [f"{self.turn} to move, and {leader} is ahead by {abs(balance)}."]
+        hanging = self.hanging.get(self.turn) or []
+        if hanging:
+            sentences.append(f"Watch out: your {hanging[0]} can be captured.")
+        if self.best_line:
+            sentences.append(f"A strong move here is {self.best_line[0]}.")
+        elif self.checks:
+            sentences.append(f"Look at your checks: {', '.join(self.checks[:3])}.")
+        return " ".join(sentences)
+
+    def _opponent(self) -> str:
+        return "Black" if self.turn == "White" else "White"
+
+
+class PositionAnalyzer:
+    """
+    Computes a GameStateReport for a FEN without an LLM. The engine part is
+    optional: if Stockfish is unavailable the report omits the evaluation
+    and best line.
+    """
+
+    def __init__(self, query_factory: Optional[FENQueryFactory] = None, best_line_plies: int = 6):
+        self.query_factory = query_factory or FENQueryFactory()
+        self.best_line_plies = best_line_plies
+
+    async def analyse(self, fen: str) -> GameStateReport:
+        """
+        Returns the report for a position. Raises ValueError for a bad FEN
+        or an impossible position, such as the side not to move in check.
+        """
+        board = chess.Board(fen)
+        if not board.is_valid():
+            raise ValueError(f"impossible position ({board.status()!r})")
+        report = GameStateReport(
+            fen=fen,
+            turn=COLOR_NAMES[board.turn],
+            move_number=board.fullmove_number,
+            status=self._status(board),
+            material={COLOR_NAMES[c]: self._material(board, c) for c in chess.COLORS},
+            mobility={COLOR_NAMES[c]: self._mobility(board, c) for c in chess.COLORS},
+            checks=[board.san(move) for move in board.legal_moves if board.gives_check(move)],
+            hanging={COLOR_NAMES[c]: self._hanging(board, c) for c in chess.COLORS},
+        )
+        if not board.is_game_over():
+            await self._add_engine_analysis(board, report)
+        return report
+
+    async def describe(self, fen: str) -> str:
+        """Returns the report as text, or a short note if the FEN is invalid."""
+        try:
+            report = await self.analyse(fen)
+        except ValueError as e:
+            log.warning("POSITION_ANALYZER_INVALID_FEN", fen=fen, error=str(e))
+            return f"The position could not be analysed: invalid FEN '{fen}'."
+        return report.to_text()
+
+    async def summarize(self, fen: str) -> str:
+        """Returns the report's short summary, or a general tip if the FEN is invalid."""
+        try:
+            report = await self.analyse(fen)
+        except ValueError as e:
+            log.warning("POSITION_ANALYZER_INVALID_FEN", fen=fen, error=str(e))
+            return "Keep developing your pieces, control the center and keep your king safe."
+        return report.summary()
+
+    async def _add_engine_analysis(self, board: chess.Board, report: GameStateReport):
+        try:
+            analysis = await self.query_factory.analyse(board)
+        except (EngineUnavailableError, chess.engine.EngineError) as e:
+            log.warning("POSITION_ANALYZER_NO_ENGINE", error=str(e))
+            return
+        if not analysis.lines:
+            return
+
+        line = analysis.lines[0]
+        report.eval_cp = line.get("score_cp")
+        report.mate = line.get("mate")
+        replay = board.copy(stack=False)
+        for uci in line["pv"][:self.best_line_plies]:
+            move = chess.Move.from_uci(uci)
+            if move not in replay.legal_moves:
+                break
+            report.best_line.append(replay.san(move))
+            replay.push(move)
+
+    @staticmethod
+    def _status(board: chess.Board) -> str:
+        if board.is_checkmate():
+            return "checkmate"
+        if board.is_stalemate():
+            return "stalemate"
+        if board.is_insufficient_material():
+            return "draw by insufficient material"
+        if board.is_check():
+            return f"{COLOR_NAMES[board.turn]} is in check"
+        return "in progress"
+
+    @staticmethod
+    def _material(board: chess.Board, color: chess.Color) -> int:
+        return sum(
+            value * len(board.pieces(piece_type, color))
+            for piece_type, value in PIECE_VALUES.items()
+        )
+
+    @staticmethod
+    def _mobility(board: chess.Board, color: chess.Color) -> int:
+        """
+        Counts the moves available to ``color``: legal moves for the side to
+        move, pseudo-legal moves for the other side.
+        """
+        if board.turn == color:
+            return board.legal_moves.count()
+        flipped = board.copy(stack=False)
+        flipped.turn = color
+        flipped.ep_square = None
+        return flipped.pseudo_legal_moves.count()
+
+    @staticmethod
+    def _hanging(board: chess.Board, color: chess.Color) -> list[str]:
+        """
+        Lists pieces of ``color`` that are attacked and either undefended or
+        attacked by a cheaper piece.
+        """
+        hanging = []
+        for square, piece in board.piece_map().items():
+            if piece.color != color or piece.piece_type == chess.KING:
+                continue
+            attackers = board.attackers(not color, square)
+            if not attackers:
+                continue
+            value = PIECE_VALUES[piece.piece_type]
+            cheapest = min(PIECE_VALUES.get(board.piece_type_at(s), 100) for s in attackers)
+            if not board.attackers(color, square) or cheapest < value:
+                hanging.append(f"{chess.piece_name(piece.piece_type)} on {chess.square_name(square)}")
+        return hanging
@@ -16,11 +16,12 @@ from google.genai import types as genai_types
 from pydantic import BaseModel, Field
 import structlog
 from tenacity import retry, stop_after_attempt, wait_exponential
-from toolbox_core import ToolboxClient
 
 from app.config import settings
 from app.core.exceptions import RAGRetrievalError
-from app.services.cache_service import cache_service
+from app.core.metrics import time_stage
+from app.services.redis_cache import rag_cache
+from app.services.toolbox_client import toolbox_client
 from app.tools.fen_query_factory import FENQueryFactory
 
 log = structlog.get_logger()
@@ -82,27 +83,28 @@ class ChessKnowledgeRetrieverTool(BaseTool):
                 return self._get_static_fallback()
             raise RAGRetrievalError("Input validation failed for RAG tool.", "VALIDATION_ERROR") from e
 
-        async with self.fen_query_factory as factory:
-            query_terms = await factory.generate_query(validated_args.fen)
-            
+        with time_stage("rag", "query_generation"):
+            query_terms = await self.fen_query_factory.generate_query(validated_args.fen)
+
         cache_key = f"{query_terms}:{validated_args.cognitive_stage}"
-        if settings.enable_caching:
-            cached_result = cache_service.get(cache_key)
-            if cached_result:
-                log.info("RAG_CACHE_HIT", query=query_terms)
-                if isinstance(cached_result, list):
-                    return cached_result
-                else:
-                    log.warn("INVALID_CACHE_DATA_SKIPPED", key=cache_key, value=cached_result)
-
-        result: List[dict[str, Any]] = []
-        try:
-            result = await self._make_toolbox_request(
+        loaded = False
+
+        async def load() -> List[dict[str, Any]]:
+            nonlocal loaded
+            loaded = True
+            return await self._make_toolbox_request(
                 query_terms, [validated_args.cognitive_stage] # Pass as a list
             )
-            if settings.enable_caching:
-                cache_service.set(cache_key, result)
-                log.info("RAG_CACHE_SET", query=query_terms)
+
+        try:
+            if not settings.enable_caching:
+                return await load()
+
+            # Checks the local cache, then the cache shared by all replicas.
+            # Concurrent identical misses share a single toolbox call.
+            with time_stage("rag", "retrieval"):
+                result = await rag_cache.get_or_load(cache_key, load)
+            log.info("RAG_CACHE_SET" if loaded else "RAG_CACHE_HIT", query=query_terms)
             return result
 
         except RAGRetrievalError as e:
@@ -117,16 +119,15 @@ class ChessKnowledgeRetrieverTool(BaseTool):
         self, query_terms: str, cognitive_stages: List[str]
     ) -> List[dict[str, Any]]:
         try:
-            async with ToolboxClient(settings.mcp_toolbox_url) as client:
-                rag_tool = await client.load_tool("search_chess_knowledge")
-                params = {
-                    "query_terms": query_terms,
-                    "cognitive_stages": ",".join(cognitive_stages),
-                }
-                log.info("TOOLBOX_REQUEST_PARAMS", params=params)
-                result = await rag_tool(**params)
-                log.info("TOOLBOX_RESPONSE", response=result)
-                return result
+            params = {
+                "query_terms": query_terms,
+                "cognitive_stages": ",".join(cognitive_stages),
+            }
+            log.info("TOOLBOX_REQUEST_PARAMS", params=params)
+            with time_stage("rag", "toolbox"):
+                result = await toolbox_client.invoke(**params)
+            log.info("TOOLBOX_RESPONSE", response=result)
+            return result
         except Exception as e:
             log.error(
                 "TOOLBOX_REQUEST_EXCEPTION",
@@ -7,49 +7,77 @@ License: MIT
 
 import pytest
 import chess
-import chess.engine
-from unittest.mock import AsyncMock, patch
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock
+
+from app.core.exceptions import EngineUnavailableError
+from app.services.analysis_cache import AnalysisCache
 from app.tools.fen_query_factory import FENQueryFactory
 
+
+def make_pool(engine=None, error=None):
+    """Builds a stand-in engine pool that lends out the given engine."""
+    pool = MagicMock()
+
+    @asynccontextmanager
+    async def acquire():
+        if error:
+            raise error
+        yield engine
+
+    pool.acquire = acquire
+    return pool
+
+
 @pytest.mark.asyncio
-async def test_generate_keywords_success():
+async def test_generate_query_success():
     """
-    Tests that the factory correctly generates keywords from a FEN string
-    by mocking the Stockfish engine.
+    Tests that the factory builds a query from the top engine moves
+    using an engine borrowed from the pool.
     """
-    # Mock the engine's analysis result
     mock_analysis_result = [
         {"pv": [chess.Move.from_uci("e2e4")]},
         {"pv": [chess.Move.from_uci("d2d4")]},
         {"pv": [chess.Move.from_uci("g1f3")]},
     ]
+    mock_engine = AsyncMock()
+    mock_engine.analyse.return_value = mock_analysis_result
 
-    # Patch the SimpleEngine.popen_uci method
-    with patch("chess.engine.SimpleEngine.popen_uci") as mock_popen:
-        # Configure the async context manager
-        mock_engine = AsyncMock()
-        mock_engine.analyse.return_value = mock_analysis_result
-        
-        mock_context_manager = AsyncMock()
-        mock_context_manager.__aenter__.return_value = mock_engine
-        mock_popen.return_value = mock_context_manager
+    factory = FENQueryFactory(pool=make_pool(engine=mock_engine), cache=AnalysisCache())
+    fen = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+    query = await factory.generate_query(fen)
 
-        factory = FENQueryFactory()
-        fen = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
-        keywords = await factory.generate_keywords(fen)
+    assert "White to move on move 1" in query
+    assert "e4, d4, Nf3" in query
+    mock_engine.analyse.assert_called_once()
 
-        # Verify the results
-        assert keywords == ["best_move_1:e4", "best_move_2:d4", "best_move_3:Nf3"]
-        mock_engine.analyse.assert_called_once()
 
 @pytest.mark.asyncio
-async def test_stockfish_not_found():
+async def test_repeated_position_is_served_from_cache():
     """
-    Tests that the factory handles a FileNotFoundError gracefully.
+    Tests that a transposed position, differing only in its move clocks,
+    is answered from the analysis cache without borrowing an engine.
     """
-    with patch("chess.engine.SimpleEngine.popen_uci", side_effect=FileNotFoundError("stockfish not found")):
-        factory = FENQueryFactory()
-        fen = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
-        keywords = await factory.generate_keywords(fen)
-        assert keywords == ["stockfish_error"]
+    mock_engine = AsyncMock()
+    mock_engine.analyse.return_value = [{"pv": [chess.Move.from_uci("g8f6")]}]
 
+    factory = FENQueryFactory(pool=make_pool(engine=mock_engine), cache=AnalysisCache())
+    await factory.generate_query("rnbqkbnr/pppppppp/8/8/3P4/8/PPP1PPPP/RNBQKBNR b KQkq - 0 1")
+    query = await factory.generate_query("rnbqkbnr/pppppppp/8/8/3P4/8/PPP1PPPP/RNBQKBNR b KQkq - 4 9")
+
+    assert "Nf6" in query
+    mock_engine.analyse.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_engine_unavailable():
+    """
+    Tests that the factory falls back to a basic query when the pool
+    cannot provide an engine.
+    """
+    factory = FENQueryFactory(
+        pool=make_pool(error=EngineUnavailableError("no engine")), cache=AnalysisCache()
+    )
+    fen = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+    query = await factory.generate_query(fen)
+    assert query == "General chess principles and openings"
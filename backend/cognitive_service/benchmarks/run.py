@@ -0,0 +1,477 @@
+"""
+ChessMate Cognitive Service - Load Benchmark
+
+This script drives the real work queue listener and agent graphs with
+gateway-shaped messages and reports throughput, latency percentiles and
+memory. Redis, the toolbox and the LLM are replaced by local stand-ins
+(fakeredis unless --redis-url is given, FakeToolboxClient and StubLlm),
+so runs are repeatable on a laptop or in CI. fakeredis is a dev tool, not
+a runtime requirement: it is installed with the other dev tools in the
+image, which ``just benchmark`` uses.
+
+Load is closed-loop: each virtual client sends a message, waits for its
+coaching:message_ready reply and then sends the next one. Service
+settings can be overridden with --set KEY=VALUE, exactly as through the
+environment; with LLM_CACHE_MODE=record and then replay (and
+LLM_CACHE_BACKEND=disk) later runs replay the first run's LLM responses
+without their latency. With --output the report is written as JSON, and
+--baseline prints the change against an earlier report:
+
+    python -m benchmarks.run --messages 500 --concurrency 32 \\
+        --mix coaching=0.8,illegal=0.2 --output bench.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+import uuid
+from collections import defaultdict
+from typing import Any, Optional
+
+# Add the project root to the Python path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+REPORT_VERSION = 1
+MESSAGE_TYPES = {"coaching": "coaching_work_queue", "illegal": "illegal_move_work_queue"}
+# The metrics compared against a baseline, and whether higher is better.
+COMPARED_METRICS = {
+    "throughput_per_sec": True,
+    "latency_ms.p50": False,
+    "latency_ms.p95": False,
+    "latency_ms.p99": False,
+    "memory.max_rss_mb": False,
+}
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=200, help="Measured messages to send.")
+    parser.add_argument("--warmup", type=int, default=20, help="Messages sent before measuring.")
+    parser.add_argument("--concurrency", type=int, default=16, help="Virtual clients, each with one message outstanding.")
+    parser.add_argument("--mix", default="coaching=0.8,illegal=0.2", help="Relative weights of the message types.")
+    parser.add_argument("--positions", type=int, default=100, help="Distinct positions the clients play through.")
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0, help="Median LLM response time.")
+    parser.add_argument("--llm-sigma", type=float, default=0.5, help="Log-normal spread of LLM response times.")
+    parser.add_argument("--tokens", type=int, default=80, help="Mean LLM output length in tokens.")
+    parser.add_argument("--tokens-stddev", type=int, default=30)
+    parser.add_argument("--toolbox-latency-ms", type=float, default=30.0, help="Median toolbox response time.")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Seconds to wait for each reply.")
+    parser.add_argument("--redis-url", default="", help="Use this Redis instead of fakeredis. Its work queues are cleared.")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE", help="Override a service setting.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tracemalloc", action="store_true", help="Also report peak Python heap (slows the run).")
+    parser.add_argument("--output", help="Write the report to this JSON file.")
+    parser.add_argument("--baseline", help="Compare against a report written by an earlier run.")
+    return parser.parse_args(argv)
+
+
+def parse_mix(mix: str) -> dict[str, float]:
+    """Parses ``coaching=0.8,illegal=0.2`` into normalised weights."""
+    weights = {}
+    for part in filter(None, (p.strip() for p in mix.split(","))):
+        name, _, weight = part.partition("=")
+        if name not in MESSAGE_TYPES:
+            raise ValueError(f"Unknown message type in --mix: {name}")
+        weights[name] = float(weight or 1)
+    total = sum(weights.values())
+    if total <= 0:
+        raise ValueError("--mix needs at least one positive weight")
+    return {name: weight / total for name, weight in weights.items() if weight > 0}
+
+
+def configure_environment(args: argparse.Namespace) -> None:
+    """Applies setting overrides before the app modules read their settings."""
+    os.environ.setdefault("POSTGRES_URL", "postgresql://benchmark@localhost/benchmark")
+    os.environ.setdefault("LOG_LEVEL", "ERROR")
+    os.environ["METRICS_PORT"] = "0"
+    # Keep analyses in memory so runs do not warm each other's cache.
+    os.environ.setdefault("ANALYSIS_CACHE_PATH", "")
+    if args.redis_url:
+        os.environ["REDIS_URL"] = args.redis_url
+    for override in args.set:
+        key, sep, value = override.partition("=")
+        if not sep:
+            raise ValueError(f"--set expects KEY=VALUE, got: {override}")
+        os.environ[key.upper()] = value
+
+
+def percentiles(samples: list[float]) -> dict[str, float]:
+    """Nearest-rank percentiles of ``samples``, in milliseconds."""
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+
+    def rank(q: float) -> float:
+        return ordered[min(len(ordered) - 1, max(0, int(round(q * len(ordered))) - 1))]
+
+    return {
+        "count": len(ordered),
+        "mean": round(sum(ordered) / len(ordered) * 1000, 2),
+        "p50": round(rank(0.50) * 1000, 2),
+        "p95": round(rank(0.95) * 1000, 2),
+        "p99": round(rank(0.99) * 1000, 2),
+        "max": round(ordered[-1] * 1000, 2),
+    }
+
+
+def build_positions(count: int, rng: random.Random) -> list[str]:
+    """Plays random legal games to get middlegame positions outside the opening book."""
+    import chess
+
+    positions = []
+    while len(positions) < count:
+        board = chess.Board()
+        for _ in range(rng.randint(12, 40)):
+            moves = list(board.legal_moves)
+            if not moves:
+                break
+            board.push(rng.choice(moves))
+        if not board.is_game_over():
+            positions.append(board.fen())
+    return positions
+
+
+def illegal_move(fen: str, rng: random.Random) -> Optional[dict[str, Any]]:
+    """Picks a move of the side to move's piece to a square it cannot reach."""
+    import chess
+
+    board = chess.Board(fen)
+    squares = list(board.pieces(chess.PAWN, board.turn) | board.pieces(chess.KNIGHT, board.turn)
+                   | board.pieces(chess.BISHOP, board.turn) | board.pieces(chess.ROOK, board.turn))
+    rng.shuffle(squares)
+    for square in squares:
+        targets = {move.to_square for move in board.legal_moves if move.from_square == square}
+        candidates = [sq for sq in chess.SQUARES if sq != square and sq not in targets]
+        if candidates:
+            return {
+                "from": chess.square_name(square),
+                "to": chess.square_name(rng.choice(candidates)),
+                "legalMoves": sorted(chess.square_name(sq) for sq in targets),
+            }
+    return None
+
+
+class LoadGenerator:
+    """
+    Enqueues gateway-shaped messages from closed-loop virtual clients and
+    matches the published replies to them by trace ID.
+    """
+
+    def __init__(self, redis_client, codec, transport: str, args: argparse.Namespace):
+        self.redis_client = redis_client
+        self.codec = codec
+        self.transport = transport
+        self.args = args
+        self.mix = parse_mix(args.mix)
+        self.rng = random.Random(args.seed)
+        self.positions = build_positions(args.positions, self.rng)
+        self.pending: dict[str, dict[str, Any]] = {}
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.first_partial: list[float] = []
+        self.timeouts = 0
+        self.errors = 0
+        self.measuring = False
+        self._sent = 0
+
+    async def run(self, total: int, measure: bool) -> float:
+        """Sends ``total`` messages and returns the elapsed wall time."""
+        self._sent = 0
+        self.measuring = measure
+        started = time.perf_counter()
+        clients = min(self.args.concurrency, total) or 1
+        await asyncio.gather(*(self._client(i, total) for i in range(clients)))
+        return time.perf_counter() - started
+
+    async def listen(self) -> None:
+        """Resolves pending messages from the published coaching messages."""
+        pubsub = self.redis_client.pubsub()
+        await pubsub.subscribe("coaching:message_ready", "coaching:message_partial")
+        try:
+            while True:
+                raw = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if raw is None:
+                    continue
+                message = self.codec.decode(raw["data"])
+                pending = self.pending.get(message.get("traceId"))
+                if pending is None:
+                    continue
+                now = time.perf_counter()
+                if message.get("type") == "coaching:message_partial":
+                    pending.setdefault("first_partial", now)
+                elif not pending["done"].done():
+                    pending["done"].set_result((now, message))
+        finally:
+            await pubsub.aclose()
+
+    async def _client(self, index: int, total: int) -> None:
+        ws_client = f"bench-client-{index}"
+        while self._sent < total:
+            self._sent += 1
+            kind = self.rng.choices(list(self.mix), weights=list(self.mix.values()))[0]
+            message = self._message(kind, ws_client)
+            if message is None:
+                continue
+            done = asyncio.get_running_loop().create_future()
+            pending = {"done": done}
+            self.pending[message["traceId"]] = pending
+            sent_at = time.perf_counter()
+            await self._enqueue(MESSAGE_TYPES[kind], message)
+            try:
+                replied_at, reply = await asyncio.wait_for(done, self.args.timeout)
+            except asyncio.TimeoutError:
+                if self.measuring:
+                    self.timeouts += 1
+                continue
+            finally:
+                self.pending.pop(message["traceId"], None)
+            if not self.measuring:
+                continue
+            if "trouble" in reply.get("payload", {}).get("message", ""):
+                self.errors += 1
+            self.latencies[kind].append(replied_at - sent_at)
+            if "first_partial" in pending:
+                self.first_partial.append(pending["first_partial"] - sent_at)
+
+    def _message(self, kind: str, ws_client: str) -> Optional[dict[str, Any]]:
+        fen = self.rng.choice(self.positions)
+        message = {
+            "ws_client": ws_client,
+            "traceId": f"bench-{uuid.uuid4().hex}",
+            "enqueuedAt": int(time.time() * 1000),
+        }
+        if kind == "coaching":
+            message.update(type="move", game={"fen": fen})
+            return message
+        move = illegal_move(fen, self.rng)
+        if move is None:
+            return None
+        message.update(type="illegal_move", fen=fen, **move)
+        return message
+
+    async def _enqueue(self, queue: str, message: dict[str, Any]) -> None:
+        payload = json.dumps(message)
+        if self.transport == "streams":
+            await self.redis_client.xadd(queue, {"payload": payload})
+        else:
+            await self.redis_client.rpush(queue, payload)
+
+
+def memory_usage() -> dict[str, float]:
+    """Peak and current resident set size of this process, in MiB."""
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+    usage = {"max_rss_mb": round(max_rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)}
+    try:
+        with open("/proc/self/statm") as f:
+            usage["rss_mb"] = round(int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20, 1)
+    except OSError:
+        pass
+    if tracemalloc.is_tracing():
+        usage["python_heap_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 2**20, 1)
+    return usage
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def benchmark(args: argparse.Namespace) -> dict[str, Any]:
+    """Runs the service against the stand-ins and returns the report."""
+    from google.adk.runners import InMemoryRunner
+
+    from app.agent_io_service import (
+        REDIS_ENCODING_ERRORS,
+        SESSION_APP_NAME,
+        AgentIOService,
+    )
+    from app.agents.root_agent import create_illegal_move_root_agent, create_root_agent
+    from app.config import settings
+    from app.core.exceptions import EngineUnavailableError
+    from app.logger import setup_logging_from, stop_logging
+    from app.services.analysis_cache import analysis_cache
+    from app.services.engine_pool import engine_pool
+    from app.services.llm_cache import CachedLlm, with_response_cache
+    from app.services.opening_book import opening_book
+    from app.services.redis_cache import rag_cache
+    from app.tools import rag_tool
+    from benchmarks.stubs import (
+        FakeToolboxClient,
+        LatencyDistribution,
+        StubLlm,
+        TokenDistribution,
+    )
+
+    setup_logging_from(settings)
+
+    stub = StubLlm(
+        latency=LatencyDistribution(median=args.llm_latency_ms / 1000, sigma=args.llm_sigma),
+        tokens=TokenDistribution(mean=args.tokens, stddev=args.tokens_stddev),
+        seed=args.seed,
+    )
+    # Wrapped like the service's model, so LLM_CACHE_MODE=replay runs
+    # replay a recording instead of calling the stub.
+    model = with_response_cache(stub, settings)
+    toolbox = FakeToolboxClient(LatencyDistribution(median=args.toolbox_latency_ms / 1000), seed=args.seed)
+    rag_tool.toolbox_client = toolbox
+
+    if args.redis_url:
+        import redis.asyncio as aioredis
+
+        def redis_client(**kwargs):
+            return aioredis.from_url(args.redis_url, **kwargs)
+    else:
+        import fakeredis
+
+        server = fakeredis.FakeServer()
+
+        def redis_client(**kwargs):
+            return fakeredis.FakeAsyncRedis(server=server, **kwargs)
+
+    service_redis = redis_client(decode_responses=True, encoding_errors=REDIS_ENCODING_ERRORS)
+    await service_redis.delete(*MESSAGE_TYPES.values())
+    if rag_cache.shared:
+        rag_cache.shared.redis_client = redis_client()
+
+    try:
+        await engine_pool.start()
+    except EngineUnavailableError:
+        pass
+    opening_book.load()
+
+    service = AgentIOService(
+        settings,
+        legal_move_runner=InMemoryRunner(app_name=SESSION_APP_NAME, agent=create_root_agent(model=model)),
+        illegal_move_runner=InMemoryRunner(app_name=SESSION_APP_NAME, agent=create_illegal_move_root_agent(model=model)),
+        opening_book=opening_book,
+    )
+    service.redis_client = service_redis
+
+    generator = LoadGenerator(redis_client(decode_responses=True), service.codec, settings.work_queue_transport, args)
+    listener = asyncio.create_task(service._listen_for_work_queue_messages())
+    replies = asyncio.create_task(generator.listen())
+    try:
+        await asyncio.sleep(0.1)
+        if args.warmup:
+            await generator.run(args.warmup, measure=False)
+        if args.tracemalloc:
+            tracemalloc.start()
+        elapsed = await generator.run(args.messages, measure=True)
+        memory = memory_usage()
+    finally:
+        service.accepting_work = False
+        for task in (listener, replies):
+            task.cancel()
+        await asyncio.gather(listener, replies, return_exceptions=True)
+        await service.shutdown()
+        await engine_pool.close()
+        analysis_cache.close()
+        if isinstance(model, CachedLlm):
+            model.close()
+        opening_book.close()
+        await rag_cache.close()
+        stop_logging()
+
+    completed = sum(len(samples) for samples in generator.latencies.values())
+    return {
+        "version": REPORT_VERSION,
+        "git_commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "config": {
+            **{key: value for key, value in vars(args).items() if key not in ("output", "baseline")},
+            "mix": parse_mix(args.mix),
+            "redis": "redis" if args.redis_url else "fakeredis",
+            "work_queue_transport": settings.work_queue_transport,
+            "coaching_queue_concurrency": settings.coaching_queue_concurrency,
+            "illegal_move_queue_concurrency": settings.illegal_move_queue_concurrency,
+            "message_codec": service.codec.name,
+            "llm_cache_mode": settings.llm_cache_mode,
+        },
+        "results": {
+            "duration_s": round(elapsed, 3),
+            "completed": completed,
+            "timeouts": generator.timeouts,
+            "errors": generator.errors,
+            "throughput_per_sec": round(completed / elapsed, 2) if elapsed else 0.0,
+            "latency_ms": percentiles([s for samples in generator.latencies.values() for s in samples]),
+            "latency_ms_by_type": {kind: percentiles(samples) for kind, samples in generator.latencies.items()},
+            "first_partial_ms": percentiles(generator.first_partial),
+            "memory": memory,
+            "llm_calls": stub.calls,
+            "toolbox_calls": toolbox.calls,
+        },
+    }
+
+
+def lookup(report: dict[str, Any], path: str) -> Optional[float]:
+    value: Any = report.get("results", {})
+    for key in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value if isinstance(value, (int, float)) else None
+
+
+def compare(report: dict[str, Any], baseline: dict[str, Any]) -> list[str]:
+    """Describes the change in the key metrics against ``baseline``."""
+    lines = [f"Compared with {baseline.get('git_commit') or 'baseline'}:"]
+    for path, higher_is_better in COMPARED_METRICS.items():
+        new, old = lookup(report, path), lookup(baseline, path)
+        if new is None or not old:
+            continue
+        change = (new - old) / old * 100
+        better = change > 0 if higher_is_better else change < 0
+        lines.append(f"  {path:<22} {old:>10} -> {new:<10} {change:+.1f}% {'better' if better else 'worse'}")
+    return lines
+
+
+def summary(report: dict[str, Any]) -> list[str]:
+    results = report["results"]
+    latency = results["latency_ms"]
+    lines = [
+        f"{results['completed']} messages in {results['duration_s']}s: "
+        f"{results['throughput_per_sec']} msg/s, {results['timeouts']} timeouts, {results['errors']} errors",
+    ]
+    if latency:
+        lines.append(f"latency ms: p50 {latency['p50']}  p95 {latency['p95']}  p99 {latency['p99']}  max {latency['max']}")
+    for kind, stats in results["latency_ms_by_type"].items():
+        lines.append(f"  {kind:<9} p50 {stats['p50']}  p95 {stats['p95']}  p99 {stats['p99']}")
+    if results["first_partial_ms"]:
+        lines.append(f"first partial ms: p50 {results['first_partial_ms']['p50']}  p95 {results['first_partial_ms']['p95']}")
+    lines.append("memory: " + ", ".join(f"{key} {value}" for key, value in results["memory"].items()))
+    return lines
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    args = parse_args(argv)
+    configure_environment(args)
+    report = asyncio.run(benchmark(args))
+
+    lines = summary(report)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            lines += compare(report, json.load(f))
+    print("\n".join(lines))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+    return 1 if report["results"]["timeouts"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+"""ChessMate Cognitive Service - Benchmark Stand-ins
+
+This module defines local stand-ins for the external services the agent
+graph depends on, so the real listener and agents can be load tested
+without Gemini, genai-toolbox or Postgres:
+
+- StubLlm, a BaseLlm whose latency and output length are drawn from
+  configurable distributions. It calls the first tool offered to it once
+  per turn, the way the knowledge agent's model does, and answers with
+  the coaching JSON the pipeline expects.
+- FakeToolboxClient, which answers RAG queries after a configurable
+  latency.
+
+Author: Vyaakar Labs <r.raajey@gmail.com>
+Location: India
+License: MIT
+"""
+import asyncio
+import json
+import random
+import re
+from dataclasses import dataclass
+from typing import Any, AsyncGenerator
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+from pydantic import PrivateAttr
+
+WORDS = (
+    "control the centre develop your knights before bishops castle early and "
+    "connect your rooks look for forks pins and skewers before every move"
+).split()
+FEN_LINE = re.compile(r"^FEN: (.+)$", re.MULTILINE)
+
+
+@dataclass
+class LatencyDistribution:
+    """A log-normal latency in seconds with the given median, capped at ``max``."""
+    median: float = 0.2
+    sigma: float = 0.5
+    max: float = 10.0
+
+    def sample(self, rng: random.Random) -> float:
+        if self.median <= 0:
+            return 0.0
+        return min(self.max, rng.lognormvariate(0, self.sigma) * self.median)
+
+
+@dataclass
+class TokenDistribution:
+    """A normally distributed output length in tokens, at least ``min``."""
+    mean: int = 80
+    stddev: int = 30
+    min: int = 5
+
+    def sample(self, rng: random.Random) -> int:
+        return max(self.min, int(rng.gauss(self.mean, self.stddev)))
+
+
+class StubLlm(BaseLlm):
+    """
+    A model that answers after a sampled delay. Streaming requests are
+    answered token by token, spreading the delay over the chunks.
+    """
+
+    model: str = "stub-llm"
+    latency: LatencyDistribution = LatencyDistribution()
+    tokens: TokenDistribution = TokenDistribution()
+    tool_latency: LatencyDistribution = LatencyDistribution(median=0.02)
+    seed: int = 0
+    calls: int = 0
+    _rng: random.Random = PrivateAttr()
+
+    def model_post_init(self, __context: Any) -> None:
+        self._rng = random.Random(self.seed)
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        self.calls += 1
+        delay = self.latency.sample(self._rng)
+        tool_call = self._tool_call(llm_request)
+        if tool_call:
+            await asyncio.sleep(self.tool_latency.sample(self._rng))
+            yield LlmResponse(
+                content=types.Content(role="model", parts=[types.Part(function_call=tool_call)]),
+                usage_metadata=types.GenerateContentResponseUsageMetadata(candidates_token_count=10),
+            )
+            return
+
+        tokens = self.tokens.sample(self._rng)
+        text = self._coaching_text(tokens)
+        usage = types.GenerateContentResponseUsageMetadata(
+            prompt_token_count=len(str(llm_request.contents)) // 4,
+            candidates_token_count=tokens,
+        )
+        if not stream:
+            await asyncio.sleep(delay)
+            yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text=text)]), usage_metadata=usage)
+            return
+
+        chunks = [text[i:i + 16] for i in range(0, len(text), 16)]
+        for chunk in chunks:
+            await asyncio.sleep(delay / len(chunks))
+            yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text=chunk)]), partial=True)
+        yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text=text)]), usage_metadata=usage)
+
+    @staticmethod
+    def _tool_call(llm_request: LlmRequest):
+        """Calls the first offered tool, unless this turn already has its response."""
+        if not llm_request.tools_dict:
+            return None
+        last = llm_request.contents[-1] if llm_request.contents else None
+        if last and any(part.function_response for part in last.parts or []):
+            return None
+        name = next(iter(llm_request.tools_dict))
+        texts = (part.text or "" for content in llm_request.contents for part in content.parts or [])
+        match = next(filter(None, (FEN_LINE.search(text) for text in texts)), None)
+        return types.FunctionCall(
+            name=name, args={"fen": match.group(1) if match else "", "cognitive_stage": "novice"}
+        )
+
+    def _coaching_text(self, tokens: int) -> str:
+        message = " ".join(self._rng.choice(WORDS) for _ in range(tokens)).capitalize() + "."
+        return json.dumps({"message": message, "cognitiveStage": "Developing"})
+
+
+class FakeToolboxClient:
+    """Stands in for the genai-toolbox client used by the RAG tool."""
+
+    def __init__(self, latency: LatencyDistribution = LatencyDistribution(median=0.03), seed: int = 0):
+        self.latency = latency
+        self.calls = 0
+        self._rng = random.Random(seed)
+
+    async def invoke(self, **params: Any) -> list[dict[str, Any]]:
+        self.calls += 1
+        await asyncio.sleep(self.latency.sample(self._rng))
+        return [
+            {
+                "content": f"Knowledge for: {params.get('query_terms', '')[:80]}",
+                "context_type": "middlegame",
+                "fen": None,
+                "distance": 0.2,
+            }
+        ]
+
+    async def close(self) -> None:
+        pass
+
+    def stats(self) -> dict[str, int]:
+        return {"calls": self.calls}
@@ -0,0 +1,31 @@
+"""
+ChessMate Cognitive Service - Bump RAG Cache Version
+
+This script invalidates the shared Redis RAG cache after a knowledge-base
+rebuild. It increments the namespace version so every replica starts using
+fresh keys; stale entries are left to expire through their TTL. Run it
+from the service root:
+
+    python -m scripts.bump_rag_cache_version
+"""
+import asyncio
+
+import structlog
+
+from app.config import settings
+from app.services.redis_cache import RedisCache
+
+log = structlog.get_logger("bump_rag_cache_version")
+
+
+async def main():
+    cache = RedisCache(redis_url=settings.redis_url, namespace=settings.rag_cache_namespace)
+    try:
+        version = await cache.bump_version()
+        log.info("RAG cache invalidated.", namespace=settings.rag_cache_namespace, version=version)
+    finally:
+        await cache.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,520 @@
+"""Unit tests for the AgentIOService work queue listener."""
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import fakeredis.aioredis
+import pytest
+from google.adk.errors.session_not_found_error import SessionNotFoundError
+from google.adk.events import Event
+from google.adk.sessions import InMemorySessionService
+from google.genai.types import Content, Part
+
+from app.agent_io_service import SESSION_APP_NAME, AgentIOService
+from app.config import settings
+from app.core.tracing import work_span
+from app.services.work_queue import WorkItem
+
+
+def make_service(**overrides) -> AgentIOService:
+    """Creates a service backed by fakeredis with the given settings overrides."""
+    config = settings.model_copy(update={"work_queue_block_timeout": 0.05, **overrides})
+    service = AgentIOService(config, legal_move_runner=MagicMock(), illegal_move_runner=MagicMock())
+    service.redis_client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    return service
+
+
+async def stop_listener(service: AgentIOService, listener: asyncio.Task):
+    """
+    Stops the listener. A cancellation landing in a blocking fakeredis read
+    can be swallowed, so the listener is also told to stop accepting work.
+    """
+    service.accepting_work = False
+    listener.cancel()
+    await asyncio.wait([listener], timeout=2)
+    assert listener.done()
+
+
+async def wait_until(predicate, timeout: float = 2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        if asyncio.get_running_loop().time() > deadline:
+            raise AssertionError("condition not met in time")
+        await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_listener_leaves_backlog_in_redis_when_workers_are_busy():
+    """
+    Tests that the listener stops popping once every worker for a queue is
+    busy, and resumes as workers finish.
+    """
+    service = make_service(coaching_queue_concurrency=2)
+    release = asyncio.Event()
+    started = []
+
+    async def slow_handler(message):
+        started.append(message["id"])
+        await release.wait()
+
+    service.queue_handlers["coaching_work_queue"] = slow_handler
+    for i in range(5):
+        await service.redis_client.rpush("coaching_work_queue", json.dumps({"id": i}))
+
+    listener = asyncio.create_task(service._listen_for_work_queue_messages())
+    try:
+        await wait_until(lambda: len(started) == 2)
+        await asyncio.sleep(0.1)
+        assert len(started) == 2
+        assert await service.redis_client.llen("coaching_work_queue") == 3
+
+        release.set()
+        await wait_until(lambda: len(started) == 5)
+        assert await service.redis_client.llen("coaching_work_queue") == 0
+    finally:
+        await stop_listener(service, listener)
+
+
+@pytest.mark.asyncio
+async def test_busy_queue_does_not_block_other_queue():
+    """
+    Tests that a saturated coaching queue does not stop illegal-move work.
+    """
+    service = make_service(coaching_queue_concurrency=1)
+    release = asyncio.Event()
+    handled = []
+
+    async def slow_handler(message):
+        await release.wait()
+
+    async def fast_handler(message):
+        handled.append(message["id"])
+
+    service.queue_handlers["coaching_work_queue"] = slow_handler
+    service.queue_handlers["illegal_move_work_queue"] = fast_handler
+    await service.redis_client.rpush("coaching_work_queue", json.dumps({"id": "a"}), json.dumps({"id": "b"}))
+    await service.redis_client.rpush("illegal_move_work_queue", json.dumps({"id": "c"}))
+
+    listener = asyncio.create_task(service._listen_for_work_queue_messages())
+    try:
+        await wait_until(lambda: handled == ["c"])
+        assert await service.redis_client.llen("coaching_work_queue") == 1
+    finally:
+        release.set()
+        await stop_listener(service, listener)
+
+
+@pytest.mark.asyncio
+async def test_streams_transport_acknowledges_after_handling():
+    """
+    Tests that in streams mode a message is acknowledged once handled.
+    """
+    service = make_service(work_queue_transport="streams")
+    handled = []
+
+    async def handler(message):
+        handled.append(message["id"])
+
+    service.queue_handlers["coaching_work_queue"] = handler
+    await service.redis_client.xadd("coaching_work_queue", {"payload": json.dumps({"id": 1})})
+
+    listener = asyncio.create_task(service._listen_for_work_queue_messages())
+    try:
+        await wait_until(lambda: handled == [1])
+        await wait_until(lambda: not service.in_flight_tasks)
+        pending = await service.redis_client.xpending("coaching_work_queue", "cognitive-service")
+        assert pending["pending"] == 0
+    finally:
+        await stop_listener(service, listener)
+
+
+@pytest.mark.asyncio
+async def test_newer_game_state_cancels_in_flight_one_for_same_client():
+    """
+    Tests that a newer position for a client cancels the older one still
+    being coached, while other clients are left alone.
+    """
+    service = make_service()
+    release = asyncio.Event()
+    started, finished = [], []
+
+    async def slow_handler(message):
+        started.append(message["id"])
+        await release.wait()
+        finished.append(message["id"])
+
+    service.queue_handlers["coaching_work_queue"] = slow_handler
+    listener = asyncio.create_task(service._listen_for_work_queue_messages())
+    try:
+        for message_id, client in [(1, "a"), (2, "b")]:
+            await service.redis_client.rpush(
+                "coaching_work_queue", json.dumps({"id": message_id, "ws_client": client})
+            )
+        await wait_until(lambda: len(started) == 2)
+        await service.redis_client.rpush(
+            "coaching_work_queue", json.dumps({"id": 3, "ws_client": "a"})
+        )
+        await wait_until(lambda: len(started) == 3)
+
+        release.set()
+        await wait_until(lambda: not service.in_flight_tasks)
+        assert sorted(finished) == [2, 3]
+        assert service.coaching_tasks == {}
+    finally:
+        await stop_listener(service, listener)
+
+
+@pytest.mark.asyncio
+async def test_queued_game_state_with_stale_sequence_is_skipped():
+    """
+    Tests that a message whose sequence number is behind the gateway's
+    latest for that client never reaches the pipeline.
+    """
+    service = make_service()
+    handled = []
+
+    async def handler(message):
+        handled.append(message["clientSeq"])
+
+    service.queue_handlers["coaching_work_queue"] = handler
+    await service.redis_client.set("coaching:seq:a", 2)
+    for seq in (1, 2):
+        await service.redis_client.rpush(
+            "coaching_work_queue", json.dumps({"ws_client": "a", "clientSeq": seq})
+        )
+
+    listener = asyncio.create_task(service._listen_for_work_queue_messages())
+    try:
+        await wait_until(lambda: handled == [2])
+        await wait_until(lambda: not service.in_flight_tasks)
+        assert handled == [2]
+    finally:
+        await stop_listener(service, listener)
+
+
+@pytest.mark.asyncio
+async def test_game_state_is_handled_when_the_sequence_check_fails():
+    """
+    Tests that a Redis failure while reading the client's sequence number
+    lets the message through instead of acknowledging it unhandled.
+    """
+    service = make_service()
+    service.work_queue = AsyncMock()
+    service.redis_client.get = AsyncMock(side_effect=ConnectionError("redis down"))
+    handled = []
+
+    async def handler(message):
+        handled.append(message["clientSeq"])
+
+    item = WorkItem(queue="coaching_work_queue", payload="")
+    service.queue_in_flight[item.queue] += 1
+    await service._run_worker(item, handler, {"ws_client": "a", "clientSeq": 1})
+
+    assert handled == [1]
+    service.work_queue.ack.assert_awaited_once_with(item)
+
+
+@pytest.mark.asyncio
+async def test_message_from_unknown_queue_is_acknowledged():
+    """
+    Tests that a message with no handler for its queue is acknowledged
+    rather than left pending to be reclaimed forever.
+    """
+    service = make_service()
+    service.work_queue = AsyncMock()
+    item = WorkItem(queue="retired_work_queue", payload=json.dumps({"ws_client": "a"}), message_id="1-0")
+
+    await service._handle_work_item(item)
+
+    service.work_queue.ack.assert_awaited_once_with(item)
+    assert not service.in_flight_tasks
+
+
+@pytest.mark.asyncio
+async def test_session_id_is_cached_and_created_once_per_client():
+    """
+    Tests that concurrent messages from a new client create a single
+    session, later lookups are served from the cache, and invalidation
+    forces a fresh lookup.
+    """
+    service = make_service()
+    session_service = service.legal_move_runner.session_service
+    session_service.list_sessions = AsyncMock(return_value=SimpleNamespace(sessions=[]))
+
+    async def create_session(**kwargs):
+        await asyncio.sleep(0.01)
+        return SimpleNamespace(id="session-1")
+
+    session_service.create_session = AsyncMock(side_effect=create_session)
+
+    runner = service.legal_move_runner
+    ids = await asyncio.gather(*(service._get_session_id("a", runner) for _ in range(3)))
+    assert ids == ["session-1"] * 3
+    assert await service._get_session_id("a", runner) == "session-1"
+    assert session_service.create_session.await_count == 1
+    assert session_service.list_sessions.await_count == 1
+
+    service._invalidate_session("a", runner)
+    await service._get_session_id("a", runner)
+    assert session_service.list_sessions.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_deleted_cached_session_is_replaced_and_the_run_retried():
+    """
+    Tests that a cached session ID whose session was deleted elsewhere, for
+    example by compaction in another worker, is looked up again and the
+    message is answered instead of failing.
+    """
+    service = make_service(enable_session_compaction=False)
+    session_service = InMemorySessionService()
+    runner = service.legal_move_runner
+    runner.session_service = session_service
+
+    async def run_async(user_id, session_id, **kwargs):
+        if await session_service.get_session(app_name=SESSION_APP_NAME, user_id=user_id, session_id=session_id) is None:
+            raise SessionNotFoundError(f"Session not found: {session_id}")
+        yield Event(author="coach", content=Content(parts=[Part(text='{"message": "Nice."}')]))
+
+    runner.run_async = run_async
+    stale_id = await service._get_session_id("a", runner)
+    await session_service.delete_session(app_name=SESSION_APP_NAME, user_id="a", session_id=stale_id)
+    service.publish_coaching_message = AsyncMock()
+
+    await service.process_game_state_change(
+        {"ws_client": "a", "game": {"fen": "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"}}
+    )
+
+    service.publish_coaching_message.assert_awaited_once_with({"coaching_message": '{"message": "Nice."}'}, "a")
+    assert await service._get_session_id("a", runner) != stale_id
+
+
+@pytest.mark.asyncio
+async def test_compaction_runs_once_and_keeps_the_old_session_while_in_use():
+    """
+    Tests that turns finishing together compact a session once, and that
+    the old session is only deleted after the run still using it is done.
+    """
+    service = make_service(session_max_turns=1, session_keep_turns=1)
+    session_service = InMemorySessionService()
+    runner = service.legal_move_runner
+    runner.session_service = session_service
+    old_id = await service._get_session_id("a", runner)
+
+    release = asyncio.Event()
+    in_flight = asyncio.create_task(service._run_in_session(old_id, release.wait()))
+    await asyncio.sleep(0)
+    await asyncio.gather(*(service._record_session_turn("a", runner, old_id, 10, []) for _ in range(3)))
+
+    new_id = await service._get_session_id("a", runner)
+    assert new_id != old_id
+    assert service.session_compactor.compactions == 1
+    assert await session_service.get_session(app_name=SESSION_APP_NAME, user_id="a", session_id=old_id)
+
+    release.set()
+    await in_flight
+    assert await session_service.get_session(app_name=SESSION_APP_NAME, user_id="a", session_id=old_id) is None
+
+
+def test_cache_sampler_sweeps_expired_entries_while_idle():
+    """
+    Tests that the periodic cache sampler sweeps expired entries, so they
+    do not stay in memory when no message reads the cache.
+    """
+    service = make_service(session_cache_ttl=0)
+    service.session_ids.sweep_interval = 0
+    service.session_ids.set("a", "session-1")
+
+    service._sample_cache_sizes()
+
+    assert service.session_ids.stats()["entries"] == 0
+    assert service.session_ids.stats()["expirations"] == 1
+
+
+@pytest.mark.asyncio
+async def test_opening_book_position_skips_the_agent_pipeline():
+    """
+    Tests that a position the opening book knows is published directly,
+    without creating a session or running the agents.
+    """
+    book = MagicMock()
+    book.coaching_payload.return_value = {"message": "Book move."}
+    service = make_service()
+    service.opening_book = book
+    service.publish_coaching_message = AsyncMock()
+    service._get_session_id = AsyncMock()
+
+    message = {"ws_client": "client-1", "game": {"fen": "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1"}}
+    await service.process_game_state_change(message)
+
+    book.coaching_payload.assert_called_once_with(message["game"]["fen"], message)
+    service.publish_coaching_message.assert_awaited_once_with(
+        {"coaching_message": json.dumps({"message": "Book move."})}, "client-1"
+    )
+    service._get_session_id.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_cacheable_game_states_share_a_run_and_personalized_ones_do_not():
+    """
+    Tests that identical positions from different clients share one
+    pipeline run in a throwaway session, while a personalized request runs
+    in the client's own session.
+    """
+    service = make_service(enable_coaching_cache=True)
+    service.publish_coaching_message = AsyncMock()
+    service._get_session_id = AsyncMock(return_value="own-session")
+    session_service = service.legal_move_runner.session_service
+    session_service.create_session = AsyncMock(return_value=SimpleNamespace(id="shared-session"))
+    session_service.delete_session = AsyncMock()
+    runs = []
+
+    async def run_async(user_id, session_id, new_message, state_delta, run_config):
+        runs.append(session_id)
+        await asyncio.sleep(0.01)
+        yield Event(author="CoachingAgent", content=Content(parts=[Part(text='{"message": "ok"}')]))
+
+    service.legal_move_runner.run_async = run_async
+    fen = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+    await asyncio.gather(*(
+        service.process_game_state_change({"ws_client": client, "game": {"fen": fen}})
+        for client in ("a", "b", "c")
+    ))
+    await service.process_game_state_change(
+        {"ws_client": "d", "game": {"fen": fen}, "personalizedCoaching": True}
+    )
+
+    assert runs == ["shared-session", "own-session"]
+    session_service.delete_session.assert_awaited_once()
+    assert service.publish_coaching_message.await_count == 4
+
+
+@pytest.mark.asyncio
+async def test_coaching_message_is_streamed_before_the_final_response():
+    """
+    Tests that in streaming mode the coaching agent's partial output is
+    published as it grows, and the final message is published from the
+    complete event.
+    """
+    service = make_service(enable_coaching_cache=False, coaching_partial_min_chars=10)
+    service.redis_client.publish = AsyncMock()
+    service._get_session_id = AsyncMock(return_value="own-session")
+    final_text = '{"message": "Castle early to keep your king safe.", "cognitiveStage": "Novice"}'
+
+    def chunk_event(author, text):
+        return Event(author=author, partial=True, content=Content(parts=[Part(text=text)]))
+
+    async def run_async(user_id, session_id, new_message, state_delta, run_config):
+        assert run_config.streaming_mode.value == "sse"
+        yield chunk_event("knowledge_agent", '{"message": "not this one"}')
+        for chunk in ('{"message": "Cas', "tle early", " to keep your king safe.", '", "cognitiveStage": "Novice"}'):
+            yield chunk_event("coaching_agent", chunk)
+        yield Event(author="coaching_agent", content=Content(parts=[Part(text=final_text)]))
+
+    service.legal_move_runner.run_async = run_async
+
+    fen = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+    await service.process_game_state_change({"ws_client": "a", "game": {"fen": fen}})
+
+    published = [json.loads(call.args[1]) for call in service.redis_client.publish.await_args_list]
+    assert [p["type"] for p in published] == [
+        "coaching:message_partial",
+        "coaching:message_partial",
+        "coaching:message_ready",
+    ]
+    assert published[0]["payload"]["message"] == "Cas"
+    assert published[1]["payload"]["message"] == "Castle early to keep your king safe."
+    assert published[2]["payload"]["cognitiveStage"] == "Novice"
+
+
+@pytest.mark.asyncio
+async def test_illegal_move_is_answered_from_templates_without_the_runner():
+    """
+    Tests that an illegal move is explained from templates, without a
+    session lookup or an illegal move agent run.
+    """
+    service = make_service(illegal_move_responder="template")
+    service.publish_coaching_message = AsyncMock()
+    service._get_session_id = AsyncMock()
+
+    await service.process_illegal_move({
+        "ws_client": "a",
+        "fen": "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+        "from": "g1",
+        "to": "g3",
+    })
+
+    payload = json.loads(service.publish_coaching_message.await_args.args[0]["coaching_message"])
+    assert payload["illegalMoveReason"] == "wrong_movement"
+    service._get_session_id.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_expired_messages_are_dropped_and_stale_ones_degraded():
+    """
+    Tests that a message past its ttlMs is acknowledged without being
+    handled, and that a stale game state is answered without the agents.
+    """
+    service = make_service(degrade_after_queue_age=5, coaching_work_max_age=120)
+    service.work_queue = AsyncMock()
+    service._dispatch = AsyncMock()
+    now_ms = time.time() * 1000
+
+    expired = {"ws_client": "a", "enqueuedAt": now_ms - 3000, "ttlMs": 2000}
+    await service._handle_work_item(WorkItem("coaching_work_queue", json.dumps(expired)))
+    service.work_queue.ack.assert_awaited_once()
+    service._dispatch.assert_not_called()
+
+    fresh = {"ws_client": "a", "enqueuedAt": now_ms - 1000}
+    await service._handle_work_item(WorkItem("coaching_work_queue", json.dumps(fresh)))
+    service._dispatch.assert_called_once()
+
+    service.publish_coaching_message = AsyncMock()
+    service._get_session_id = AsyncMock()
+    service.position_analyzer.summarize = AsyncMock(return_value="White to move, and material is level.")
+    await service.process_game_state_change({
+        "ws_client": "a",
+        "enqueuedAt": now_ms - 10000,
+        "cognitiveStage": "expert",
+        "language": "hi",
+        "game": {"fen": "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"},
+    })
+    payload = json.loads(service.publish_coaching_message.await_args.args[0]["coaching_message"])
+    assert payload == {
+        "message": "White to move, and material is level.",
+        "cognitiveStage": "Expert",
+        "language": "en",
+    }
+    service._get_session_id.assert_not_awaited()
+
+
+def test_coaching_prompt_leaves_out_transport_metadata():
+    """Tests that the agent input carries the position and coaching fields, not the raw message."""
+    prompt = AgentIOService.coaching_prompt({
+        "type": "move",
+        "move": "e4",
+        "ws_client": "a",
+        "traceId": "enqueue-1",
+        "clientSeq": 7,
+        "enqueuedAt": 1700000000000,
+        "game": {"fen": "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1"},
+    })
+    assert prompt == "FEN: rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1\nLast move: e4"
+
+
+@pytest.mark.asyncio
+async def test_published_coaching_message_carries_the_trace_id():
+    """Tests that the response to a traced message carries the gateway traceId."""
+    service = make_service()
+    service.redis_client = AsyncMock()
+    with work_span("coaching_work_queue", {"ws_client": "a", "traceId": "enqueue-1-abcde"}):
+        await service.publish_coaching_message({"coaching_message": '{"message": "Nice move."}'}, "a")
+    await service.publish_coaching_message({"coaching_message": '{"message": "Untraced."}'}, "a")
+
+    traced, untraced = [json.loads(call.args[1]) for call in service.redis_client.publish.await_args_list]
+    assert traced["traceId"] == "enqueue-1-abcde"
+    assert "traceId" not in untraced
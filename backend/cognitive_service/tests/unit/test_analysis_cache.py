@@ -0,0 +1,82 @@
+"""Unit tests for the Stockfish analysis cache."""
+import chess
+import chess.engine
+import pytest
+
+from app.services.analysis_cache import AnalysisCache, PositionAnalysis, position_key
+
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+
+def make_analysis(depth: int, time: float = 0.1, multipv: int = 3) -> PositionAnalysis:
+    lines = [{"pv": ["e2e4"], "score_cp": 30, "mate": None}] * multipv
+    return PositionAnalysis(lines=lines, depth=depth, time=time, multipv=multipv)
+
+
+def test_position_key_ignores_move_clocks():
+    """
+    Tests that the halfmove and fullmove clocks do not affect the key.
+    """
+    board = chess.Board(START_FEN)
+    later = chess.Board("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 12 40")
+    assert position_key(board) == position_key(later)
+
+
+@pytest.mark.asyncio
+async def test_deeper_result_answers_shallower_request():
+    """
+    Tests that a cached deep analysis satisfies a shallower request but
+    not a deeper one.
+    """
+    cache = AnalysisCache()
+    board = chess.Board(START_FEN)
+    await cache.put(board, make_analysis(depth=20, time=1.0))
+
+    assert await cache.get(board, chess.engine.Limit(time=0.1), multipv=3)
+    assert await cache.get(board, chess.engine.Limit(depth=18), multipv=3)
+    assert await cache.get(board, chess.engine.Limit(depth=25), multipv=3) is None
+    assert await cache.get(board, chess.engine.Limit(time=0.1), multipv=5) is None
+
+
+@pytest.mark.asyncio
+async def test_shallower_result_does_not_replace_deeper_one():
+    """
+    Tests that storing a shallower analysis keeps the deeper cached entry.
+    """
+    cache = AnalysisCache()
+    board = chess.Board(START_FEN)
+    await cache.put(board, make_analysis(depth=20))
+    await cache.put(board, make_analysis(depth=8))
+
+    cached = await cache.get(board, chess.engine.Limit(time=0.1), multipv=3)
+    assert cached.depth == 20
+
+
+@pytest.mark.asyncio
+async def test_disk_tier_survives_restart(tmp_path):
+    """
+    Tests that analyses written to SQLite are found by a new cache instance.
+    """
+    path = str(tmp_path / "analysis.sqlite3")
+    board = chess.Board(START_FEN)
+
+    first = AnalysisCache(path=path)
+    await first.put(board, make_analysis(depth=14))
+    first.close()
+
+    second = AnalysisCache(path=path)
+    cached = await second.get(board, chess.engine.Limit(time=0.1), multipv=3)
+    second.close()
+
+    assert cached == make_analysis(depth=14)
+    assert second.stats()["disk_hits"] == 1
+
+
+def test_memory_tier_is_bounded():
+    """
+    Tests that the in-memory tier evicts the least recently used position.
+    """
+    cache = AnalysisCache(max_entries=1)
+    cache._remember("a", make_analysis(depth=1))
+    cache._remember("b", make_analysis(depth=1))
+    assert list(cache._memory) == ["b"]
@@ -0,0 +1,67 @@
+"""Unit tests for the load benchmark's stand-ins and report helpers."""
+import json
+
+import pytest
+from google.adk.models.llm_request import LlmRequest
+from google.genai import types
+
+from benchmarks.run import compare, parse_mix, percentiles
+from benchmarks.stubs import LatencyDistribution, StubLlm, TokenDistribution
+
+
+def _request(*parts: types.Part, tools: bool = True) -> LlmRequest:
+    request = LlmRequest(contents=[types.Content(role="user", parts=[parts[0]])])
+    request.contents.extend(types.Content(role="user", parts=[part]) for part in parts[1:])
+    if tools:
+        request.tools_dict["rag_tool"] = object()
+    return request
+
+
+async def _responses(llm: StubLlm, request: LlmRequest, stream: bool = False):
+    return [response async for response in llm.generate_content_async(request, stream=stream)]
+
+
+@pytest.mark.asyncio
+async def test_stub_llm_calls_the_offered_tool_once_then_answers():
+    """Tests that the tool is called with the prompt's FEN, then coaching JSON follows its response."""
+    llm = StubLlm(latency=LatencyDistribution(median=0), tool_latency=LatencyDistribution(median=0))
+    prompt = types.Part(text="FEN: 8/8/8/8/8/8/8/K6k w - - 0 1\nLast move: e4")
+
+    [call] = await _responses(llm, _request(prompt))
+    function_call = call.content.parts[0].function_call
+    assert function_call.name == "rag_tool"
+    assert function_call.args == {"fen": "8/8/8/8/8/8/8/K6k w - - 0 1", "cognitive_stage": "novice"}
+
+    tool_response = types.Part(function_response=types.FunctionResponse(name="rag_tool", response={"result": []}))
+    [answer] = await _responses(llm, _request(prompt, tool_response))
+    assert "message" in json.loads(answer.content.parts[0].text)
+    assert llm.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_stub_llm_streams_partials_before_the_full_text():
+    llm = StubLlm(latency=LatencyDistribution(median=0), tokens=TokenDistribution(mean=20, stddev=0))
+
+    responses = await _responses(llm, _request(types.Part(text="FEN: x"), tools=False), stream=True)
+
+    assert all(response.partial for response in responses[:-1])
+    assert "".join(r.content.parts[0].text for r in responses[:-1]) == responses[-1].content.parts[0].text
+    assert responses[-1].usage_metadata.candidates_token_count == 20
+
+
+def test_report_helpers():
+    """Tests mix parsing, nearest-rank percentiles and baseline comparison."""
+    assert parse_mix("coaching=3,illegal=1") == {"coaching": 0.75, "illegal": 0.25}
+    with pytest.raises(ValueError):
+        parse_mix("castling=1")
+
+    stats = percentiles([i / 1000 for i in range(1, 101)])
+    assert (stats["p50"], stats["p95"], stats["p99"], stats["max"]) == (50, 95, 99, 100)
+    assert percentiles([]) == {}
+
+    baseline = {"git_commit": "abc123", "results": {"throughput_per_sec": 10.0, "latency_ms": {"p50": 100.0}}}
+    report = {"results": {"throughput_per_sec": 12.0, "latency_ms": {"p50": 120.0}}}
+    lines = compare(report, baseline)
+    assert "abc123" in lines[0]
+    assert any("throughput_per_sec" in line and "+20.0% better" in line for line in lines)
+    assert any("latency_ms.p50" in line and "+20.0% worse" in line for line in lines)
@@ -0,0 +1,116 @@
+"""Unit tests for the bounded RAG cache."""
+import asyncio
+
+import pytest
+
+from app.services.cache_service import BoundedTTLCache
+
+
+def test_lru_eviction_by_entry_count():
+    """
+    Tests that the least recently used entry is evicted first.
+    """
+    cache = BoundedTTLCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_eviction_by_byte_budget():
+    """
+    Tests that entries are evicted once the byte budget is exceeded and
+    that oversized values are never cached.
+    """
+    cache = BoundedTTLCache(max_bytes=20)
+    cache.set("a", "x" * 10)
+    cache.set("b", "y" * 10)
+    assert cache.get("a") is None
+    assert cache.stats()["bytes"] == 12
+
+    cache.set("huge", "z" * 100)
+    assert cache.get("huge") is None
+
+
+def test_sweep_removes_expired_entries_without_reads():
+    """
+    Tests that expired entries are removed by a sweep even if never read.
+    """
+    cache = BoundedTTLCache(ttl=0, sweep_interval=3600)
+    cache.set("a", [1, 2, 3])
+    assert cache.sweep() == 1
+    assert cache.stats()["entries"] == 0
+    assert cache.stats()["bytes"] == 0
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_load():
+    """
+    Tests that concurrent misses for the same key call the loader once.
+    """
+    cache = BoundedTTLCache()
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return ["knowledge"]
+
+    results = await asyncio.gather(*(cache.get_or_load("key", loader) for _ in range(5)))
+
+    assert calls == 1
+    assert results == [["knowledge"]] * 5
+    assert cache.stats()["coalesced"] == 4
+    assert await cache.get_or_load("key", loader) == ["knowledge"]
+    assert calls == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_load_is_shared_and_not_cached():
+    """
+    Tests that a failing load propagates to every waiter and caches nothing.
+    """
+    cache = BoundedTTLCache()
+
+    async def loader():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("toolbox down")
+
+    results = await asyncio.gather(
+        *(cache.get_or_load("key", loader) for _ in range(3)), return_exceptions=True
+    )
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert cache.get("key") is None
+
+
+@pytest.mark.asyncio
+async def test_cancelled_owner_does_not_cancel_waiters():
+    """
+    Tests that cancelling the caller that started a load leaves the load
+    running for the callers waiting on the same key.
+    """
+    cache = BoundedTTLCache()
+    release = asyncio.Event()
+
+    async def loader():
+        await release.wait()
+        return ["knowledge"]
+
+    owner = asyncio.create_task(cache.get_or_load("key", loader))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(cache.get_or_load("key", loader))
+    await asyncio.sleep(0)
+
+    owner.cancel()
+    await asyncio.gather(owner, return_exceptions=True)
+    release.set()
+
+    assert owner.cancelled()
+    assert await waiter == ["knowledge"]
+    assert cache.get("key") == ["knowledge"]
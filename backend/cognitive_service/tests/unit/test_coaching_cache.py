@@ -0,0 +1,133 @@
+"""Unit tests for the coaching response cache."""
+import asyncio
+
+import pytest
+
+from app.services.coaching_cache import CoachingResponseCache, fallback_payload
+
+START = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+
+def test_key_ignores_clocks_and_client_but_not_coaching_parameters():
+    """
+    Tests that the key normalizes the FEN and includes the last move, stage
+    and language, and that personalized requests are not cacheable.
+    """
+    key = CoachingResponseCache.key_for({"ws_client": "a"}, START)
+
+    assert key == CoachingResponseCache.key_for({"ws_client": "b"}, START.replace("0 1", "4 9"))
+    assert key != CoachingResponseCache.key_for({"language": "hi"}, START)
+    assert key != CoachingResponseCache.key_for({"move": "Nf3"}, START)
+    assert key != CoachingResponseCache.key_for({"cognitiveStage": "Expert"}, START)
+    assert CoachingResponseCache.key_for({"personalizedCoaching": True}, START) is None
+    assert CoachingResponseCache.key_for({}, "not a fen") is None
+
+
+def test_fallback_payload_keeps_the_requested_stage_and_labels_the_text_language():
+    """Tests that a known stage is kept in the frontend's spelling and an unknown one becomes Novice."""
+    assert fallback_payload("Tip.", {"cognitiveStage": "developing", "language": "es"}) == {
+        "message": "Tip.",
+        "cognitiveStage": "Developing",
+        "language": "en",
+    }
+    assert fallback_payload("Consejo.", {"cognitiveStage": "grandmaster"}, language="es") == {
+        "message": "Consejo.",
+        "cognitiveStage": "Novice",
+        "language": "es",
+    }
+
+
+@pytest.mark.asyncio
+async def test_identical_requests_share_one_run_and_later_ones_hit():
+    """
+    Tests that concurrent requests for one key share a single run whose
+    result is then served from the cache.
+    """
+    cache = CoachingResponseCache()
+    calls = 0
+
+    async def run(on_partial):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return '{"message": "Develop your knights."}'
+
+    results = await asyncio.gather(*(cache.get_or_run("k", run) for _ in range(3)))
+
+    assert set(results) == {'{"message": "Develop your knights."}'}
+    assert await cache.get_or_run("k", run) == results[0]
+    assert calls == 1
+    assert cache.stats()["runs_in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_cancel_the_shared_run():
+    """
+    Tests that cancelling the request that started a run leaves the run
+    going for the other waiters.
+    """
+    cache = CoachingResponseCache()
+    release = asyncio.Event()
+
+    async def run(on_partial):
+        await release.wait()
+        return "response"
+
+    first = asyncio.create_task(cache.get_or_run("k", run))
+    second = asyncio.create_task(cache.get_or_run("k", run))
+    await asyncio.sleep(0)
+    first.cancel()
+    release.set()
+
+    assert await second == "response"
+    assert first.cancelled()
+    assert cache.responses.get("k") == "response"
+
+
+@pytest.mark.asyncio
+async def test_failed_and_empty_runs_are_not_cached():
+    """Tests that errors reach every waiter and empty responses are retried."""
+    cache = CoachingResponseCache()
+
+    async def fail(on_partial):
+        raise RuntimeError("model unavailable")
+
+    async def empty(on_partial):
+        return ""
+
+    with pytest.raises(RuntimeError):
+        await cache.get_or_run("k", fail)
+    assert await cache.get_or_run("k", empty) == ""
+    assert cache.responses.get("k") is None
+
+
+@pytest.mark.asyncio
+async def test_partial_output_reaches_every_waiter_including_late_ones():
+    """
+    Tests that partial output of a shared run is passed to every waiter,
+    and a waiter joining mid-run first gets the latest partial output.
+    """
+    cache = CoachingResponseCache()
+    release = asyncio.Event()
+    seen = {"a": [], "b": []}
+
+    async def run(on_partial):
+        await on_partial("Deve")
+        await release.wait()
+        await on_partial("Develop your knights.")
+        return "response"
+
+    async def listener(name):
+        async def on_partial(partial):
+            seen[name].append(partial)
+        return on_partial
+
+    first = asyncio.create_task(cache.get_or_run("k", run, await listener("a")))
+    await asyncio.sleep(0)
+    second = asyncio.create_task(cache.get_or_run("k", run, await listener("b")))
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await asyncio.gather(first, second) == ["response", "response"]
+    assert seen["a"] == ["Deve", "Develop your knights."]
+    assert seen["b"] == ["Deve", "Develop your knights."]
@@ -0,0 +1,28 @@
+"""Unit tests for the streamed coaching message parser."""
+from app.services.coaching_stream import PartialMessageParser
+
+
+def test_message_is_decoded_as_it_streams_in():
+    """
+    Tests that the message grows chunk by chunk from inside a fenced JSON
+    block and stops at its closing quote.
+    """
+    parser = PartialMessageParser()
+
+    assert parser.feed('```json\n{"mess') is None
+    assert parser.feed('age": "Control') == "Control"
+    assert parser.feed(" the centre") == "Control the centre"
+    assert parser.feed('.", "cognitiveStage": "Novice"}') == "Control the centre."
+    assert parser.complete
+    assert parser.feed('\n```') is None
+
+
+def test_escapes_split_across_chunks_are_decoded_once_complete():
+    """Tests standard, unicode and surrogate-pair escapes split across chunks."""
+    parser = PartialMessageParser()
+
+    assert parser.feed('{"message": "Say \\') == "Say "
+    assert parser.feed('"check\\" \\u26') == 'Say "check" '
+    assert parser.feed("54 line\\nbreak \\ud83d") == 'Say "check" ♔ line\nbreak '
+    assert parser.feed('\\ude00"') == 'Say "check" ♔ line\nbreak \U0001F600'
+    assert parser.complete
@@ -0,0 +1,127 @@
+"""Unit tests for the Stockfish engine pool."""
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import chess.engine
+import pytest
+
+from app.core.exceptions import EngineUnavailableError
+from app.services.engine_pool import StockfishEnginePool
+
+
+def make_engine():
+    """Creates a stand-in UCI engine whose process is still running."""
+    engine = MagicMock()
+    engine.returncode = asyncio.get_running_loop().create_future()
+    engine.configure = AsyncMock()
+    engine.ping = AsyncMock()
+    engine.quit = AsyncMock()
+    return engine
+
+
+def popen_factory(spawned):
+    async def popen_uci(path):
+        engine = make_engine()
+        spawned.append(engine)
+        return None, engine
+    return popen_uci
+
+
+@pytest.mark.asyncio
+async def test_engines_are_reused_across_checkouts():
+    """
+    Tests that the pool starts its engines once and lends them out repeatedly.
+    """
+    spawned = []
+    with patch("chess.engine.popen_uci", side_effect=popen_factory(spawned)):
+        pool = StockfishEnginePool(size=2, threads=2, hash_mb=32, health_check_interval=0)
+        for _ in range(5):
+            async with pool.acquire():
+                pass
+
+    assert len(spawned) == 2
+    spawned[0].configure.assert_awaited_once_with({"Threads": 2, "Hash": 32})
+    assert pool.stats()["checkouts"] == 5
+    assert pool.stats()["idle"] == 2
+
+
+@pytest.mark.asyncio
+async def test_terminated_engine_is_restarted():
+    """
+    Tests that an engine which dies during use is replaced on the next checkout.
+    """
+    spawned = []
+    with patch("chess.engine.popen_uci", side_effect=popen_factory(spawned)):
+        pool = StockfishEnginePool(size=1, health_check_interval=0)
+        with pytest.raises(chess.engine.EngineTerminatedError):
+            async with pool.acquire():
+                raise chess.engine.EngineTerminatedError("engine process died")
+
+        async with pool.acquire() as engine:
+            assert engine is spawned[1]
+
+    assert pool.stats()["restarts"] == 1
+
+
+@pytest.mark.asyncio
+async def test_checkout_times_out_when_pool_is_exhausted():
+    """
+    Tests that a checkout gives up once the timeout elapses.
+    """
+    spawned = []
+    with patch("chess.engine.popen_uci", side_effect=popen_factory(spawned)):
+        pool = StockfishEnginePool(size=1, checkout_timeout=0.05, health_check_interval=0)
+        async with pool.acquire():
+            with pytest.raises(EngineUnavailableError):
+                async with pool.acquire():
+                    pass
+
+    assert pool.stats()["checkout_timeouts"] == 1
+
+
+@pytest.mark.asyncio
+async def test_missing_binary_raises_engine_unavailable():
+    """
+    Tests that a missing Stockfish binary is reported as an unavailable engine.
+    """
+    with patch("chess.engine.popen_uci", side_effect=FileNotFoundError("stockfish")):
+        pool = StockfishEnginePool(size=1, health_check_interval=0)
+        with pytest.raises(EngineUnavailableError):
+            async with pool.acquire():
+                pass
+
+
+@pytest.mark.asyncio
+async def test_idle_engine_is_pinged_on_checkout_and_replaced_if_unresponsive():
+    """
+    Tests that an engine idle for longer than the health check interval is
+    pinged when checked out, and replaced without a checkout timeout when
+    it does not answer.
+    """
+    spawned = []
+    with patch("chess.engine.popen_uci", side_effect=popen_factory(spawned)):
+        pool = StockfishEnginePool(size=1, checkout_timeout=0.05, health_check_interval=0.01)
+        async with pool.acquire():
+            pass
+        spawned[0].ping.assert_not_awaited()
+
+        await asyncio.sleep(0.02)
+        spawned[0].ping.side_effect = chess.engine.EngineError("no answer")
+        async with pool.acquire() as engine:
+            assert engine is spawned[1]
+
+    spawned[0].quit.assert_awaited_once()
+    assert pool.stats()["checkout_timeouts"] == 0
+
+
+@pytest.mark.asyncio
+async def test_close_quits_borrowed_engines_too():
+    """Tests that closing the pool stops engines that are still checked out."""
+    spawned = []
+    with patch("chess.engine.popen_uci", side_effect=popen_factory(spawned)):
+        pool = StockfishEnginePool(size=2, health_check_interval=0)
+        async with pool.acquire():
+            await pool.close()
+
+    for engine in spawned:
+        engine.quit.assert_awaited_once()
@@ -0,0 +1,67 @@
+"""Unit tests for the template-based illegal move explainer."""
+import pytest
+
+from app.tools.illegal_move_explainer import IllegalMoveExplainer
+
+START = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+
+@pytest.mark.parametrize(
+    "fen, from_square, to_square, reason",
+    [
+        (START, "f1", "c4", "blocked"),
+        (START, "g1", "g3", "wrong_movement"),
+        (START, "e2", "d3", "pawn_capture"),
+        (START, "e7", "e5", "not_your_turn"),
+        (START, "e4", "e5", "no_piece"),
+        (START, "a1", "a2", "own_piece"),
+        ("4k3/4r3/8/8/8/8/4B3/4K3 w - - 0 1", "e2", "d3", "pinned"),
+        ("4k3/8/8/8/8/8/3r4/4K3 w - - 0 1", "e1", "d1", "king_into_check"),
+        ("4k3/8/8/8/8/8/P7/4K2r w - - 0 1", "a2", "a3", "in_check"),
+        ("r3k3/8/8/8/8/8/8/R3K2R w KQ - 0 1", "e1", "c1", "castling"),
+    ],
+)
+def test_reason_for_each_kind_of_illegal_move(fen, from_square, to_square, reason):
+    """Tests that python-chess pins down why each move is illegal."""
+    assert IllegalMoveExplainer().explain(fen, from_square, to_square).reason == reason
+
+
+def test_message_suggests_the_pieces_own_moves_or_groups_the_others():
+    """
+    Tests that the message suggests the attempted piece's legal moves, and
+    falls back to legal moves grouped by piece when it has none.
+    """
+    explainer = IllegalMoveExplainer()
+
+    knight = explainer.explain(START, "g1", "g3")
+    assert knight.message.endswith("Your knight on g1 can go to: Nh3, Nf3.")
+    assert knight.legal_moves_by_piece["knight g1"] == ["Nh3", "Nf3"]
+
+    bishop = explainer.explain(START, "f1", "c4").to_payload()
+    assert "That bishop has no legal moves right now. You could try: knight g1: Nh3, Nf3;" in bishop["message"]
+    assert bishop["cognitiveStage"] == "Novice" and bishop["illegalMoveReason"] == "blocked"
+
+
+def test_payload_uses_the_requested_stage_and_the_template_language():
+    """Tests that a template reply keeps the client's stage and names the language it is written in."""
+    explainer = IllegalMoveExplainer()
+
+    payload = explainer.explain(START, "g1", "g3", language="hi").to_payload(
+        {"cognitiveStage": "Developing", "language": "hi"}
+    )
+    assert payload["cognitiveStage"] == "Developing"
+    assert payload["language"] == "hi"
+
+    fallback = explainer.explain(START, "g1", "g3", language="xx").to_payload({"language": "xx"})
+    assert fallback["cognitiveStage"] == "Novice"
+    assert fallback["language"] == "en"
+
+
+def test_templates_are_localized_and_bad_input_raises():
+    """Tests the Hindi templates, the English fallback and invalid input."""
+    explainer = IllegalMoveExplainer(language="xx")
+
+    assert explainer.explain(START, "g1", "g3", language="hi").message.startswith("घोड़ा इस तरह नहीं चलता।")
+    assert explainer.explain(START, "g1", "g3").message.startswith("A knight does not move like that.")
+    with pytest.raises(ValueError):
+        explainer.explain(START, None, "e4")
@@ -0,0 +1,113 @@
+"""Unit tests for the content-addressed LLM response cache."""
+from types import SimpleNamespace
+
+import pytest
+from google.adk.models.llm_request import LlmRequest
+from google.genai import types
+
+from app.core.exceptions import ConfigurationError, LlmCacheMissError
+from app.services.llm_cache import (
+    CachedLlm,
+    MemoryResponseStore,
+    SqliteResponseStore,
+    request_key,
+    with_response_cache,
+)
+from benchmarks.stubs import LatencyDistribution, StubLlm
+
+
+def _request(text: str = "FEN: 8/8/8/8/8/8/8/K6k w - - 0 1", instruction: str = "Coach the player.") -> LlmRequest:
+    return LlmRequest(
+        contents=[types.Content(role="user", parts=[types.Part(text=text)])],
+        config=types.GenerateContentConfig(system_instruction=instruction, temperature=0.2),
+    )
+
+
+def _stub() -> StubLlm:
+    return StubLlm(latency=LatencyDistribution(median=0))
+
+
+async def _texts(llm, request: LlmRequest, stream: bool = False) -> list[str]:
+    return [r.content.parts[0].text async for r in llm.generate_content_async(request, stream=stream)]
+
+
+def test_request_key_covers_prompt_but_not_call_ids():
+    """Tests that instructions and contents change the key, while ADK-generated call IDs do not."""
+    base = request_key("Gemini:flash", _request())
+    assert request_key("Gemini:flash", _request()) == base
+    assert request_key("Gemini:pro", _request()) != base
+    assert request_key("Gemini:flash", _request(instruction="Be brief.")) != base
+    assert request_key("Gemini:flash", _request(text="FEN: other")) != base
+
+    def with_call(call_id: str) -> LlmRequest:
+        request = _request()
+        request.contents.append(types.Content(role="model", parts=[
+            types.Part(function_call=types.FunctionCall(id=call_id, name="rag_tool", args={"fen": "x"}))
+        ]))
+        return request
+
+    assert request_key("m", with_call("adk-1")) == request_key("m", with_call("adk-2"))
+
+
+@pytest.mark.asyncio
+async def test_identical_requests_are_answered_from_the_cache():
+    stub = _stub()
+    llm = CachedLlm(model=stub.model, llm=stub, store=MemoryResponseStore(), ttl=60)
+
+    first = await _texts(llm, _request(), stream=True)
+    assert await _texts(llm, _request(), stream=True) == first
+    assert stub.calls == 1
+
+    # A request that is not streamed gets only the final response.
+    assert await _texts(llm, _request()) == first[-1:]
+    await _texts(llm, _request(text="FEN: other"))
+    assert stub.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_record_then_replay_from_disk(tmp_path):
+    """Tests that a recording survives a restart and that replay fails on an unrecorded request."""
+    path = str(tmp_path / "llm_cache.sqlite3")
+    stub = _stub()
+    recorder = CachedLlm(model=stub.model, llm=stub, store=SqliteResponseStore(path), mode="record")
+    await _texts(recorder, _request())
+    # Recording always calls the model, keeping its latest response.
+    recorded = await _texts(recorder, _request())
+    assert stub.calls == 2
+    recorder.close()
+
+    replay_stub = _stub()
+    replayer = CachedLlm(model=stub.model, llm=replay_stub, store=SqliteResponseStore(path), mode="replay")
+    assert await _texts(replayer, _request()) == recorded
+    with pytest.raises(LlmCacheMissError):
+        await _texts(replayer, _request(text="FEN: other"))
+    assert replay_stub.calls == 0
+    replayer.close()
+
+
+@pytest.mark.asyncio
+async def test_disk_entries_expire(tmp_path):
+    store = SqliteResponseStore(str(tmp_path / "llm_cache.sqlite3"))
+    await store.set("fresh", [{"partial": False}], ttl=60)
+    await store.set("stale", [{"partial": False}], ttl=-1)
+
+    assert await store.get("fresh") == [{"partial": False}]
+    assert await store.get("stale") is None
+    store.close()
+
+
+def test_with_response_cache_follows_settings():
+    settings = SimpleNamespace(
+        llm_cache_mode="off", llm_cache_backend="memory", llm_cache_ttl=60,
+        llm_cache_max_entries=10, llm_cache_max_bytes=1024, llm_cache_path="",
+    )
+    stub = _stub()
+    assert with_response_cache(stub, settings) is stub
+
+    settings.llm_cache_mode = "cache"
+    cached = with_response_cache(stub, settings)
+    assert isinstance(cached, CachedLlm) and cached.model == stub.model
+
+    settings.llm_cache_mode = "replay"
+    with pytest.raises(ConfigurationError):
+        with_response_cache(stub, settings)
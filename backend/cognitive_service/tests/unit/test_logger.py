@@ -0,0 +1,80 @@
+"""Unit tests for the logging subsystem."""
+import logging
+import queue
+
+import pytest
+import structlog
+
+from app.logger import (
+    HotPathSampler,
+    NonBlockingQueueHandler,
+    set_adk_debug,
+    toggle_adk_debug,
+)
+
+HOT_EVENT = "⚡ [PYTHON_CONSUMER] Messages consumed successfully"
+
+
+def run(sampler: HotPathSampler, method: str, event: str) -> bool:
+    """Returns whether the sampler keeps the event."""
+    try:
+        sampler(None, method, {"event": event})
+    except structlog.DropEvent:
+        return False
+    return True
+
+
+def test_hot_path_events_are_rate_limited_per_event(monkeypatch):
+    """
+    Tests that each hot-path event is kept at most max_per_second times a
+    second, and that other events, warnings and errors are never dropped.
+    """
+    clock = [100.0]
+    monkeypatch.setattr("app.logger.time.monotonic", lambda: clock[0])
+    sampler = HotPathSampler(max_per_second=2)
+
+    assert [run(sampler, "info", HOT_EVENT) for _ in range(4)] == [True, True, False, False]
+    assert run(sampler, "info", "🎯 [PYTHON_ROUTER] Routing to worker")
+    assert run(sampler, "info", "Published coaching message")
+    assert run(sampler, "error", HOT_EVENT)
+    clock[0] += 1.0
+    assert run(sampler, "info", HOT_EVENT)
+    assert sampler.dropped == 2
+
+
+def test_hot_path_events_are_sampled(monkeypatch):
+    """Tests that only a sample_rate share of hot-path info events is kept."""
+    draws = iter([0.05, 0.5, 0.95])
+    monkeypatch.setattr("app.logger.random.random", lambda: next(draws))
+    sampler = HotPathSampler(sample_rate=0.1)
+
+    assert [run(sampler, "info", HOT_EVENT) for _ in range(3)] == [True, False, False]
+    assert run(sampler, "warning", HOT_EVENT)
+
+
+def test_queue_handler_drops_records_instead_of_blocking():
+    """Tests that a full log queue drops records, leaving them unformatted until written."""
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=1))
+    record = logging.LogRecord("test", logging.INFO, __file__, 1, {"event": "kept"}, None, None)
+    handler.handle(record)
+    handler.handle(logging.LogRecord("test", logging.INFO, __file__, 1, "dropped", None, None))
+
+    assert handler.queue.get_nowait() is record
+    assert record.msg == {"event": "kept"}
+    assert handler.dropped == 1
+
+
+@pytest.fixture
+def adk_logger():
+    logger = logging.getLogger("google_adk")
+    level = logger.level
+    yield logger
+    logger.setLevel(level)
+
+
+def test_adk_debug_tracing_can_be_toggled(adk_logger):
+    set_adk_debug(False)
+    assert adk_logger.level == logging.NOTSET
+    assert toggle_adk_debug() is True
+    assert adk_logger.level == logging.DEBUG
+    assert toggle_adk_debug() is False
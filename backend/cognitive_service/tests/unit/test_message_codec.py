@@ -0,0 +1,68 @@
+"""Unit tests for the queue and pub/sub message codecs."""
+import json
+import pickle
+
+import fakeredis.aioredis
+import pytest
+
+from app.core.exceptions import CodecError
+from app.services import message_codec
+from app.services.message_codec import REDIS_ENCODING_ERRORS, Codec, MessageCodec
+
+MESSAGE = {"type": "move", "ws_client": "a", "game": {"fen": "8/8/8/8/8/8/8/K6k w - - 0 1"}, "note": "शह"}
+
+
+@pytest.fixture
+def binary_codec(monkeypatch):
+    """Registers a non-JSON codec, standing in for msgpack when it is not installed."""
+    codec = Codec("pickle", pickle.dumps, pickle.loads, False)
+    monkeypatch.setitem(message_codec.CODECS, "pickle", codec)
+    return codec
+
+
+def test_json_codecs_write_plain_json():
+    """Tests that the JSON codecs need no envelope and any JSON reader can decode them."""
+    for name in ("json", "orjson"):
+        encoded = MessageCodec(name).encode(MESSAGE)
+        assert isinstance(encoded, str)
+        assert json.loads(encoded) == MESSAGE
+
+
+def test_plain_json_producers_are_still_understood():
+    """Tests that payloads without an envelope, str or bytes, are decoded as JSON."""
+    codec = MessageCodec("msgpack")
+    assert codec.decode(json.dumps(MESSAGE)) == MESSAGE
+    assert codec.decode(json.dumps(MESSAGE).encode()) == MESSAGE
+
+
+def test_binary_codec_is_negotiated_through_the_envelope(binary_codec):
+    """Tests that a binary payload names its codec and is decoded by any MessageCodec."""
+    encoded = MessageCodec("pickle").encode(MESSAGE)
+    assert encoded.startswith(b"\x00pickle\x00")
+    assert MessageCodec("json").decode(encoded) == MESSAGE
+
+
+def test_unknown_codec_and_malformed_payloads_raise_codec_error():
+    codec = MessageCodec()
+    with pytest.raises(CodecError):
+        codec.decode(b"\x00cbor\x00\xa1")
+    with pytest.raises(CodecError):
+        codec.decode("{not json")
+
+
+def test_unavailable_codec_falls_back_to_json(monkeypatch):
+    monkeypatch.delitem(message_codec.CODECS, "msgpack", raising=False)
+    assert MessageCodec("msgpack").name == "json"
+
+
+@pytest.mark.asyncio
+async def test_binary_payload_survives_a_decoding_redis_client(binary_codec):
+    """
+    Tests that an enveloped binary payload read back through a client with
+    decode_responses=True still decodes, given the surrogateescape handler.
+    """
+    redis_client = fakeredis.aioredis.FakeRedis(decode_responses=True, encoding_errors=REDIS_ENCODING_ERRORS)
+    await redis_client.rpush("coaching_work_queue", MessageCodec("pickle").encode(MESSAGE))
+    payload = await redis_client.lpop("coaching_work_queue")
+    assert isinstance(payload, str)
+    assert MessageCodec().decode(payload) == MESSAGE
@@ -0,0 +1,52 @@
+"""Unit tests for the pipeline stage metrics."""
+from types import SimpleNamespace
+
+import pytest
+from prometheus_client import REGISTRY
+
+from app.core import metrics
+from app.core.metrics import AgentStageTimer, start_metrics_server, time_stage
+
+
+def stage_sample(pipeline: str, stage: str, suffix: str) -> float:
+    return REGISTRY.get_sample_value(
+        f"chessmate_pipeline_stage_seconds_{suffix}", {"pipeline": pipeline, "stage": stage}
+    ) or 0.0
+
+
+def test_time_stage_records_failed_stages_too():
+    before = stage_sample("test", "failing", "count")
+    with pytest.raises(RuntimeError):
+        with time_stage("test", "failing"):
+            raise RuntimeError("boom")
+    assert stage_sample("test", "failing", "count") == before + 1
+
+
+def test_agent_stage_timer_splits_a_run_by_event_author(monkeypatch):
+    """
+    Tests that each sub-agent is timed from the end of the previous
+    sub-agent's stage to its own last event.
+    """
+    clock = iter([0.0, 1.0, 1.5, 4.0, 4.5])
+    monkeypatch.setattr(metrics.time, "perf_counter", lambda: next(clock))
+    before = {name: stage_sample("timer", f"agent:{name}", "sum") for name in ("knowledge", "coach")}
+
+    timer = AgentStageTimer("timer")
+    for author in ("knowledge", "knowledge", "coach", "coach"):
+        timer.observe(SimpleNamespace(author=author))
+    timer.finish()
+
+    assert stage_sample("timer", "agent:knowledge", "sum") - before["knowledge"] == pytest.approx(1.5)
+    assert stage_sample("timer", "agent:coach", "sum") - before["coach"] == pytest.approx(3.0)
+
+
+def test_supervised_workers_leave_the_endpoint_to_the_supervisor(monkeypatch):
+    started = []
+    monkeypatch.setattr(metrics, "start_http_server", lambda port, addr: started.append(port))
+
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", "/tmp/metrics")
+    assert start_metrics_server(9100) is False
+    monkeypatch.delenv("PROMETHEUS_MULTIPROC_DIR")
+    assert start_metrics_server(0) is False
+    assert start_metrics_server(9100) is True
+    assert started == [9100]
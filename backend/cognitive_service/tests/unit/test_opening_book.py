@@ -0,0 +1,88 @@
+"""Unit tests for the opening book tier."""
+import struct
+
+import chess
+import chess.polyglot
+import pytest
+
+from app.services.opening_book import OpeningBook
+
+
+def polyglot_move(move: chess.Move) -> int:
+    from_row, from_file = divmod(move.from_square, 8)
+    to_row, to_file = divmod(move.to_square, 8)
+    return to_file | to_row << 3 | from_file << 6 | from_row << 9
+
+
+def write_book(path, entries):
+    """Writes a Polyglot book from (board, uci, weight) tuples."""
+    rows = sorted(
+        (chess.polyglot.zobrist_hash(board), polyglot_move(chess.Move.from_uci(uci)), weight)
+        for board, uci, weight in entries
+    )
+    with open(path, "wb") as f:
+        for key, move, weight in rows:
+            f.write(struct.pack(">QHHI", key, move, weight, 0))
+
+
+@pytest.fixture
+def book(tmp_path):
+    after_e4 = chess.Board()
+    after_e4.push_san("e4")
+    book_path = tmp_path / "book.bin"
+    write_book(book_path, [(after_e4, "c7c5", 50), (after_e4, "e7e5", 40), (after_e4, "e7e6", 10)])
+    eco_path = tmp_path / "eco.tsv"
+    eco_path.write_text("eco\tname\tpgn\nB00\tKing's Pawn Game\t1. e4\nC20\tBroken line\t1. e4 e4\n")
+
+    book = OpeningBook(book_path=str(book_path), eco_path=str(eco_path), max_ply=10, max_moves=2)
+    book.load()
+    yield book
+    book.close()
+
+
+def test_book_position_gets_opening_name_and_most_popular_moves(book):
+    """
+    Tests that a book position is answered with its ECO name and the
+    heaviest book moves in SAN, and that unparsable ECO lines are skipped.
+    """
+    fen = "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1"
+
+    payload = book.coaching_payload(fen)
+
+    assert "King's Pawn Game (B00)" in payload["message"]
+    assert "for Black here are c5, e5." in payload["message"]
+    assert payload["culturalContext"]["title"] == "King's Pawn Game"
+    assert payload["cognitiveStage"] == "Novice"
+    assert book.stats()["openings"] == 1
+    assert book.coaching_payload(fen) == payload
+
+
+def test_book_payload_uses_the_requested_stage_and_labels_its_language(book):
+    """Tests that the client's cognitive stage is kept and the English text is not labelled as another language."""
+    fen = "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1"
+
+    payload = book.coaching_payload(fen, {"cognitiveStage": "Expert", "language": "fr"})
+
+    assert payload["cognitiveStage"] == "Expert"
+    assert payload["language"] == "en"
+    assert book.coaching_payload(fen)["cognitiveStage"] == "Novice"
+
+
+def test_out_of_book_and_late_positions_fall_through(book):
+    """
+    Tests that unknown positions, positions past the ply limit and invalid
+    FENs return None and are counted as misses.
+    """
+    assert book.coaching_payload(chess.STARTING_FEN) is None
+    assert book.coaching_payload("rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 30") is None
+    assert book.coaching_payload("not a fen") is None
+    assert book.stats() == {"openings": 1, "hits": 0, "misses": 2, "hit_rate_pct": 0}
+
+
+def test_missing_files_leave_the_book_disabled(tmp_path):
+    """Tests that a book without files loads nothing and never answers."""
+    book = OpeningBook(book_path=str(tmp_path / "missing.bin"), eco_path=str(tmp_path / "missing.tsv"))
+    book.load()
+
+    assert not book.loaded
+    assert book.coaching_payload(chess.STARTING_FEN) is None
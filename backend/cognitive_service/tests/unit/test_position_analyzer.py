@@ -0,0 +1,84 @@
+"""Unit tests for the deterministic position analyzer."""
+import pytest
+
+from app.core.exceptions import EngineUnavailableError
+from app.services.analysis_cache import PositionAnalysis
+from app.tools.position_analyzer import PositionAnalyzer
+
+
+class FakeQueryFactory:
+    """Stands in for FENQueryFactory, returning a fixed engine analysis."""
+
+    def __init__(self, analysis=None, error=None):
+        self.analysis = analysis
+        self.error = error
+
+    async def analyse(self, board):
+        if self.error:
+            raise self.error
+        return self.analysis
+
+
+@pytest.mark.asyncio
+async def test_report_covers_material_checks_hanging_pieces_and_engine_line():
+    """
+    Tests that the report counts material, finds checks and hanging pieces
+    and renders the engine evaluation and best line in SAN.
+    """
+    # White has just played Nxe5; the knight is attacked by the c6 knight
+    # and nothing defends it.
+    fen = "r1bqkb1r/pppp1ppp/2n2n2/4N3/2B1P3/8/PPPP1PPP/RNBQK2R b KQkq - 0 4"
+    analysis = PositionAnalysis(
+        lines=[{"pv": ["c6e5", "d2d4"], "score_cp": -45, "mate": None}], depth=12, multipv=1
+    )
+    analyzer = PositionAnalyzer(FakeQueryFactory(analysis))
+
+    report = await analyzer.analyse(fen)
+
+    assert report.turn == "Black"
+    assert report.material == {"White": 39, "Black": 38}
+    assert report.material_balance == 1
+    assert "knight on e5" in report.hanging["White"]
+    assert report.best_line == ["Nxe5", "d4"]
+    text = report.to_text()
+    assert "White is ahead by 1" in text
+    assert "Evaluation: -0.45 pawns for Black." in text
+    assert "Best move: Nxe5." in text
+    assert report.summary() == "Black to move, and White is ahead by 1. A strong move here is Nxe5."
+
+
+@pytest.mark.asyncio
+async def test_report_without_engine_still_describes_the_position():
+    """
+    Tests that an unavailable engine only drops the evaluation and line.
+    """
+    analyzer = PositionAnalyzer(FakeQueryFactory(error=EngineUnavailableError("down")))
+
+    report = await analyzer.analyse("4k3/8/8/8/8/8/3Q4/4K3 w - - 0 1")
+
+    assert set(report.checks) == {"Qd7+", "Qd8+", "Qe2+", "Qe3+"}
+    assert report.eval_cp is None and report.best_line == []
+    assert "Evaluation" not in report.to_text()
+
+
+@pytest.mark.asyncio
+async def test_invalid_fen_is_described_not_raised():
+    """
+    Tests that describe() turns an invalid FEN into a short note.
+    """
+    analyzer = PositionAnalyzer(FakeQueryFactory())
+    assert "invalid FEN" in await analyzer.describe("not a fen")
+
+
+@pytest.mark.asyncio
+async def test_impossible_position_is_rejected():
+    """
+    Tests that a parseable but impossible position, here with the side not
+    to move in check, is not analysed.
+    """
+    analyzer = PositionAnalyzer(FakeQueryFactory())
+    impossible = "4k3/8/8/8/8/8/4Q3/4K3 w - - 0 1"
+
+    with pytest.raises(ValueError):
+        await analyzer.analyse(impossible)
+    assert "invalid FEN" in await analyzer.describe(impossible)
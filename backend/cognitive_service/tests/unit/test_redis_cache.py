@@ -0,0 +1,59 @@
+"""Unit tests for the shared Redis cache tier."""
+import fakeredis.aioredis
+import pytest
+
+from app.services.cache_service import BoundedTTLCache
+from app.services.redis_cache import RedisCache, TieredCache, decode_value, encode_value
+
+
+def make_shared_cache() -> RedisCache:
+    cache = RedisCache(redis_url="redis://unused", compress_threshold=64)
+    cache.redis_client = fakeredis.aioredis.FakeRedis()
+    return cache
+
+
+def test_large_values_are_compressed():
+    """
+    Tests that values above the threshold are zlib-compressed and round-trip.
+    """
+    value = [{"content": "control the center " * 20, "distance": 0.1}]
+    encoded = encode_value(value, compress_threshold=64)
+    assert encoded.startswith(b"z")
+    assert decode_value(encoded) == value
+    assert encode_value({"a": 1}, compress_threshold=64) == b'j{"a":1}'
+
+
+@pytest.mark.asyncio
+async def test_replicas_share_results_through_redis():
+    """
+    Tests that a result loaded by one replica is served to another
+    replica's empty local cache without calling the loader again.
+    """
+    shared = make_shared_cache()
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        return [{"content": "knowledge"}]
+
+    first_replica = TieredCache(local=BoundedTTLCache(), shared=shared)
+    second_replica = TieredCache(local=BoundedTTLCache(), shared=shared)
+
+    assert await first_replica.get_or_load("query:novice", loader) == [{"content": "knowledge"}]
+    assert await second_replica.get_or_load("query:novice", loader) == [{"content": "knowledge"}]
+    assert calls == 1
+    assert shared.stats()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_bumping_version_invalidates_entries():
+    """
+    Tests that entries written before a version bump are no longer visible.
+    """
+    shared = make_shared_cache()
+    await shared.set("query:novice", ["old"])
+    assert await shared.get("query:novice") == ["old"]
+
+    await shared.bump_version()
+    assert await shared.get("query:novice") is None
@@ -0,0 +1,100 @@
+"""Unit tests for ADK session compaction."""
+import pytest
+from google.adk.events import Event, EventActions
+from google.adk.sessions import InMemorySessionService
+from google.genai.types import Content, Part
+
+from app.services.session_compactor import (
+    SUMMARY_STATE_KEY,
+    USAGE_STATE_KEY,
+    SessionCompactor,
+    split_turns,
+)
+
+APP_NAME = "ChessMateLegalMoveAgentsCoach"
+
+
+async def play_turns(service: InMemorySessionService, session, count: int, start: int = 0):
+    for i in range(start, start + count):
+        await service.append_event(session, Event(
+            author="user",
+            content=Content(role="user", parts=[Part(text=f"move {i}")]),
+            actions=EventActions(state_delta={"fen": f"fen-{i}"}),
+        ))
+        await service.append_event(session, Event(
+            author="coaching_agent",
+            content=Content(role="model", parts=[Part(text=f"advice {i}")]),
+        ))
+
+
+@pytest.mark.asyncio
+async def test_compaction_keeps_recent_turns_and_summarizes_the_rest():
+    """
+    Tests that a compacted session keeps the state and the most recent
+    turns, summarizes the dropped ones and leaves the old session for the
+    caller to delete.
+    """
+    service = InMemorySessionService()
+    session = await service.create_session(app_name=APP_NAME, user_id="a")
+    await play_turns(service, session, 5)
+    compactor = SessionCompactor(max_turns=4, keep_turns=2)
+
+    new_id = await compactor.compact(service, APP_NAME, "a", session.id)
+
+    assert await service.get_session(app_name=APP_NAME, user_id="a", session_id=session.id) is not None
+    compacted = await service.get_session(app_name=APP_NAME, user_id="a", session_id=new_id)
+    assert compacted.state["fen"] == "fen-4"
+    assert compacted.state[SUMMARY_STATE_KEY].splitlines() == [
+        f"- Position fen-{i} => advice {i}" for i in range(3)
+    ]
+    turns = split_turns(compacted.events)
+    assert [turn[0].content.parts[0].text for turn in turns[1:]] == ["move 3", "move 4"]
+    assert compacted.state[USAGE_STATE_KEY]["turns"] == 2
+
+
+@pytest.mark.asyncio
+async def test_summary_rolls_over_and_stays_within_budget():
+    """
+    Tests that a second compaction extends the previous summary while
+    dropping its oldest lines once the summary budget is exceeded.
+    """
+    service = InMemorySessionService()
+    session = await service.create_session(app_name=APP_NAME, user_id="a")
+    await play_turns(service, session, 4)
+    compactor = SessionCompactor(keep_turns=1, summary_max_bytes=100)
+
+    first_id = await compactor.compact(service, APP_NAME, "a", session.id)
+    compacted = await service.get_session(app_name=APP_NAME, user_id="a", session_id=first_id)
+    await play_turns(service, compacted, 3, start=4)
+    second_id = await compactor.compact(service, APP_NAME, "a", first_id)
+
+    summary = (await service.get_session(
+        app_name=APP_NAME, user_id="a", session_id=second_id
+    )).state[SUMMARY_STATE_KEY]
+    assert len(summary.encode()) <= 100
+    assert summary.splitlines()[-1] == "- Position fen-5 => advice 5"
+    assert "fen-0" not in summary
+
+
+@pytest.mark.asyncio
+async def test_record_turn_keeps_usage_in_session_state():
+    """
+    Tests that the turn and byte budgets are checked from usage kept in the
+    session's state, so separate compactors share the same totals.
+    """
+    service = InMemorySessionService()
+    session = await service.create_session(app_name=APP_NAME, user_id="a")
+
+    async def record(compactor, message_bytes):
+        return await compactor.record_turn(service, APP_NAME, "a", session.id, message_bytes, [])
+
+    assert not await record(SessionCompactor(max_turns=2, max_bytes=1000), 10)
+    assert not await record(SessionCompactor(max_turns=2, max_bytes=1000), 10)
+    assert await record(SessionCompactor(max_turns=2, max_bytes=1000), 10)
+    assert (await service.get_session(
+        app_name=APP_NAME, user_id="a", session_id=session.id
+    )).state[USAGE_STATE_KEY] == {"turns": 3, "bytes": 30}
+
+    other = await service.create_session(app_name=APP_NAME, user_id="a")
+    assert await SessionCompactor(max_bytes=1000).record_turn(service, APP_NAME, "a", other.id, 2000, [])
+    assert not await SessionCompactor().record_turn(service, APP_NAME, "a", "missing", 10, [])
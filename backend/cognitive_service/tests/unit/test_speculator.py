@@ -0,0 +1,71 @@
+"""Unit tests for speculative precomputation."""
+import asyncio
+
+import pytest
+
+from app.services.analysis_cache import PositionAnalysis
+from app.services.speculator import Speculator
+
+AFTER_E4 = "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1"
+AFTER_E4_E5 = "rnbqkbnr/pppp1ppp/8/4p3/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 0 2"
+
+
+async def analyse(board):
+    """Returns three engine lines for the position after 1. e4."""
+    return PositionAnalysis(lines=[{"pv": ["e7e5"]}, {"pv": ["c7c5"]}, {"pv": ["e7e6"]}], depth=10, multipv=3)
+
+
+@pytest.mark.asyncio
+async def test_top_replies_are_precomputed_and_scored_against_the_next_request():
+    """
+    Tests that the top-k replies are analysed and retrieved, and that the
+    client's next position scores one hit and the other reply as waste.
+    """
+    retrieved = []
+
+    async def retrieve(fen):
+        retrieved.append(fen)
+
+    speculator = Speculator(analyse, retrieve, top_k=2)
+    speculator.speculate("a", AFTER_E4)
+    await asyncio.wait(list(speculator._tasks.values()))
+
+    assert [fen.split()[0] for fen in retrieved] == [
+        "rnbqkbnr/pppp1ppp/8/4p3/4P3/8/PPPP1PPP/RNBQKBNR",
+        "rnbqkbnr/pp1ppppp/8/2p5/4P3/8/PPPP1PPP/RNBQKBNR",
+    ]
+    speculator.record_request("a", AFTER_E4_E5)
+    assert speculator.stats() == {
+        "running": 0, "hits": 1, "wasted": 1, "cancelled": 0, "hit_rate_pct": 50, "waste_rate_pct": 50,
+    }
+
+
+@pytest.mark.asyncio
+async def test_real_work_cancels_speculation_and_busy_service_defers_it():
+    """
+    Tests that speculation waits while the service is busy, and that
+    cancelling it counts the unfinished positions as cancelled.
+    """
+    busy = True
+    started = asyncio.Event()
+    release = asyncio.Event()
+
+    async def retrieve(fen):
+        started.set()
+        await release.wait()
+
+    speculator = Speculator(analyse, retrieve, is_idle=lambda: not busy, top_k=2, idle_poll_interval=0.01)
+    speculator.speculate("a", AFTER_E4)
+    await asyncio.sleep(0.05)
+    assert not started.is_set()
+
+    busy = False
+    await asyncio.wait_for(started.wait(), 1)
+    task = speculator._tasks["a"]
+    speculator.cancel()
+    await asyncio.wait([task])
+
+    assert task.cancelled()
+    assert speculator.stats()["cancelled"] == 2
+    speculator.record_request("a", AFTER_E4_E5)
+    assert speculator.stats()["hits"] == 0
@@ -0,0 +1,104 @@
+"""Unit tests for the multi-process worker supervisor."""
+import itertools
+
+from app import supervisor as supervisor_module
+from app.supervisor import Supervisor
+
+pids = itertools.count(1000)
+
+
+class FakeProcess:
+    """A stand-in for a worker process that runs until it is told to exit."""
+
+    def __init__(self, target, args, name):
+        self.args = args
+        self.pid = None
+        self.exitcode = None
+        self.sentinel = None
+        self.terminated = False
+
+    def start(self):
+        self.pid = next(pids)
+
+    def is_alive(self):
+        return self.exitcode is None
+
+    def terminate(self):
+        self.terminated = True
+        self.exitcode = -15
+
+    def join(self, timeout=None):
+        pass
+
+    def kill(self):
+        self.exitcode = -9
+
+
+class FakeContext:
+    Process = FakeProcess
+
+
+def make_supervisor(tmp_path, monkeypatch, workers=2):
+    supervisor = Supervisor(workers=workers, metrics_dir=str(tmp_path), max_backoff=4.0)
+    supervisor.context = FakeContext()
+    monkeypatch.setattr(supervisor_module, "wait", lambda sentinels, timeout: None)
+    return supervisor
+
+
+def test_crashed_worker_is_restarted_with_growing_backoff(tmp_path, monkeypatch):
+    """
+    Tests that a crashed worker keeps its worker ID, is restarted only
+    after its backoff, and that repeated crashes double the backoff up to
+    the maximum.
+    """
+    clock = [100.0]
+    monkeypatch.setattr(supervisor_module.time, "monotonic", lambda: clock[0])
+    supervisor = make_supervisor(tmp_path, monkeypatch)
+    for slot in supervisor.slots:
+        supervisor._start(slot)
+    slot = supervisor.slots[1]
+
+    backoffs = []
+    for _ in range(4):
+        slot.process.exitcode = 1
+        supervisor._supervise_once(timeout=0)
+        assert slot.process is None
+        backoffs.append(slot.backoff)
+        clock[0] += slot.backoff
+        supervisor._supervise_once(timeout=0)
+        assert slot.process.args == (1,)
+
+    assert backoffs == [1.0, 2.0, 4.0, 4.0]
+    assert slot.restarts == 4
+    assert supervisor.slots[0].restarts == 0
+
+
+def test_backoff_resets_after_a_healthy_run(tmp_path, monkeypatch):
+    """Tests that a worker that stayed up long enough restarts after the minimum backoff."""
+    clock = [100.0]
+    monkeypatch.setattr(supervisor_module.time, "monotonic", lambda: clock[0])
+    supervisor = make_supervisor(tmp_path, monkeypatch, workers=1)
+    slot = supervisor.slots[0]
+    supervisor._start(slot)
+    slot.backoff = 4.0
+
+    clock[0] += supervisor_module.HEALTHY_UPTIME
+    slot.process.exitcode = 1
+    supervisor._supervise_once(timeout=0)
+
+    assert slot.backoff == 1.0
+
+
+def test_stop_terminates_workers_and_does_not_restart_them(tmp_path, monkeypatch):
+    """Tests that a shutdown signal terminates every worker without restarts."""
+    supervisor = make_supervisor(tmp_path, monkeypatch)
+    for slot in supervisor.slots:
+        supervisor._start(slot)
+    processes = [slot.process for slot in supervisor.slots]
+
+    supervisor._handle_signal(supervisor_module.signal.SIGTERM, None)
+    supervisor._stop_all()
+    supervisor._supervise_once(timeout=0)
+
+    assert all(process.terminated for process in processes)
+    assert all(slot.process is None and slot.restarts == 0 for slot in supervisor.slots)
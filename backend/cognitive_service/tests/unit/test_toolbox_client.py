@@ -0,0 +1,63 @@
+"""Unit tests for the long-lived toolbox client manager."""
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.services.toolbox_client import ToolboxClientManager
+
+
+def make_manager(*tools, timeout: float = 1.0) -> ToolboxClientManager:
+    """Creates a manager whose client loads the given tools in order."""
+    manager = ToolboxClientManager(url="http://toolbox", tool_name="search", timeout=timeout)
+    client = MagicMock()
+    client.load_tool = AsyncMock(side_effect=list(tools))
+    manager._toolbox_client = lambda: client
+    return manager
+
+
+@pytest.mark.asyncio
+async def test_tool_handle_is_loaded_once():
+    """
+    Tests that repeated calls reuse the cached tool handle.
+    """
+    async def search(query_terms: str, cognitive_stages: str) -> str:
+        return f"results for {query_terms}"
+
+    manager = make_manager(search)
+    for _ in range(3):
+        assert await manager.invoke(query_terms="center", cognitive_stages="novice") == "results for center"
+
+    assert manager.stats()["tool_reloads"] == 1
+    assert manager.stats()["calls"] == 3
+
+
+@pytest.mark.asyncio
+async def test_changed_schema_reloads_tool():
+    """
+    Tests that a signature mismatch reloads the tool and retries the call.
+    """
+    async def old_search(query: str) -> str:
+        return "old"
+
+    async def new_search(query_terms: str, cognitive_stages: str) -> str:
+        return "new"
+
+    manager = make_manager(old_search, new_search)
+    assert await manager.invoke(query_terms="center", cognitive_stages="novice") == "new"
+    assert manager.stats()["tool_reloads"] == 2
+
+
+@pytest.mark.asyncio
+async def test_slow_call_times_out():
+    """
+    Tests that a call exceeding the configured timeout is abandoned.
+    """
+    async def slow_search(query_terms: str, cognitive_stages: str) -> str:
+        await asyncio.sleep(1)
+        return "late"
+
+    manager = make_manager(slow_search, timeout=0.01)
+    with pytest.raises(asyncio.TimeoutError):
+        await manager.invoke(query_terms="center", cognitive_stages="novice")
+    assert manager.stats() == {"calls": 1, "timeouts": 1, "tool_reloads": 1, "in_flight": 0}
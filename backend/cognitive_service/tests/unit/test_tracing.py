@@ -0,0 +1,76 @@
+"""Unit tests for tracing work messages through the cognitive service."""
+import json
+
+import pytest
+from opentelemetry import trace
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+from app.core.metrics import time_stage
+from app.core.tracing import (
+    JsonLinesSpanExporter,
+    current_trace_id,
+    record_dequeue,
+    trace_id_for,
+    work_span,
+)
+
+MESSAGE = {"type": "move", "ws_client": "a", "traceId": "enqueue-1700000000000-abcde"}
+
+_exporter = InMemorySpanExporter()
+
+
+@pytest.fixture
+def spans():
+    """Installs an in-memory tracer provider once and clears it for each test."""
+    if not isinstance(trace.get_tracer_provider(), TracerProvider):
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(_exporter))
+        trace.set_tracer_provider(provider)
+    _exporter.clear()
+    return _exporter
+
+
+def test_spans_of_a_message_share_the_gateway_trace(spans):
+    """
+    Tests that the dequeue, handler and stage spans of a message all belong
+    to the trace derived from the gateway traceId, with stages nested in
+    the handler span.
+    """
+    record_dequeue("coaching_work_queue", MESSAGE, queue_age=0.25)
+    with work_span("coaching_work_queue", MESSAGE):
+        assert current_trace_id() == MESSAGE["traceId"]
+        with time_stage("coaching", "publish"):
+            pass
+    assert current_trace_id() is None
+
+    finished = {span.name: span for span in spans.get_finished_spans()}
+    assert set(finished) == {"dequeue", "handle coaching_work_queue", "coaching.publish"}
+    assert {span.context.trace_id for span in finished.values()} == {trace_id_for(MESSAGE["traceId"])}
+    assert finished["coaching.publish"].parent.span_id == finished["handle coaching_work_queue"].context.span_id
+    dequeue = finished["dequeue"]
+    assert dequeue.end_time - dequeue.start_time == pytest.approx(0.25e9, rel=1e-3)
+    assert dequeue.attributes["chessmate.trace_id"] == MESSAGE["traceId"]
+
+
+def test_w3c_traceparent_takes_precedence(spans):
+    traceparent = "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"
+    with work_span("coaching_work_queue", {**MESSAGE, "traceparent": traceparent}):
+        pass
+    (span,) = spans.get_finished_spans()
+    assert span.context.trace_id == 0x0af7651916cd43dd8448eb211c80319c
+
+
+def test_json_lines_exporter_appends_one_span_per_line(spans, tmp_path):
+    with work_span("illegal_move_work_queue", MESSAGE):
+        pass
+    path = tmp_path / "traces.jsonl"
+    exporter = JsonLinesSpanExporter(str(path))
+    exporter.export(spans.get_finished_spans())
+    exporter.export(spans.get_finished_spans())
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert len(lines) == 2
+    assert lines[0]["name"] == "handle illegal_move_work_queue"
+    assert lines[0]["trace_id"] == f"{trace_id_for(MESSAGE['traceId']):032x}"
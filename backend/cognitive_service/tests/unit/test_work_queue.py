@@ -0,0 +1,114 @@
+"""Unit tests for the work queue transports."""
+import fakeredis.aioredis
+import pytest
+
+from app.services.work_queue import ListWorkQueue, StreamWorkQueue
+
+
+@pytest.mark.asyncio
+async def test_list_queue_takes_a_batch_per_queue():
+    """
+    Tests that the list transport takes up to ``count`` messages from each
+    queue and returns nothing once the lists are empty.
+    """
+    redis_client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    queue = ListWorkQueue(redis_client)
+    await redis_client.rpush("coaching_work_queue", "a", "b", "c")
+    await redis_client.rpush("illegal_move_work_queue", "x")
+    queues = ["coaching_work_queue", "illegal_move_work_queue"]
+
+    items = await queue.fetch(queues, count=2, timeout=0.01)
+    assert [(item.queue, item.payload) for item in items] == [
+        ("coaching_work_queue", "a"),
+        ("coaching_work_queue", "b"),
+        ("illegal_move_work_queue", "x"),
+    ]
+    assert [item.payload for item in await queue.fetch(queues, count=2, timeout=0.01)] == ["c"]
+    assert await queue.fetch(queues, count=2, timeout=0.01) == []
+
+
+@pytest.mark.asyncio
+async def test_batch_read_and_acknowledge():
+    """
+    Tests that messages are read in batches and leave the pending list
+    only once acknowledged.
+    """
+    redis_client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    queue = StreamWorkQueue(redis_client, consumer="worker-1", maintenance_interval=float("inf"))
+    await queue.setup(["coaching_work_queue"])
+    for i in range(3):
+        await redis_client.xadd("coaching_work_queue", {"payload": f'{{"id": {i}}}'})
+
+    items = await queue.fetch(["coaching_work_queue"], count=2, timeout=0.01)
+    assert [item.payload for item in items] == ['{"id": 0}', '{"id": 1}']
+
+    await queue.ack(items[0])
+    pending = await redis_client.xpending("coaching_work_queue", "cognitive-service")
+    assert pending["pending"] == 1
+    assert await queue.depth("coaching_work_queue") == 1
+
+
+@pytest.mark.asyncio
+async def test_pending_messages_of_dead_consumer_are_reclaimed():
+    """
+    Tests that a message left unacknowledged by a crashed consumer is
+    claimed by another consumer.
+    """
+    redis_client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    crashed = StreamWorkQueue(redis_client, consumer="crashed", maintenance_interval=float("inf"))
+    await crashed.setup(["coaching_work_queue"])
+    await redis_client.xadd("coaching_work_queue", {"payload": '{"id": 7}'})
+    assert len(await crashed.fetch(["coaching_work_queue"], count=1, timeout=0.01)) == 1
+
+    survivor = StreamWorkQueue(redis_client, consumer="survivor", claim_min_idle=0)
+    items = await survivor.fetch(["coaching_work_queue"], count=5, timeout=0.01)
+
+    assert [item.payload for item in items] == ['{"id": 7}']
+    assert survivor.reclaimed == 1
+
+
+@pytest.mark.asyncio
+async def test_poison_messages_are_dead_lettered():
+    """
+    Tests that an entry delivered more than ``max_deliveries`` times is moved
+    to the dead-letter stream and acknowledged instead of being reclaimed.
+    """
+    redis_client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    queue = StreamWorkQueue(redis_client, consumer="worker-1", claim_min_idle=0, max_deliveries=2)
+    await queue.setup(["coaching_work_queue"])
+    await redis_client.xadd("coaching_work_queue", {"payload": '{"id": 9}'})
+
+    assert len(await queue.fetch(["coaching_work_queue"], count=1, timeout=0.01)) == 1
+    queue._last_maintenance = 0.0
+    assert len(await queue.fetch(["coaching_work_queue"], count=1, timeout=0.01)) == 1
+    queue._last_maintenance = 0.0
+    assert await queue.fetch(["coaching_work_queue"], count=1, timeout=0.01) == []
+
+    dead = await redis_client.xrange("coaching_work_queue:dead")
+    assert [fields["payload"] for _, fields in dead] == ['{"id": 9}']
+    assert dead[0][1]["deliveries"] == "3"
+    assert queue.dead_lettered == 1
+    pending = await redis_client.xpending("coaching_work_queue", "cognitive-service")
+    assert pending["pending"] == 0
+
+
+@pytest.mark.asyncio
+async def test_reclaim_accepts_two_element_autoclaim_reply():
+    """
+    Tests that the Redis 6.2 XAUTOCLAIM reply, which has no list of deleted
+    ids, is handled like the Redis 7 one.
+    """
+    redis_client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    queue = StreamWorkQueue(redis_client, consumer="worker-1", claim_min_idle=0)
+    await queue.setup(["coaching_work_queue"])
+    await redis_client.xadd("coaching_work_queue", {"payload": '{"id": 4}'})
+    await redis_client.xreadgroup("cognitive-service", "crashed", {"coaching_work_queue": ">"})
+
+    autoclaim = redis_client.xautoclaim
+
+    async def redis_62_autoclaim(*args, **kwargs):
+        return (await autoclaim(*args, **kwargs))[:2]
+
+    redis_client.xautoclaim = redis_62_autoclaim
+    items = await queue.fetch(["coaching_work_queue"], count=1, timeout=0.01)
+    assert [item.payload for item in items] == ['{"id": 4}']
@@ -12,6 +12,21 @@ import { EventEmitter } from 'events';
 import Redis from 'ioredis';
 import logger from '@/lib/logger';
 
+// "list" pushes work with RPUSH; "streams" appends it to a Redis Stream
+// consumed through a consumer group by the cognitive service.
+const WORK_QUEUE_TRANSPORT = process.env.WORK_QUEUE_TRANSPORT || 'list';
+const STREAM_MAX_LEN = parseInt(process.env.STREAM_MAX_LEN || '10000', 10);
+// Per-client game-state sequence numbers let the cognitive service skip
+// positions that were superseded before it got to them.
+const CLIENT_SEQ_TTL_SECONDS = 3600;
+// Optional per-queue time-to-live stamped on each message. The cognitive
+// service drops work that is older than this when it dequeues it, instead
+// of coaching a position the user has long moved on from.
+const WORK_TTL_MS: Record<string, number> = {
+  coaching_work_queue: parseInt(process.env.COACHING_WORK_TTL_MS || '0', 10),
+  illegal_move_work_queue: parseInt(process.env.ILLEGAL_MOVE_WORK_TTL_MS || '0', 10),
+};
+
 class EventBus extends EventEmitter {
   private logger: typeof logger;
   private publisher: Redis;
@@ -33,7 +48,7 @@ class EventBus extends EventEmitter {
 
     this.subscriber.on('connect', () => {
       this.logger.info('Connected to Redis subscriber.');
-      this.subscriber.subscribe('coaching:message_ready', (err, count) => {
+      this.subscriber.subscribe('coaching:message_ready', 'coaching:message_partial', (err, count) => {
         if (err) {
           this.logger.error('Failed to subscribe to Redis channels', { err });
         } else {
@@ -99,8 +114,36 @@ class EventBus extends EventEmitter {
         delete data.ws;
       }
 
+      // Lets consumers measure how long the message waited in the queue,
+      // and trace it through the cognitive service
+      data.enqueuedAt = Date.now();
+      data.traceId = data.traceId || traceId;
+      if (WORK_TTL_MS[queue] > 0) {
+        data.ttlMs = WORK_TTL_MS[queue];
+      }
+
+      if (queue === 'coaching_work_queue' && data.ws_client) {
+        const seqKey = `coaching:seq:${data.ws_client}`;
+        data.clientSeq = await this.publisher.incr(seqKey);
+        await this.publisher.expire(seqKey, CLIENT_SEQ_TTL_SECONDS);
+      }
+
       const jsonPayload = JSON.stringify(data);
       
+      if (WORK_QUEUE_TRANSPORT === 'streams') {
+        const messageId = await this.publisher.xadd(
+          queue, 'MAXLEN', '~', STREAM_MAX_LEN, '*', 'payload', jsonPayload
+        );
+        const streamLength = await this.publisher.xlen(queue);
+        this.logger.info('✅ [REDIS_ENQUEUE] XADD completed', {
+          traceId,
+          queue,
+          messageId,
+          streamLength
+        });
+        return streamLength;
+      }
+
       this.logger.info('🔍 [REDIS_ENQUEUE] About to call RPUSH', {
         traceId,
         queue,
@@ -195,7 +238,9 @@ class EventBus extends EventEmitter {
   // Add queue length helper
   public async getQueueLength(queue: string): Promise<number> {
     try {
-      const length = await this.publisher.llen(queue);
+      const length = WORK_QUEUE_TRANSPORT === 'streams'
+        ? await this.publisher.xlen(queue)
+        : await this.publisher.llen(queue);
       this.logger.info('📏 [QUEUE_LENGTH] Queue length retrieved', { queue, length });
       return length;
     } catch (error: any) {
@@ -12,7 +12,7 @@ import { v4 as uuidv4 } from 'uuid';
 import http from 'http';
 import logger from '@/lib/logger';
 import eventBus from './EventBus';
-import { CoachingResponse } from './lib/types';
+import { CoachingPartialResponse, CoachingResponse } from './lib/types';
 
 // Augment the WebSocket type to include our custom ID
 interface Client extends WebSocket {
@@ -183,14 +183,16 @@ class WebSocketGateway {
         });
       });      
 
-      this.eventBus.on('coaching:message_ready', (message: CoachingResponse) => {
+      const forwardCoachingMessage = (message: CoachingResponse | CoachingPartialResponse) => {
         this.wss?.clients.forEach((client: WebSocket) => {
           const wsClient = client as Client;
           if (wsClient.id === message.ws_client && wsClient.readyState === WebSocket.OPEN) {
             wsClient.send(JSON.stringify(message));
           }
         });
-      });
+      };
+      this.eventBus.on('coaching:message_ready', forwardCoachingMessage);
+      this.eventBus.on('coaching:message_partial', forwardCoachingMessage);
 
       this.eventBus.on('server:message', ({ ws, message }: { ws: Client; message: object }) => {
         if (ws.readyState === WebSocket.OPEN) {
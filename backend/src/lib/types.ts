@@ -9,8 +9,23 @@
 export interface CoachingResponse {
   type: 'coaching:message_ready';
   ws_client: string;
+  /** The traceId stamped on the work message this answers, if it had one. */
+  traceId?: string;
   payload: {
     message: string;
     highlights?: any[];
   };
 }
+
+/**
+ * The coaching message generated so far, sent before the final
+ * `coaching:message_ready`. Each one carries the full text up to that point.
+ */
+export interface CoachingPartialResponse {
+  type: 'coaching:message_partial';
+  ws_client: string;
+  traceId?: string;
+  payload: {
+    message: string;
+  };
+}
@@ -43,6 +43,15 @@ const App: React.FC = () => {
         const message = JSON.parse(lastMessage.data);
         console.log('📨 App received message:', message);
         
+        // Partial messages only update the panel; the final
+        // coaching:message_ready replaces it and is added to the history.
+        if (message.type === 'coaching:message_partial' && typeof message.payload?.message === 'string') {
+          setCoachingData(prev => ({
+            message: message.payload.message,
+            cognitiveStage: prev?.cognitiveStage ?? 'Developing',
+          }));
+        }
+
         if (message.type === 'coaching:message_ready') {
           const validation = CoachingPayloadSchema.safeParse(message.payload);
           if (validation.success) {
@@ -16,8 +16,8 @@ export const useChessGame = () => {
         game.current.load(message.fen);
         setFen(game.current.fen());
       }
-      // When a coaching message arrives, the AI is no longer "thinking".
-      if (message.type === 'coaching:message_ready') {
+      // When a coaching message starts arriving, the AI is no longer "thinking".
+      if (message.type === 'coaching:message_ready' || message.type === 'coaching:message_partial') {
         setIsThinking(false);
       }
     }